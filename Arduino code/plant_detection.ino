@@ -9,6 +9,13 @@
  * - LDR Light Sensor (Analog Pin A1)
  * - Water Pump Relay (Pin 8 - Active LOW)
  * - Incubator Lights Relay (Pin 9 - Active LOW)
+ *
+ * Serial output (9600 baud):
+ * - Human-readable text block (Temperature:, Humidity:, ...) as before
+ * - One framed line per sample for the Raspberry Pi reader:
+ *     $PLANT,<temp>,<humidity>,<soil>,<ldr>,<pump>,<lights>*<XX>
+ *   <pump>/<lights> are 1/0, empty temp/humidity = sensor error,
+ *   <XX> = XOR of all characters between '$' and '*', in hex
  */
 
 #include <DHT.h>
@@ -30,12 +37,16 @@
 #define MIN_LIGHT_ON_TIME 28800000  // 8 hours in milliseconds (minimum daily light)
 #define MAX_LIGHT_ON_TIME 57600000  // 16 hours in milliseconds (maximum daily light)
 
+// Serial protocol
+#define FRAMED_OUTPUT 1           // 1 = also emit one $PLANT,...*XX line per sample
+
 DHT dht(DHTPIN, DHTTYPE);
 
 // State variables
 unsigned long lightOnStartTime = 0;
 unsigned long totalLightOnTime = 0;
 bool lightsOn = false;
+bool pumpOn = false;
 unsigned long lastDayReset = 0;
 
 void setup() {
@@ -88,9 +99,11 @@ void loop() {
   // Control water pump based on soil moisture
   if (soil < SOIL_DRY_THRESHOLD) {
     digitalWrite(PUMP_RELAY_PIN, LOW); // ON
+    pumpOn = true;
     Serial.println("Status: Pump ON - Watering");
   } else {
     digitalWrite(PUMP_RELAY_PIN, HIGH); // OFF
+    pumpOn = false;
     Serial.println("Status: Pump OFF");
   }
   
@@ -118,10 +131,49 @@ void loop() {
   
   Serial.println("========================");
   Serial.println();
+
+  if (FRAMED_OUTPUT) {
+    sendFrame(temp, humidity, soil, ldr);
+  }
   
   delay(2000); // Wait 2 seconds between readings
 }
 
+/*
+ * Function: sendFrame
+ * Description: Emits one compact, checksummed sample line for the Raspberry Pi
+ * Parameters: temp, humidity, soil, ldr - Current sensor readings
+ * Returns: void
+ */
+
+void sendFrame(float temp, float humidity, int soil, int ldr) {
+  char tempStr[8] = "";
+  char humidityStr[8] = "";
+  char body[64];
+
+  if (!isnan(temp)) {
+    dtostrf(temp, 1, 1, tempStr);
+  }
+  if (!isnan(humidity)) {
+    dtostrf(humidity, 1, 1, humidityStr);
+  }
+  snprintf(body, sizeof(body), "PLANT,%s,%s,%d,%d,%d,%d",
+           tempStr, humidityStr, soil, ldr, pumpOn ? 1 : 0, lightsOn ? 1 : 0);
+
+  byte checksum = 0;
+  for (char *c = body; *c; c++) {
+    checksum ^= *c;
+  }
+
+  Serial.print('$');
+  Serial.print(body);
+  Serial.print('*');
+  if (checksum < 0x10) {
+    Serial.print('0');
+  }
+  Serial.println(checksum, HEX);
+}
+
 /*
  * Function: controlLights
  * Description: Manages incubator lighting based on ambient light and daily requirements
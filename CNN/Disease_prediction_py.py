@@ -2,17 +2,223 @@
 """
 Rose Plant Disease Prediction
 Loads model.h5 and predicts disease of a given leaf image.
+- predict_leaf_disease(): one image at a time
+- predict_batch(): many images, decoded in parallel and scored in batches
+- predict_frame(): an in-memory camera frame (NumPy array), no JPEG round-trip
+- The model is loaded lazily on first use and cached per (path, version),
+  so importing this module (e.g. just for class_labels) stays cheap.
+- Inference runs through a pluggable backend: full Keras ('keras') or
+  TensorFlow Lite ('tflite', see export_tflite.py). Pick one per call or
+  set LEAF_BACKEND / LEAF_TFLITE_PATH / LEAF_TFLITE_THREADS.
+- Preprocessing, model call and postprocessing are timed into metrics.py
+  histograms (leaf_stage_seconds, leaf_model_seconds); cache lookups are counted
 """
 
+import time
+
+_import_start = time.perf_counter()
+
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
 import numpy as np
-from tensorflow.keras.models import load_model
-from tensorflow.keras.preprocessing import image
+
+from metrics import counter, timer
+from prediction_cache import make_result
+
+IMG_SIZE = (224, 224)
+MODEL_PATH = os.environ.get('LEAF_MODEL_PATH', 'model.h5')
+DEFAULT_BACKEND = os.environ.get('LEAF_BACKEND', 'keras')
+TFLITE_PATH = os.environ.get('LEAF_TFLITE_PATH', 'model_int8.tflite')
+TFLITE_THREADS = int(os.environ.get('LEAF_TFLITE_THREADS', os.cpu_count() or 1))
+
+# Startup instrumentation (seconds); filled in as each phase happens
+startup_timings = {'import': None, 'load': None, 'first_inference': None}
 
 # -----------------------------
-# 1. Load trained model
+# 1. Model registry (lazy load)
 # -----------------------------
-model = load_model('model.h5')
-print("Loaded model.h5 successfully")
+_models = {}
+_models_lock = threading.Lock()
+
+def _model_version(model_path):
+    """Default version = file mtime, so a retrained model.h5 is picked up"""
+    try:
+        return os.stat(model_path).st_mtime_ns
+    except OSError:
+        return None
+
+def warm_up(model):
+    """
+    Run one dummy 224x224 batch so the first real request hits a built graph.
+    Accepts a Keras model or an inference backend.
+    """
+    predict = getattr(model, 'predict_on_batch', model.predict)
+    start = time.perf_counter()
+    predict(np.zeros((1,) + IMG_SIZE + (3,), dtype=np.float32))
+    elapsed = time.perf_counter() - start
+    if startup_timings['first_inference'] is None:
+        startup_timings['first_inference'] = elapsed
+    return elapsed
+
+def get_model(model_path=None, version=None, warmup=False):
+    """
+    Return the Keras model for model_path, loading it on first use.
+    One instance is cached per (absolute path, version) for this process.
+    """
+    model_path = model_path or MODEL_PATH
+    key = (os.path.abspath(model_path), version if version is not None else _model_version(model_path))
+
+    model = _models.get(key)
+    if model is not None:
+        return model
+
+    with _models_lock:
+        model = _models.get(key)
+        if model is None:
+            start = time.perf_counter()
+            from tensorflow.keras.models import load_model
+            model = load_model(model_path)
+            load_time = time.perf_counter() - start
+            if startup_timings['load'] is None:
+                startup_timings['load'] = load_time
+            print(f"Loaded {model_path} successfully ({load_time:.2f}s)")
+            if warmup:
+                warm_up(model)
+            _models[key] = model
+    return model
+
+def report_startup_timings():
+    """Print import / load / first-inference times separately"""
+    for phase in ('import', 'load', 'first_inference'):
+        value = startup_timings[phase]
+        shown = f"{value * 1000:.1f} ms" if value is not None else "not yet measured"
+        print(f"{phase:>16}: {shown}")
+
+# -----------------------------
+# 1b. Inference backends
+# -----------------------------
+class KerasBackend:
+    """Full Keras model.h5"""
+    name = 'keras'
+
+    def __init__(self, model_path=None, version=None):
+        self.model = get_model(model_path, version)
+        path = model_path or MODEL_PATH
+        self.identity = f"{self.name}:{os.path.abspath(path)}@{version if version is not None else _model_version(path)}"
+
+    def predict(self, batch):
+        return np.asarray(self.model.predict_on_batch(batch))
+
+class TFLiteBackend:
+    """
+    TensorFlow Lite model (float32, float16 or int8-quantized).
+    Uses tflite_runtime on the Pi when installed, tf.lite otherwise.
+    """
+    name = 'tflite'
+
+    def __init__(self, model_path=None, num_threads=None):
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+
+        start = time.perf_counter()
+        self.model_path = model_path or TFLITE_PATH
+        self.num_threads = num_threads or TFLITE_THREADS
+        self.identity = f"{self.name}:{os.path.abspath(self.model_path)}@{_model_version(self.model_path)}"
+        self.interpreter = Interpreter(model_path=self.model_path, num_threads=self.num_threads)
+        self.interpreter.allocate_tensors()
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self._batch_size = int(self._input['shape'][0])
+        # The interpreter is not thread-safe; serialize invoke() calls
+        self._lock = threading.Lock()
+        if startup_timings['load'] is None:
+            startup_timings['load'] = time.perf_counter() - start
+        print(f"Loaded {self.model_path} successfully ({self.num_threads} threads)")
+
+    def predict(self, batch):
+        with self._lock:
+            if batch.shape[0] != self._batch_size:
+                self.interpreter.resize_tensor_input(self._input['index'], batch.shape)
+                self.interpreter.allocate_tensors()
+                self._input = self.interpreter.get_input_details()[0]
+                self._output = self.interpreter.get_output_details()[0]
+                self._batch_size = batch.shape[0]
+
+            in_dtype = self._input['dtype']
+            if in_dtype != np.float32:
+                scale, zero_point = self._input['quantization']
+                info = np.iinfo(in_dtype)
+                batch = np.clip(np.round(batch / scale + zero_point), info.min, info.max).astype(in_dtype)
+
+            self.interpreter.set_tensor(self._input['index'], batch)
+            self.interpreter.invoke()
+            preds = self.interpreter.get_tensor(self._output['index'])
+
+            if self._output['dtype'] != np.float32:
+                scale, zero_point = self._output['quantization']
+                preds = (preds.astype(np.float32) - zero_point) * scale
+            return preds
+
+BACKENDS = {'keras': KerasBackend, 'tflite': TFLiteBackend}
+_backends = {}
+_backends_lock = threading.Lock()
+
+def get_backend(backend=None, model_path=None, num_threads=None):
+    """
+    Return a cached inference backend.
+    backend may be a name from BACKENDS or an object with .predict(batch).
+    """
+    if backend is not None and not isinstance(backend, str):
+        return backend
+    name = backend or DEFAULT_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend {name!r}; choose from {sorted(BACKENDS)}")
+
+    if name == 'keras':
+        path = model_path or MODEL_PATH
+        key = (name, os.path.abspath(path), _model_version(path))
+    else:
+        path = model_path or TFLITE_PATH
+        key = (name, os.path.abspath(path), _model_version(path), num_threads or TFLITE_THREADS)
+
+    instance = _backends.get(key)
+    if instance is None:
+        with _backends_lock:
+            instance = _backends.get(key)
+            if instance is None:
+                if name == 'keras':
+                    instance = KerasBackend(path)
+                else:
+                    instance = TFLiteBackend(path, num_threads)
+                _backends[key] = instance
+    return instance
+
+def model_identity(backend):
+    """Cache scope for a backend's answers: name, model path and version"""
+    return getattr(backend, 'identity', None) or f"custom:{type(backend).__qualname__}"
+
+def _run_backend(backend, batch):
+    """Call backend.predict, recording the very first inference time"""
+    first = startup_timings['first_inference'] is None
+    start = time.perf_counter()
+    with timer('leaf_model_seconds', 'Model call per batch', backend=getattr(backend, 'name', 'custom')):
+        preds = backend.predict(batch)
+    if first:
+        startup_timings['first_inference'] = time.perf_counter() - start
+    return preds
+
+def __getattr__(name):
+    # Backwards compatibility: `Disease_prediction_py.model` still works, lazily
+    if name == 'model':
+        return get_model()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # -----------------------------
 # 2. Define class labels
@@ -22,24 +228,132 @@ class_labels = ['healthy', 'rose_rust', 'rose_sawfly_slug']  # Update based on y
 # -----------------------------
 # 3. Prediction function
 # -----------------------------
-def predict_leaf_disease(img_path):
+def load_leaf_image(img_path):
+    """Decode and resize one image to a (224, 224, 3) float32 array in [0, 1]"""
+    from tensorflow.keras.preprocessing import image
+    img = image.load_img(img_path, target_size=IMG_SIZE)
+    return image.img_to_array(img) / 255.0
+
+def load_leaf_image_bytes(data):
+    """Same as load_leaf_image, but decodes an in-memory JPEG/PNG (no temp file)"""
+    from PIL import Image
+    with Image.open(io.BytesIO(data)) as img:
+        # load_img uses nearest-neighbour resizing; match it so results agree
+        img = img.convert('RGB').resize(IMG_SIZE[::-1], Image.NEAREST)
+        return np.asarray(img, dtype=np.float32) / 255.0
+
+@lru_cache(maxsize=8)
+def _nearest_index(height, width):
+    """Source rows/cols PIL's NEAREST resize samples for a height x width input"""
+    def axis(src, dst):
+        # PIL steps the coordinate by repeated addition; cumsum rounds the same way
+        step = src / dst
+        return np.cumsum(np.r_[step * 0.5, np.full(dst - 1, step)]).astype(np.intp)
+
+    return axis(height, IMG_SIZE[0])[:, None], axis(width, IMG_SIZE[1])[None, :]
+
+def load_leaf_array(frame, out=None):
+    """
+    Same as load_leaf_image for an RGB uint8 frame already in memory
+    (e.g. Picamera2 capture_array): one nearest-neighbour gather, scaled
+    straight into `out` (a (224, 224, 3) float32 array or batch slot).
+    """
+    rows, cols = _nearest_index(frame.shape[0], frame.shape[1])
+    if out is None:
+        out = np.empty(IMG_SIZE + (3,), dtype=np.float32)
+    np.divide(frame[rows, cols, :3], 255.0, out=out, casting='same_kind')
+    return out
+
+def predict_frame(frame, backend=None, top_k=1):
+    """Predict from an in-memory RGB frame; returns (label, confidence) like predict_leaf_disease"""
+    batch = np.empty((1,) + IMG_SIZE + (3,), dtype=np.float32)
+    with timer('leaf_stage_seconds', stage='preprocess'):
+        load_leaf_array(frame, out=batch[0])
+    labels, confidences = predict_arrays(batch, top_k=top_k, backend=backend)
+    return labels[0][0], confidences[0][0]
+
+def predict_leaf_disease(img_path, backend=None, cache=None):
+    # Identical / near-identical frames reuse the cached result (see prediction_cache.py)
+    backend = get_backend(backend)
+    if cache is not None:
+        with open(img_path, 'rb') as f:
+            data = f.read()
+        model = model_identity(backend)
+        cached, sha, phash = cache.lookup(data, model)
+        counter('leaf_cache_lookups_total', 'Prediction cache lookups').inc(result='miss' if cached is None else 'hit')
+        if cached is not None:
+            return cached['disease'], cached['confidence']
+
     # Load and preprocess image
-    img = image.load_img(img_path, target_size=(224, 224))
-    img_array = image.img_to_array(img)
-    img_array = np.expand_dims(img_array, axis=0) / 255.0
+    with timer('leaf_stage_seconds', 'Per-stage time of leaf predictions', stage='preprocess'):
+        img_array = np.expand_dims(load_leaf_image(img_path), axis=0)
 
     # Predict
-    preds = model.predict(img_array)
-    class_idx = np.argmax(preds, axis=1)[0]
-    confidence = preds[0][class_idx]
+    preds = _run_backend(backend, img_array)
+    with timer('leaf_stage_seconds', stage='postprocess'):
+        class_idx = np.argmax(preds, axis=1)[0]
+        confidence = preds[0][class_idx]
 
     predicted_label = class_labels[class_idx]
+    if cache is not None:
+        # Same value schema as inference_server.py, with every class ranked
+        labels, confidences = top_k_predictions(np.asarray(preds), top_k=len(class_labels))
+        cache.put(sha, phash, make_result(labels[0], confidences[0]), model)
     return predicted_label, confidence
 
 # -----------------------------
-# 4. Test Example
+# 4. Batch prediction
+# -----------------------------
+def top_k_predictions(preds, top_k=1):
+    """
+    Vectorized top-k over a (N, num_classes) probability matrix.
+    Returns (labels, confidences), both shaped (N, top_k), best first.
+    """
+    top_k = min(top_k, preds.shape[1])
+    top_idx = np.argsort(-preds, axis=1)[:, :top_k]
+    confidences = np.take_along_axis(preds, top_idx, axis=1)
+    labels = np.asarray(class_labels)[top_idx]
+    return labels, confidences
+
+def predict_arrays(batch, top_k=1, backend=None):
+    """Score an already preprocessed (N, 224, 224, 3) batch; returns top-k labels/confidences"""
+    preds = _run_backend(get_backend(backend), batch)
+    with timer('leaf_stage_seconds', stage='postprocess'):
+        return top_k_predictions(np.asarray(preds), top_k=top_k)
+
+def predict_batch(img_paths, batch_size=32, top_k=1, workers=4, backend=None):
+    """
+    Predict many leaf images at once.
+    Images are decoded/resized on a thread pool and stacked into one
+    array per batch so the model is called once per batch_size images.
+    Returns (labels, confidences) shaped (len(img_paths), top_k).
+    """
+    img_paths = list(img_paths)
+    if not img_paths:
+        return np.empty((0, top_k), dtype=object), np.empty((0, top_k), dtype=np.float32)
+
+    backend = get_backend(backend)
+    all_preds = []
+    batch = np.empty((batch_size,) + IMG_SIZE + (3,), dtype=np.float32)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for start in range(0, len(img_paths), batch_size):
+            chunk = img_paths[start:start + batch_size]
+            with timer('leaf_stage_seconds', stage='preprocess_batch'):
+                for i, img_array in enumerate(pool.map(load_leaf_image, chunk)):
+                    batch[i] = img_array
+            preds = _run_backend(backend, batch[:len(chunk)])
+            all_preds.append(np.asarray(preds))
+
+    with timer('leaf_stage_seconds', stage='postprocess'):
+        return top_k_predictions(np.concatenate(all_preds), top_k=top_k)
+
+startup_timings['import'] = time.perf_counter() - _import_start
+
+# -----------------------------
+# 5. Test Example
 # -----------------------------
 if __name__ == "__main__":
     test_image = 'sample_leaf.jpg'  # Replace with your test leaf image
     label, conf = predict_leaf_disease(test_image)
     print(f"Predicted Disease: {label} (Confidence: {conf*100:.2f}%)")
+    report_startup_timings()
@@ -0,0 +1,61 @@
+# benchmark_batch_predict.py
+"""
+Benchmark: per-file predict_leaf_disease() loop vs predict_batch()
+Reports images/sec for both on a folder of leaf images.
+
+Usage:
+    python benchmark_batch_predict.py dataset/val --limit 256 --batch-size 32
+"""
+
+import argparse
+import os
+import time
+
+from Disease_prediction_py import predict_batch, predict_leaf_disease
+
+IMAGE_EXTS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+def find_images(folder, limit):
+    paths = []
+    for root, _, files in os.walk(folder):
+        for name in sorted(files):
+            if name.lower().endswith(IMAGE_EXTS):
+                paths.append(os.path.join(root, name))
+    return sorted(paths)[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('folder', help='Folder containing leaf images (searched recursively)')
+    parser.add_argument('--limit', type=int, default=256, help='Maximum number of images to score')
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--workers', type=int, default=4, help='Decode threads for predict_batch')
+    args = parser.parse_args()
+
+    paths = find_images(args.folder, args.limit)
+    if not paths:
+        raise SystemExit(f"No images found in {args.folder}")
+    print(f"Scoring {len(paths)} images")
+
+    # Warm-up so neither run pays graph tracing cost
+    predict_leaf_disease(paths[0])
+    predict_batch(paths[:args.batch_size], batch_size=args.batch_size, workers=args.workers)
+
+    start = time.perf_counter()
+    loop_labels = [predict_leaf_disease(p)[0] for p in paths]
+    loop_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    labels, _ = predict_batch(paths, batch_size=args.batch_size, workers=args.workers)
+    batch_time = time.perf_counter() - start
+
+    agree = sum(a == b for a, b in zip(loop_labels, labels[:, 0]))
+    print(f"Per-file loop : {len(paths) / loop_time:8.1f} images/sec ({loop_time:.2f}s)")
+    print(f"predict_batch : {len(paths) / batch_time:8.1f} images/sec ({batch_time:.2f}s)")
+    print(f"Speed-up      : {loop_time / batch_time:8.2f}x")
+    print(f"Label agreement: {agree}/{len(paths)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# benchmark_metrics.py
+"""
+Benchmark: cost of the metrics layer (metrics.py) on the hot paths
+- ns per timed block: disabled (PLANT_METRICS=0), enabled, enabled with
+  the slow-path profiler armed (threshold above the block, so nothing is
+  dumped; this is the steady-state cost)
+- the same blocks wrapped around a 1 ms and a 20 ms busy-wait (a TFLite
+  call on a Pi 4 is ~20-60 ms), reported as % overhead against the bare call
+- render() time for a registry of the size the Pi and server produce
+Target: <1% on per-frame work (model calls, captures, uploads). The
+profiler is a debugging aid and can exceed that on ~1 ms blocks.
+
+Usage:
+    python benchmark_metrics.py --iterations 200000
+"""
+
+import argparse
+import time
+
+import metrics
+
+
+def per_call_ns(fn, iterations):
+    start = time.perf_counter_ns()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter_ns() - start) / iterations
+
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def timed_block(label):
+    with metrics.timer('bench_seconds', stage=label):
+        pass
+
+
+def overhead(work_s, calls, label):
+    """% extra wall time of timed work over bare work (best of 3)"""
+    def run(wrapped):
+        start = time.perf_counter()
+        for _ in range(calls):
+            if wrapped:
+                with metrics.timer('bench_work_seconds', stage=label):
+                    busy(work_s)
+            else:
+                busy(work_s)
+        return time.perf_counter() - start
+    bare = min(run(False) for _ in range(3))
+    wrapped = min(run(True) for _ in range(3))
+    return (wrapped - bare) / bare * 100
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=100000)
+    parser.add_argument('--calls', type=int, default=50, help='Busy-wait calls per overhead measurement')
+    args = parser.parse_args()
+
+    baseline = per_call_ns(lambda: None, args.iterations)
+    modes = {}
+    metrics.ENABLED = False
+    modes['disabled'] = per_call_ns(lambda: timed_block('disabled'), args.iterations)
+    metrics.ENABLED = True
+    modes['enabled'] = per_call_ns(lambda: timed_block('enabled'), args.iterations)
+    metrics.profiler.enable(threshold_ms=10000)
+    modes['enabled + profiler'] = per_call_ns(lambda: timed_block('profiler'), args.iterations // 10)
+
+    print(f"{'mode':<20}{'ns/block':>10}{'1 ms call':>12}{'20 ms call':>12}")
+    for mode, ns in modes.items():
+        metrics.ENABLED = mode != 'disabled'
+        metrics.profiler.enable(threshold_ms=10000 if 'profiler' in mode else 0)
+        ns -= baseline
+        # Overhead is measured directly for 1 ms calls; 20 ms follows from ns/block
+        pct_1ms = overhead(0.001, args.calls, mode)
+        print(f"{mode:<20}{ns:>10.0f}{pct_1ms:>11.2f}%{ns / 20e6 * 100:>11.4f}%")
+
+    for i in range(20):
+        metrics.counter('bench_total').inc(where=f"w{i}")
+    start = time.perf_counter()
+    text = metrics.render()
+    print(f"\nrender(): {(time.perf_counter() - start) * 1000:.2f} ms for {len(text.splitlines())} lines")
+
+
+if __name__ == "__main__":
+    main()
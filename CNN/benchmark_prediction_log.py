@@ -0,0 +1,95 @@
+# benchmark_prediction_log.py
+"""
+Benchmark: disease_predictions.csv vs the Parquet prediction log
+Generates a synthetic multi-day CSV, imports it, then compares:
+- size on disk
+- "frames where Rose_Rust > 80% in a 2-day window" query latency
+- single-frame lookup latency
+
+Usage:
+    python benchmark_prediction_log.py --rows 2000000 --days 30
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from prediction_log import CSV_TIME_FORMAT, PredictionLog
+
+CLASSES = ['Healthy_Leaf_Rose', 'Rose_Rust', 'Rose_sawfly_Rose_slug']
+
+
+def write_csv(path, rows, days, detections_per_frame=8):
+    rng = random.Random(0)
+    start = datetime(2025, 5, 1)
+    frames = rows // detections_per_frame
+    step = days * 86400 / max(frames, 1)
+    with open(path, 'w') as f:
+        f.write('FrameID,Timestamp,Disease,Confidence\n')
+        for frame in range(1, frames + 1):
+            ts = (start + timedelta(seconds=int(frame * step))).strftime(CSV_TIME_FORMAT)
+            for _ in range(detections_per_frame):
+                f.write(f"{frame},{ts},{rng.choice(CLASSES)},{rng.uniform(40, 100):.2f}\n")
+    return start, frames
+
+
+def dir_size(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, files in os.walk(path) for name in files)
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=2000000)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, 'disease_predictions.csv')
+        first_day, frames = write_csv(csv_path, args.rows, args.days)
+
+        log = PredictionLog(os.path.join(tmp, 'log'))
+        start = time.perf_counter()
+        log.import_csv(csv_path)
+        import_s = time.perf_counter() - start
+
+        window_start = first_day + timedelta(days=args.days // 2)
+        window_end = window_start + timedelta(days=2)
+        target_frame = frames // 2
+
+        def csv_query():
+            df = pd.read_csv(csv_path, parse_dates=['Timestamp'])
+            hit = df[(df.Disease == 'Rose_Rust') & (df.Confidence > 80)
+                     & (df.Timestamp >= window_start) & (df.Timestamp < window_end)]
+            return hit.FrameID.nunique()
+
+        def csv_frame():
+            df = pd.read_csv(csv_path)
+            return int((df.FrameID == target_frame).sum())
+
+        csv_q_ms, csv_hits = timed(csv_query, args.repeat)
+        log_q_ms, log_frames = timed(lambda: log.frames_where('Rose_Rust', 80, window_start, window_end), args.repeat)
+        csv_f_ms, _ = timed(csv_frame, args.repeat)
+        log_f_ms, _ = timed(lambda: log.frame(target_frame).num_rows, args.repeat)
+
+        print(f"Rows: {args.rows}  Days: {args.days}  Import: {import_s:.2f}s")
+        print(f"{'':<22}{'CSV':>12}{'Parquet':>12}")
+        print(f"{'Size (MB)':<22}{os.path.getsize(csv_path) / 1e6:>12.1f}{dir_size(log.root) / 1e6:>12.1f}")
+        print(f"{'Range query (ms)':<22}{csv_q_ms:>12.1f}{log_q_ms:>12.1f}   ({csv_hits} / {len(log_frames)} frames)")
+        print(f"{'Frame lookup (ms)':<22}{csv_f_ms:>12.1f}{log_f_ms:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
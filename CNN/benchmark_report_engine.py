@@ -0,0 +1,134 @@
+# benchmark_report_engine.py
+"""
+Benchmark: full report regeneration vs incremental ReportEngine updates
+For each size, writes a synthetic disease_predictions.csv (4 detections
+per frame, classes from class_labels) and times each report stage:
+- aggregate : full = read the whole CSV (pandas) and group by class;
+              incremental = append one frame and update running aggregates
+- charts    : draw_charts() after the aggregate step (O(classes) either way)
+- PDFs      : full = render a page for every frame, then stitch;
+              incremental = build_pdfs() with one new frame pending, which
+              renders that frame and stitches the existing segments
+Rendering every frame of a 1M-row CSV takes hours, so the full PDF build is
+timed on --pdf-frames frames and scaled linearly to the frame count
+(marked '~'). The incremental build stitches the segment left by that
+sample, so its stitch cost is also for --pdf-frames pages of history.
+
+Usage:
+    python benchmark_report_engine.py --rows 10000,1000000 --pdf-frames 100
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from Disease_prediction_py import class_labels
+from report_engine import CSV_HEADER, ReportEngine
+
+CLASSES = list(class_labels)
+DETECTIONS_PER_FRAME = 4
+
+
+def write_csv(path, rows):
+    rng = random.Random(0)
+    with open(path, 'w') as f:
+        f.write(",".join(CSV_HEADER) + "\n")
+        for i in range(rows):
+            frame = i // DETECTIONS_PER_FRAME + 1
+            f.write(f"{frame},2025-05-31 11:35:24,{rng.choice(CLASSES)},{rng.uniform(40, 99):.2f}\n")
+
+
+def write_thumbnail(path, size=224):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    rng = np.random.default_rng(0)
+    plt.imsave(path, rng.integers(0, 255, (size, size, 3), dtype=np.uint8))
+
+
+def timed(fn, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+# -----------------------------
+# 1. Full regeneration
+# -----------------------------
+def full_aggregate(engine):
+    df = pd.read_csv(engine.csv_path)
+    stats = df.groupby('Disease')['Confidence'].agg(['count', 'mean'])
+    engine.state['classes'] = {cls: [int(r['count']), float(r['mean'] * r['count'])] for cls, r in stats.iterrows()}
+
+
+def full_pdfs(engine, frames, image_path):
+    """Drop every segment and render pages for `frames` frames from scratch"""
+    engine.state['segments'] = []
+    engine.state['pending'] = {
+        str(i + 1): {'timestamp': '2025-05-31 11:35:24', 'image': image_path,
+                     'detections': [(CLASSES[(i + j) % len(CLASSES)], 75.0) for j in range(DETECTIONS_PER_FRAME)]}
+        for i in range(frames)
+    }
+    engine.build_pdfs()
+
+
+# -----------------------------
+# 2. Incremental update
+# -----------------------------
+def incremental_aggregate(engine, frame_id, image_path):
+    for j in range(DETECTIONS_PER_FRAME):
+        engine.append(frame_id, CLASSES[j % len(CLASSES)], 75.0, image_path=image_path)
+    engine.flush()
+
+
+# -----------------------------
+# 3. Main
+# -----------------------------
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', default='10000,1000000', help='Comma-separated CSV sizes')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--pdf-frames', type=int, default=100,
+                        help='Frames rendered for the full PDF build (scaled to the full frame count)')
+    args = parser.parse_args()
+
+    print(f"{'':>10}{'aggregate (ms)':>24}{'charts (ms)':>22}{'PDFs (ms)':>26}")
+    print(f"{'Rows':>10}{'full':>12}{'incr':>12}{'full':>11}{'incr':>11}{'full':>14}{'incr':>12}")
+    for rows in (int(r) for r in args.rows.split(',')):
+        frames = -(-rows // DETECTIONS_PER_FRAME)
+        sample = min(frames, args.pdf_frames)
+        with tempfile.TemporaryDirectory() as tmp:
+            image_path = os.path.join(tmp, 'thumb.png')
+            write_thumbnail(image_path)
+            write_csv(os.path.join(tmp, 'disease_predictions.csv'), rows)
+            engine = ReportEngine(tmp)          # one-time aggregate rebuild from the CSV
+            engine.draw_charts()                # warm up matplotlib before timing
+
+            agg_full = timed(lambda: full_aggregate(engine), args.repeat)
+            charts_full = timed(engine.draw_charts, args.repeat)
+            pdf_full = timed(lambda: full_pdfs(engine, sample, image_path)) * frames / sample
+
+            agg_incr = charts_incr = pdf_incr = 0.0
+            for i in range(args.repeat):
+                frame_id = frames + i + 1
+                agg_incr += timed(lambda: incremental_aggregate(engine, frame_id, image_path))
+                charts_incr += timed(engine.draw_charts)
+                pdf_incr += timed(engine.build_pdfs)
+            engine.close()
+
+        n = args.repeat
+        mark = '~' if sample < frames else ' '
+        print(f"{rows:>10}{agg_full * 1000:>12.1f}{agg_incr / n * 1000:>12.2f}"
+              f"{charts_full * 1000:>11.1f}{charts_incr / n * 1000:>11.1f}"
+              f"{mark:>4}{pdf_full * 1000:>10.0f}{pdf_incr / n * 1000:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+# benchmark_tiling.py
+"""
+Benchmark: tiled detection frames/sec as a function of tile count
+Runs detect_frame() on one frame at several strides (more overlap = more
+tiles) with the leaf-mask prefilter on and off.
+
+Usage:
+    python benchmark_tiling.py --image frame.jpg --strides 224,160,112,56 --backend tflite
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from Disease_prediction_py import get_backend, warm_up
+from tiled_detection import detect_frame, load_frame
+
+
+def synthetic_frame(height, width, seed=0):
+    """Greenish noise with a bare (non-leaf) band, so the prefilter has work to do"""
+    rng = np.random.default_rng(seed)
+    frame = rng.integers(0, 90, size=(height, width, 3), dtype=np.uint8)
+    frame[..., 1] += 120
+    frame[:, : width // 4] = rng.integers(90, 140, size=(height, width // 4, 3), dtype=np.uint8)
+    return frame
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--image', help='Full-resolution frame (default: synthetic 2592x1944)')
+    parser.add_argument('--strides', default='224,160,112,56')
+    parser.add_argument('--backend', default=None)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    frame = load_frame(args.image) if args.image else synthetic_frame(1944, 2592)
+    backend = get_backend(args.backend)
+    warm_up(backend)
+
+    print(f"Frame {frame.shape[1]}x{frame.shape[0]}")
+    print(f"{'stride':>7}{'prefilter':>11}{'tiles':>8}{'scored':>8}{'frames/s':>10}{'ms/tile':>9}")
+    for stride in (int(s) for s in args.strides.split(',')):
+        for min_leaf_area in (0.0, 0.15):
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                result = detect_frame(frame, stride=stride, min_leaf_area=min_leaf_area, backend=backend)
+            elapsed = (time.perf_counter() - start) / args.repeat
+            scored = max(result['tiles_scored'], 1)
+            print(f"{stride:>7}{'on' if min_leaf_area else 'off':>11}{result['tiles_total']:>8}"
+                  f"{result['tiles_scored']:>8}{1 / elapsed:>10.2f}{elapsed / scored * 1000:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+# benchmark_yolo.py
+"""
+Benchmark: YOLOv5 ONNX CPU latency per input size and batch size
+Export once with `python yolo_engine.py export` (dynamic axes), then:
+
+Usage:
+    python benchmark_yolo.py --onnx yolov5_rose_best.onnx --sizes 320,416,640 --batches 1,4 --threads 4
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from yolo_engine import ONNX_PATH, YoloEngine, letterbox_batch, load_rgb
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--onnx', default=ONNX_PATH)
+    parser.add_argument('--image', help='Camera frame to use (default: synthetic 1920x1080)')
+    parser.add_argument('--sizes', default='320,416,640')
+    parser.add_argument('--batches', default='1,4')
+    parser.add_argument('--threads', type=int, default=None)
+    parser.add_argument('--runtime', choices=['onnxruntime', 'opencv'], default='onnxruntime')
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    frame = load_rgb(args.image) if args.image else \
+        np.random.default_rng(0).integers(0, 255, size=(1080, 1920, 3), dtype=np.uint8)
+
+    print(f"{'size':>6}{'batch':>7}{'prep ms':>9}{'total ms/img':>14}{'img/s':>8}")
+    for size in (int(s) for s in args.sizes.split(',')):
+        engine = YoloEngine(args.onnx, img_size=size, num_threads=args.threads, runtime=args.runtime)
+        for batch_size in (int(b) for b in args.batches.split(',')):
+            images = [frame] * batch_size
+            engine.detect(images)   # warm-up
+
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                letterbox_batch(images, size)
+            prep = (time.perf_counter() - start) / args.repeat
+
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                engine.detect(images)
+            per_image = (time.perf_counter() - start) / args.repeat / batch_size
+            print(f"{size:>6}{batch_size:>7}{prep / batch_size * 1000:>9.2f}"
+                  f"{per_image * 1000:>14.2f}{1 / per_image:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+# cascade.py
+"""
+Cascade inference: MobileNetV2 classifier first, YOLOv5 detector only when needed
+- Every frame goes through the fast classifier (model.h5 / TFLite backend)
+- The detector (yolo_engine.YoloEngine) runs only on frames whose best
+  disease probability beats the healthy probability by at least `margin`
+  (margin -1 = detector on every frame, 1 = never)
+- Classifier and detector results are merged into one record per frame;
+  YOLO class names are mapped onto class_labels, so the final label is in
+  the same space as disease_predictions.csv
+- evaluate_cascade.py sweeps the margin to pick an operating point
+
+Usage:
+    python cascade.py leaf1.jpg leaf2.jpg --margin 0.2
+"""
+
+import time
+from datetime import datetime
+
+import numpy as np
+
+from Disease_prediction_py import IMG_SIZE, class_labels, get_backend, load_leaf_array
+from yolo_engine import DEFAULT_NAMES
+
+HEALTHY = 'healthy'
+DEFAULT_MARGIN = 0.2
+
+# -----------------------------
+# 1. Label mapping / gating
+# -----------------------------
+def canonical_label(name):
+    """YOLO class name (same class order as training) -> class_labels entry"""
+    if name in class_labels:
+        return name
+    if name in DEFAULT_NAMES:
+        return class_labels[DEFAULT_NAMES.index(name)]
+    return name.lower()
+
+def disease_margin(probs):
+    """Best disease probability minus healthy probability, per frame (N,)"""
+    healthy_idx = class_labels.index(HEALTHY)
+    disease = np.delete(probs, healthy_idx, axis=1)
+    return disease.max(axis=1) - probs[:, healthy_idx]
+
+def merge(probs, detections):
+    """
+    One frame's final (label, confidence 0-1, source).
+    Any diseased box wins over healthy ones (one sick leaf makes a sick
+    plant); without boxes the classifier's answer stands.
+    """
+    if detections:
+        diseased = [d for d in detections if canonical_label(d[4]) != HEALTHY]
+        best = max(diseased or detections, key=lambda d: d[5])
+        return canonical_label(best[4]), float(best[5]), 'detector'
+    idx = int(np.argmax(probs))
+    return class_labels[idx], float(probs[idx]), 'classifier'
+
+# -----------------------------
+# 2. Cascade
+# -----------------------------
+class CascadeDetector:
+    def __init__(self, backend=None, detector=None, margin=DEFAULT_MARGIN):
+        self.backend = get_backend(backend)
+        self._detector = detector           # YoloEngine, or None to create on first gated frame
+        self.margin = margin
+        self.stats = {'frames': 0, 'gated': 0, 'classifier_s': 0.0, 'detector_s': 0.0}
+
+    @property
+    def detector(self):
+        if self._detector is None:
+            from yolo_engine import YoloEngine
+            self._detector = YoloEngine()
+        return self._detector
+
+    def classify(self, images):
+        """(N, classes) probabilities for RGB uint8 frames"""
+        batch = np.empty((len(images),) + IMG_SIZE + (3,), dtype=np.float32)
+        for i, img in enumerate(images):
+            load_leaf_array(img, out=batch[i])
+        return np.asarray(self.backend.predict(batch))
+
+    def run(self, images, frame_ids=None, timestamps=None):
+        """
+        images: list of RGB uint8 arrays. Returns one dict per frame:
+        frame_id, timestamp, classifier, classifier_confidence, margin,
+        gated, detections, disease, confidence (percent), source
+        """
+        frame_ids = list(frame_ids) if frame_ids is not None else list(range(1, len(images) + 1))
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        timestamps = timestamps or [now] * len(images)
+
+        start = time.perf_counter()
+        probs = self.classify(images)
+        self.stats['classifier_s'] += time.perf_counter() - start
+        margins = disease_margin(probs)
+        gated = np.nonzero(margins >= self.margin)[0]
+
+        detections = [[] for _ in images]
+        if len(gated):
+            start = time.perf_counter()
+            for i, dets in zip(gated, self.detector.detect([images[i] for i in gated])):
+                detections[i] = dets
+            self.stats['detector_s'] += time.perf_counter() - start
+        self.stats['frames'] += len(images)
+        self.stats['gated'] += len(gated)
+
+        gated_set = set(gated.tolist())
+        records = []
+        for i, frame_id in enumerate(frame_ids):
+            top = int(np.argmax(probs[i]))
+            disease, confidence, source = merge(probs[i], detections[i])
+            records.append({
+                'frame_id': frame_id,
+                'timestamp': timestamps[i],
+                'classifier': class_labels[top],
+                'classifier_confidence': round(float(probs[i][top]) * 100, 2),
+                'margin': round(float(margins[i]), 4),
+                'gated': i in gated_set,
+                'detections': detections[i],
+                'disease': disease,
+                'confidence': round(confidence * 100, 2),
+                'source': source,
+            })
+        return records
+
+def record_rows(records):
+    """disease_predictions.csv rows (FrameID, Timestamp, Disease, Confidence%), one per frame"""
+    return [(r['frame_id'], r['timestamp'], r['disease'], r['confidence']) for r in records]
+
+# -----------------------------
+# 3. CLI
+# -----------------------------
+if __name__ == "__main__":
+    import argparse
+
+    from yolo_engine import load_rgb
+
+    parser = argparse.ArgumentParser(description="Classifier-gated YOLO detection")
+    parser.add_argument('images', nargs='+')
+    parser.add_argument('--margin', type=float, default=DEFAULT_MARGIN)
+    parser.add_argument('--backend', default=None)
+    args = parser.parse_args()
+
+    cascade = CascadeDetector(args.backend, margin=args.margin)
+    records = cascade.run([load_rgb(p) for p in args.images])
+    print("FrameID,Timestamp,Disease,Confidence,Source,Classifier,Margin")
+    for r in records:
+        print(f"{r['frame_id']},{r['timestamp']},{r['disease']},{r['confidence']},{r['source']},"
+              f"{r['classifier']},{r['margin']}")
+    s = cascade.stats
+    print(f"Detector ran on {s['gated']}/{s['frames']} frames "
+          f"(classifier {s['classifier_s']:.2f}s, detector {s['detector_s']:.2f}s)")
@@ -0,0 +1,189 @@
+# data_pipeline.py
+"""
+tf.data input pipeline for training (replaces ImageDataGenerator)
+- Parallel JPEG decode + resize (num_parallel_calls=AUTOTUNE)
+- Decoded 224x224 images cached as uint8, in memory or in a cache file,
+  so each JPEG is decoded once instead of once per epoch
+- Same augmentations as train_datagen (rotation, shift, flip, shear, zoom),
+  applied per batch as a single vectorized affine transform
+- Prefetching overlaps input preparation with training
+- make_shard_dataset() reads the pre-resized uint8 shards written by
+  dataset/ingest_dataset.py in sequential blocks (no per-file JPEG opens)
+"""
+
+import json
+import math
+import os
+
+import numpy as np
+import tensorflow as tf
+
+IMG_SIZE = (224, 224)
+IMAGE_EXTS = ('.jpg', '.jpeg', '.png', '.bmp')
+AUTOTUNE = tf.data.AUTOTUNE
+
+# Same values as train_datagen in model_train_for_disease_detect.py
+AUGMENTATION = {
+    'rotation_range': 20,         # degrees
+    'width_shift_range': 0.2,     # fraction of width
+    'height_shift_range': 0.2,    # fraction of height
+    'horizontal_flip': True,
+    'vertical_flip': True,
+    'shear_range': 0.2,           # degrees, as in ImageDataGenerator
+    'zoom_range': 0.2,            # zoom in [0.8, 1.2] per axis
+}
+
+# -----------------------------
+# 1. File listing
+# -----------------------------
+def list_image_files(directory):
+    """
+    Returns (paths, labels, class_names).
+    Class order is the sorted sub-folder order, same as flow_from_directory.
+    """
+    class_names = sorted(d for d in os.listdir(directory) if os.path.isdir(os.path.join(directory, d)))
+    paths, labels = [], []
+    for idx, cls in enumerate(class_names):
+        cls_dir = os.path.join(directory, cls)
+        for root, _, files in os.walk(cls_dir):
+            for name in sorted(files):
+                if name.lower().endswith(IMAGE_EXTS):
+                    paths.append(os.path.join(root, name))
+                    labels.append(idx)
+    return paths, labels, class_names
+
+# -----------------------------
+# 2. Decode / augment
+# -----------------------------
+def _decode_resize(path, img_size=IMG_SIZE):
+    img = tf.io.decode_image(tf.io.read_file(path), channels=3, expand_animations=False)
+    img = tf.image.resize(img, img_size)
+    # Cache as uint8: 4x smaller than float32
+    return tf.cast(tf.clip_by_value(tf.round(img), 0, 255), tf.uint8)
+
+def _uniform(shape, low, high, seed, salt):
+    if seed is None:
+        return tf.random.uniform(shape, low, high)
+    return tf.random.stateless_uniform(shape, seed=tf.stack([seed, tf.constant(salt, tf.int64)]), minval=low, maxval=high)
+
+def augment_images(images, seed=None, params=None):
+    """
+    Random affine augmentation of a float image batch (N, H, W, C).
+    Rotation, shear, zoom and flips are composed into one matrix about the
+    image centre, plus a shift, and applied in a single resampling pass.
+    Pass an int seed for reproducible (stateless) augmentation.
+    """
+    p = dict(AUGMENTATION, **(params or {}))
+    shape = tf.shape(images)
+    n = shape[0]
+    h = tf.cast(shape[1], tf.float32)
+    w = tf.cast(shape[2], tf.float32)
+    if seed is not None:
+        seed = tf.cast(seed, tf.int64)
+
+    theta = _uniform([n], -p['rotation_range'], p['rotation_range'], seed, 1) * (math.pi / 180)
+    shear = _uniform([n], -p['shear_range'], p['shear_range'], seed, 2) * (math.pi / 180)
+    zx = _uniform([n], 1 - p['zoom_range'], 1 + p['zoom_range'], seed, 3)
+    zy = _uniform([n], 1 - p['zoom_range'], 1 + p['zoom_range'], seed, 4)
+    tx = _uniform([n], -p['width_shift_range'], p['width_shift_range'], seed, 5) * w
+    ty = _uniform([n], -p['height_shift_range'], p['height_shift_range'], seed, 6) * h
+
+    ones = tf.ones([n])
+    fx = tf.where(_uniform([n], 0, 1, seed, 7) < 0.5, -ones, ones) if p['horizontal_flip'] else ones
+    fy = tf.where(_uniform([n], 0, 1, seed, 8) < 0.5, -ones, ones) if p['vertical_flip'] else ones
+
+    # M = Rotation @ Shear @ Zoom @ Flip  (maps output pixel -> input pixel)
+    cos_t, sin_t = tf.cos(theta), tf.sin(theta)
+    a00 = cos_t * zx * fx
+    a01 = (-cos_t * tf.sin(shear) - sin_t * tf.cos(shear)) * zy * fy
+    a10 = sin_t * zx * fx
+    a11 = (-sin_t * tf.sin(shear) + cos_t * tf.cos(shear)) * zy * fy
+
+    # Keep the centre fixed, then shift
+    cx, cy = (w - 1) / 2, (h - 1) / 2
+    b0 = cx - a00 * cx - a01 * cy + tx
+    b1 = cy - a10 * cx - a11 * cy + ty
+
+    zeros = tf.zeros([n])
+    transforms = tf.stack([a00, a01, b0, a10, a11, b1, zeros, zeros], axis=1)
+    return tf.raw_ops.ImageProjectiveTransformV3(
+        images=images,
+        transforms=transforms,
+        output_shape=shape[1:3],
+        fill_value=0.0,
+        interpolation='BILINEAR',
+        fill_mode='NEAREST',   # ImageDataGenerator default
+    )
+
+# -----------------------------
+# 3. Dataset builder
+# -----------------------------
+def make_dataset(directory, training, batch_size=32, img_size=IMG_SIZE, cache=True, seed=None):
+    """
+    Build a batched (images, one_hot_labels) dataset from a class-per-folder
+    directory. cache=True caches decoded images in memory, a string caches
+    them to that file (useful when the dataset does not fit in RAM),
+    cache=False disables caching.
+    Returns (dataset, class_names).
+    """
+    paths, labels, class_names = list_image_files(directory)
+    num_classes = len(class_names)
+
+    ds = tf.data.Dataset.from_tensor_slices((paths, labels))
+    ds = ds.map(lambda path, label: (_decode_resize(path, img_size), label),
+                num_parallel_calls=AUTOTUNE, deterministic=not training)
+    if cache:
+        if isinstance(cache, str) and os.path.dirname(cache):
+            os.makedirs(os.path.dirname(cache), exist_ok=True)
+        ds = ds.cache(cache if isinstance(cache, str) else '')
+    if training:
+        ds = ds.shuffle(len(paths), seed=seed, reshuffle_each_iteration=True)
+    ds = ds.batch(batch_size)
+    ds = ds.map(_model_input_fn(training, num_classes), num_parallel_calls=AUTOTUNE)
+    return ds.prefetch(AUTOTUNE), class_names
+
+def _model_input_fn(training, num_classes):
+    def to_model_input(images, batch_labels):
+        images = tf.cast(images, tf.float32) / 255.0   # rescale=1./255
+        if training:
+            images = augment_images(images)
+        return images, tf.one_hot(batch_labels, num_classes)
+    return to_model_input
+
+def make_shard_dataset(shard_dir, split, training, batch_size=32, block_size=256, seed=None):
+    """
+    Same output as make_dataset(), read from dataset/shards/<split>_images.u8.
+    Blocks of block_size consecutive images are read with one sequential
+    memmap slice; training shuffles block order plus a shuffle buffer of
+    a few blocks (rows are already in hash order, i.e. class-mixed).
+    Returns (dataset, class_names).
+    """
+    with open(os.path.join(shard_dir, 'shards.json')) as f:
+        meta = json.load(f)
+    class_names = meta['class_names']
+    count = meta[split]['count']
+    width, height = meta['img_size']
+    if count:
+        images = np.memmap(os.path.join(shard_dir, f'{split}_images.u8'), dtype=np.uint8, mode='r',
+                           shape=(count, height, width, 3))
+    else:
+        images = np.empty((0, height, width, 3), dtype=np.uint8)   # empty split: empty shard file
+    labels = np.load(os.path.join(shard_dir, f'{split}_labels.npy'))
+
+    def read_block(block):
+        start = int(block) * block_size
+        end = min(start + block_size, count)
+        return np.ascontiguousarray(images[start:end]), labels[start:end].astype(np.int32)
+
+    ds = tf.data.Dataset.range(math.ceil(count / block_size))
+    if training:
+        ds = ds.shuffle(math.ceil(count / block_size), seed=seed, reshuffle_each_iteration=True)
+    ds = ds.map(lambda b: tf.numpy_function(read_block, [b], (tf.uint8, tf.int32)),
+                num_parallel_calls=AUTOTUNE, deterministic=not training)
+    ds = ds.map(lambda x, y: (tf.ensure_shape(x, [None, height, width, 3]), tf.ensure_shape(y, [None])))
+    ds = ds.unbatch()
+    if training:
+        ds = ds.shuffle(4 * block_size, seed=seed, reshuffle_each_iteration=True)
+    ds = ds.batch(batch_size)
+    ds = ds.map(_model_input_fn(training, len(class_names)), num_parallel_calls=AUTOTUNE)
+    return ds.prefetch(AUTOTUNE), class_names
@@ -1,18 +1,30 @@
 # download_dataset.py
+"""
+Fetch the Kaggle archive once; ingest_dataset.py does the extraction.
+Credentials come from KAGGLE_USERNAME / KAGGLE_KEY or ~/.kaggle/kaggle.json.
+"""
 import os
-from kaggle.api.kaggle_api_extended import KaggleApi
-
-# Set Kaggle credentials
-os.environ['KAGGLE_USERNAME'] = "sriramprasathkumar"
-os.environ['KAGGLE_KEY'] = "1061d87c08c1102b844938ec40a44d30"
-
-# Initialize API
-api = KaggleApi()
-api.authenticate()
+import sys
 
 # Replace with your dataset path from Kaggle URL
 dataset_name = "shuvobasak4004/rose-leaf-disease-dataset"
+archive_path = os.path.join("dataset", dataset_name.split("/")[1] + ".zip")
+
+if os.path.exists(archive_path):
+    print(f"Archive already present: {archive_path}")
+else:
+    if not (os.environ.get('KAGGLE_USERNAME') and os.environ.get('KAGGLE_KEY')) \
+            and not os.path.exists(os.path.expanduser('~/.kaggle/kaggle.json')):
+        sys.exit("Set KAGGLE_USERNAME and KAGGLE_KEY (or ~/.kaggle/kaggle.json) first")
+
+    from kaggle.api.kaggle_api_extended import KaggleApi
+
+    # Initialize API
+    api = KaggleApi()
+    api.authenticate()
+
+    # Download only; the zip is kept so later runs (and ingestion) work offline
+    api.dataset_download_files(dataset_name, path="dataset", unzip=False)
+    print(f"Dataset archive downloaded to {archive_path}")
 
-# Download and unzip
-api.dataset_download_files(dataset_name, path="dataset", unzip=True)
-print("Dataset downloaded and extracted to 'dataset/' folder")
+print(f"Next: python dataset/ingest_dataset.py --archive {archive_path}")
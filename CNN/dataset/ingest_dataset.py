@@ -0,0 +1,308 @@
+# ingest_dataset.py
+"""
+Dataset ingestion (replaces re-downloading and unzipping on every run)
+- Source: a local archive (.zip, e.g. the Kaggle download) or a mirror
+  directory with one sub-folder per class
+- Images are extracted in parallel; a content-hash manifest (sha256)
+  records every source file, so unchanged files are skipped on re-runs and
+  an interrupted run resumes where it stopped
+- Identical images are stored once; the same image under two different
+  classes is a labelling conflict and is left out (listed in the manifest)
+- Deterministic train/val split from each image's hash: re-runs and new
+  images never move existing images between splits
+- Pre-resized 224x224 uint8 shards (NumPy memmap) for sequential reads,
+  see data_pipeline.make_shard_dataset()
+
+Usage (from CNN/):
+    python dataset/Dataset_file.py                       # once, fetches the archive
+    python dataset/ingest_dataset.py --archive dataset/rose-leaf-disease-dataset.zip
+    python dataset/ingest_dataset.py --mirror /mnt/share/rose_leaves --val-fraction 0.2
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+IMAGE_EXTS = ('.jpg', '.jpeg', '.png', '.bmp')
+IMG_SIZE = (224, 224)
+MANIFEST_NAME = 'manifest.json'
+SAVE_EVERY = 500   # manifest checkpoint interval (files)
+
+# -----------------------------
+# 1. Sources
+# -----------------------------
+def _class_of(rel_path):
+    """Class = the folder directly containing the image"""
+    parts = rel_path.replace('\\', '/').split('/')
+    return parts[-2] if len(parts) >= 2 else None
+
+def list_archive(archive_path):
+    """[(member, class, size, stamp)] for every image in a zip; stamp = CRC32"""
+    with zipfile.ZipFile(archive_path) as zf:
+        return [(info.filename, _class_of(info.filename), info.file_size, info.CRC)
+                for info in zf.infolist()
+                if not info.is_dir() and info.filename.lower().endswith(IMAGE_EXTS)]
+
+def list_mirror(mirror_dir):
+    """[(relative path, class, size, stamp)] for every image; stamp = mtime_ns"""
+    entries = []
+    for root, _, files in os.walk(mirror_dir):
+        for name in sorted(files):
+            if name.lower().endswith(IMAGE_EXTS):
+                path = os.path.join(root, name)
+                st = os.stat(path)
+                entries.append((os.path.relpath(path, mirror_dir), _class_of(os.path.relpath(path, mirror_dir)),
+                                st.st_size, st.st_mtime_ns))
+    return entries
+
+class _ArchiveReader:
+    """One ZipFile handle per worker thread (ZipFile is not safe to share)"""
+    def __init__(self, archive_path):
+        self.archive_path = archive_path
+        self._local = threading.local()
+
+    def read(self, member):
+        zf = getattr(self._local, 'zf', None)
+        if zf is None:
+            zf = self._local.zf = zipfile.ZipFile(self.archive_path)
+        return zf.read(member)
+
+class _MirrorReader:
+    def __init__(self, mirror_dir):
+        self.mirror_dir = mirror_dir
+
+    def read(self, rel_path):
+        with open(os.path.join(self.mirror_dir, rel_path), 'rb') as f:
+            return f.read()
+
+# -----------------------------
+# 2. Ingestion
+# -----------------------------
+class DatasetIngestor:
+    def __init__(self, out_dir='dataset', val_fraction=0.2, workers=8):
+        self.out_dir = out_dir
+        self.val_fraction = val_fraction
+        self.workers = workers
+        self.store_dir = os.path.join(out_dir, 'objects')   # one file per unique image, named by hash
+        self.manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+        self.manifest = {'sources': {}, 'conflicts': []}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                self.manifest.update(json.load(f))
+        self._lock = threading.Lock()
+
+    def _save_manifest(self):
+        tmp = self.manifest_path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.manifest, f)
+        os.replace(tmp, self.manifest_path)
+
+    def _object_path(self, sha, ext):
+        return os.path.join(self.store_dir, sha[:2], sha + ext)
+
+    def _ingest_one(self, reader, entry):
+        """Returns 'skipped' or 'extracted'"""
+        name, cls, size, stamp = entry
+        ext = os.path.splitext(name)[1].lower()
+        known = self.manifest['sources'].get(name)
+        if known and known['size'] == size and known['stamp'] == stamp \
+                and os.path.exists(self._object_path(known['sha256'], ext)):
+            return 'skipped'
+
+        data = reader.read(name)
+        sha = hashlib.sha256(data).hexdigest()
+        path = self._object_path(sha, ext)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, path)
+        with self._lock:
+            self.manifest['sources'][name] = {'class': cls, 'size': size, 'stamp': stamp, 'sha256': sha}
+        return 'extracted'
+
+    def ingest(self, entries, reader):
+        """Extract/hash every entry in parallel; drops sources no longer present"""
+        current = {e[0] for e in entries}
+        for name in list(self.manifest['sources']):
+            if name not in current:
+                del self.manifest['sources'][name]
+
+        counts = {'skipped': 0, 'extracted': 0}
+        entries = [e for e in entries if e[1]]
+        with ThreadPoolExecutor(self.workers) as pool:
+            for i, status in enumerate(pool.map(lambda e: self._ingest_one(reader, e), entries), 1):
+                counts[status] += 1
+                if i % SAVE_EVERY == 0:
+                    with self._lock:
+                        self._save_manifest()
+        self._save_manifest()
+        return counts
+
+    # ------- Dedupe + split -------
+    def unique_images(self):
+        """
+        {sha256: (class, ext)} with duplicates collapsed.
+        Hashes seen under more than one class are recorded as conflicts and excluded.
+        """
+        by_sha = {}
+        for name, src in sorted(self.manifest['sources'].items()):
+            by_sha.setdefault(src['sha256'], []).append((src['class'], os.path.splitext(name)[1].lower(), name))
+
+        images, conflicts = {}, []
+        for sha, copies in by_sha.items():
+            classes = sorted({c for c, _, _ in copies})
+            if len(classes) > 1:
+                conflicts.append({'sha256': sha, 'classes': classes, 'sources': [n for _, _, n in copies]})
+                continue
+            images[sha] = (classes[0], copies[0][1])
+        self.manifest['conflicts'] = conflicts
+        return images
+
+    def split_of(self, sha):
+        """Same answer for the same image on every run and every machine"""
+        return 'val' if int(sha[:8], 16) / 0x100000000 < self.val_fraction else 'train'
+
+    def write_splits(self, images):
+        """
+        Materialise dataset/train/<class>/ and dataset/val/<class>/ as hard links
+        into the object store (copies where links are unsupported). Files from an
+        earlier run that are no longer part of a split are removed.
+        """
+        wanted = {}
+        for sha, (cls, ext) in images.items():
+            wanted[os.path.join(self.out_dir, self.split_of(sha), cls, sha[:16] + ext)] = self._object_path(sha, ext)
+
+        # Only files this tool created before are removed; anything else in
+        # dataset/train or dataset/val is left alone
+        for path in self.manifest.get('split_files', []):
+            if path not in wanted and os.path.exists(path):
+                os.remove(path)
+        self.manifest['split_files'] = sorted(wanted)
+
+        for dst, src in wanted.items():
+            if os.path.exists(dst):
+                continue
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            try:
+                os.link(src, dst)
+            except OSError:
+                shutil.copyfile(src, dst)
+        return {split: sum(1 for sha in images if self.split_of(sha) == split) for split in ('train', 'val')}
+
+    # ------- Shards -------
+    def build_shards(self, images, img_size=IMG_SIZE):
+        """
+        dataset/shards/<split>_images.u8 : (N, H, W, 3) uint8 memmap
+        dataset/shards/<split>_labels.npy: (N,) int16 class index
+        Rows are ordered by hash, which is random with respect to class, so
+        sequential block reads are already well mixed. A split is only
+        rebuilt when its set of images changed.
+        """
+        shard_dir = os.path.join(self.out_dir, 'shards')
+        os.makedirs(shard_dir, exist_ok=True)
+        meta_path = os.path.join(shard_dir, 'shards.json')
+        meta = {}
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+
+        class_names = sorted({cls for cls, _ in images.values()})
+        meta['class_names'] = class_names
+        meta['img_size'] = list(img_size)
+        built = {}
+        for split in ('train', 'val'):
+            shas = sorted(sha for sha in images if self.split_of(sha) == split)
+            digest = hashlib.sha256(
+                ("".join(shas) + "|" + ",".join(class_names) + "|%dx%d" % img_size).encode()
+            ).hexdigest()
+            images_path = os.path.join(shard_dir, f'{split}_images.u8')
+            if meta.get(split, {}).get('digest') == digest and os.path.exists(images_path):
+                built[split] = 'unchanged'
+                continue
+
+            tmp_path = images_path + '.tmp'
+            labels = self._fill_shard(tmp_path, shas, images, class_names, img_size)
+            os.replace(tmp_path, images_path)
+            np.save(os.path.join(shard_dir, f'{split}_labels.npy'), labels)
+            meta[split] = {'count': len(shas), 'digest': digest}
+            built[split] = len(shas)
+
+        with open(meta_path, 'w') as f:
+            json.dump(meta, f, indent=2)
+        return built
+
+    def _fill_shard(self, path, shas, images, class_names, img_size):
+        """
+        Decode `shas` into a (len(shas), H, W, 3) uint8 memmap at path and
+        return their labels. An empty split gets an empty file, so the shard
+        and its labels always have the same length.
+        """
+        from PIL import Image
+
+        labels = np.empty(len(shas), dtype=np.int16)
+        if not shas:
+            open(path, 'wb').close()
+            return labels
+        array = np.memmap(path, dtype=np.uint8, mode='w+', shape=(len(shas), img_size[1], img_size[0], 3))
+
+        def load(i):
+            sha = shas[i]
+            cls, ext = images[sha]
+            with Image.open(self._object_path(sha, ext)) as img:
+                array[i] = np.asarray(img.convert('RGB').resize(img_size, Image.BILINEAR))
+            labels[i] = class_names.index(cls)
+
+        with ThreadPoolExecutor(self.workers) as pool:
+            list(pool.map(load, range(len(shas))))
+        array.flush()
+        return labels
+
+    def run(self, entries, reader, shards=True):
+        start = time.perf_counter()
+        counts = self.ingest(entries, reader)
+        images = self.unique_images()
+        self._save_manifest()
+        split_counts = self.write_splits(images)
+        self._save_manifest()
+        result = dict(counts, unique=len(images), conflicts=len(self.manifest['conflicts']), **split_counts)
+        if shards:
+            result['shards'] = self.build_shards(images)
+        result['seconds'] = round(time.perf_counter() - start, 2)
+        return result
+
+# -----------------------------
+# 3. CLI
+# -----------------------------
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--archive', help='Local .zip of the dataset')
+    source.add_argument('--mirror', help='Local directory with one sub-folder per class')
+    parser.add_argument('--out', default='dataset')
+    parser.add_argument('--val-fraction', type=float, default=0.2)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--no-shards', action='store_true')
+    args = parser.parse_args()
+
+    if args.archive:
+        entries, reader = list_archive(args.archive), _ArchiveReader(args.archive)
+    else:
+        entries, reader = list_mirror(args.mirror), _MirrorReader(args.mirror)
+
+    ingestor = DatasetIngestor(args.out, args.val_fraction, args.workers)
+    result = ingestor.run(entries, reader, shards=not args.no_shards)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
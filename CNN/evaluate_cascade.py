@@ -0,0 +1,173 @@
+# evaluate_cascade.py
+"""
+Evaluation: accuracy vs throughput of the classifier -> YOLO cascade
+Both models are run once over a labelled folder (one sub-folder per class,
+as in dataset/val), keeping per-frame outputs and timings. Every margin is
+then scored offline from those outputs, so the sweep costs no extra
+inference:
+- accuracy / disease recall of the merged per-frame label
+- share of frames sent to the detector
+- images/sec = frames / (classifier time + detector time of gated frames)
+Baselines: classifier only and detector only.
+
+Usage:
+    python evaluate_cascade.py --data dataset/val --backend tflite --min-accuracy 0.9 --plot cascade_curve.png
+"""
+
+import argparse
+import csv
+import glob
+import os
+import time
+
+import numpy as np
+from PIL import Image
+
+from cascade import HEALTHY, CascadeDetector, canonical_label, disease_margin, merge
+from Disease_prediction_py import class_labels, warm_up
+
+
+def load_labelled(data_dir, limit=None):
+    """[(path, canonical label)] from class sub-folders"""
+    items = []
+    for class_dir in sorted(glob.glob(os.path.join(data_dir, '*'))):
+        if not os.path.isdir(class_dir):
+            continue
+        label = canonical_label(os.path.basename(class_dir))
+        if label not in class_labels:
+            print(f"Skipping {class_dir}: not one of {class_labels}")
+            continue
+        paths = sorted(p for ext in ('jpg', 'jpeg', 'png') for p in glob.glob(os.path.join(class_dir, f'*.{ext}')))
+        items += [(p, label) for p in paths[:limit]]
+    return items
+
+
+def load_rgb(path):
+    with Image.open(path) as img:
+        return np.asarray(img.convert('RGB'))
+
+
+def run_models(cascade, items, batch_size):
+    """Classifier probs, detector outputs and per-frame seconds for every image"""
+    probs, detections, cls_s, det_s = [], [], [], []
+    for start in range(0, len(items), batch_size):
+        images = [load_rgb(p) for p, _ in items[start:start + batch_size]]
+        t = time.perf_counter()
+        probs.append(cascade.classify(images))
+        cls_s += [(time.perf_counter() - t) / len(images)] * len(images)
+        t = time.perf_counter()
+        detections += cascade.detector.detect(images)
+        det_s += [(time.perf_counter() - t) / len(images)] * len(images)
+    return np.concatenate(probs), detections, np.array(cls_s), np.array(det_s)
+
+
+def score(predicted, truth):
+    predicted, truth = np.asarray(predicted), np.asarray(truth)
+    sick = truth != HEALTHY
+    return {
+        'accuracy': float((predicted == truth).mean()),
+        'disease_recall': float((predicted[sick] != HEALTHY).mean()) if sick.any() else float('nan'),
+    }
+
+
+def sweep(probs, detections, truth, cls_s, det_s, margins):
+    """One row per operating point (margins, then the two baselines)"""
+    n = len(truth)
+    frame_margins = disease_margin(probs)
+    rows = []
+    for margin in margins:
+        gated = frame_margins >= margin
+        predicted = [merge(probs[i], detections[i] if gated[i] else [])[0] for i in range(n)]
+        seconds = cls_s.sum() + det_s[gated].sum()
+        rows.append(dict(mode='cascade', margin=float(margin), detector_share=float(gated.mean()),
+                         images_per_s=float(n / seconds), **score(predicted, truth)))
+
+    predicted = [class_labels[int(np.argmax(p))] for p in probs]
+    rows.append(dict(mode='classifier', margin=None, detector_share=0.0,
+                     images_per_s=float(n / cls_s.sum()), **score(predicted, truth)))
+    uniform = np.full(len(class_labels), 1.0 / len(class_labels))
+    predicted = [merge(uniform, d)[0] if d else HEALTHY for d in detections]
+    rows.append(dict(mode='detector', margin=None, detector_share=1.0,
+                     images_per_s=float(n / det_s.sum()), **score(predicted, truth)))
+    return rows
+
+
+def plot(rows, path):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    cascade_rows = [r for r in rows if r['mode'] == 'cascade']
+    fig, ax = plt.subplots(figsize=(7, 4))
+    ax.plot([r['images_per_s'] for r in cascade_rows], [r['accuracy'] for r in cascade_rows], 'o-', label='cascade')
+    for r in cascade_rows:
+        ax.annotate(f"{r['margin']:+.2f}", (r['images_per_s'], r['accuracy']), fontsize=7,
+                    textcoords='offset points', xytext=(3, 3))
+    for r in rows:
+        if r['mode'] != 'cascade':
+            ax.plot(r['images_per_s'], r['accuracy'], 's', label=f"{r['mode']} only")
+    ax.set_xlabel('Images / second')
+    ax.set_ylabel('Accuracy')
+    ax.set_title('Cascade accuracy vs throughput (labels = margin)')
+    ax.legend()
+    fig.tight_layout()
+    fig.savefig(path, dpi=100)
+    plt.close(fig)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data', default='dataset/val')
+    parser.add_argument('--limit', type=int, default=None, help='Images per class')
+    parser.add_argument('--backend', default=None)
+    parser.add_argument('--onnx', default=None, help='YOLO ONNX model (default: yolo_engine.ONNX_PATH)')
+    parser.add_argument('--batch-size', type=int, default=8)
+    parser.add_argument('--margins', default='-1,-0.5,-0.25,0,0.1,0.2,0.3,0.5,0.75,1')
+    parser.add_argument('--min-accuracy', type=float, default=None, help='Report the fastest margin reaching this')
+    parser.add_argument('--csv', default=None)
+    parser.add_argument('--plot', default=None)
+    args = parser.parse_args()
+
+    items = load_labelled(args.data, args.limit)
+    if not items:
+        raise SystemExit(f"No labelled images under {args.data}")
+    detector = None
+    if args.onnx:
+        from yolo_engine import YoloEngine
+        detector = YoloEngine(args.onnx)
+    cascade = CascadeDetector(args.backend, detector)
+    warm_up(cascade.backend)
+    cascade.detector.detect([load_rgb(items[0][0])])   # warm-up
+
+    probs, detections, cls_s, det_s = run_models(cascade, items, args.batch_size)
+    truth = [label for _, label in items]
+    rows = sweep(probs, detections, truth, cls_s, det_s, [float(m) for m in args.margins.split(',')])
+
+    print(f"{len(items)} images from {args.data}")
+    print(f"{'mode':<11}{'margin':>8}{'detector %':>12}{'images/s':>10}{'accuracy':>10}{'recall':>8}")
+    for r in rows:
+        margin = f"{r['margin']:+.2f}" if r['margin'] is not None else '-'
+        print(f"{r['mode']:<11}{margin:>8}{r['detector_share'] * 100:>12.0f}{r['images_per_s']:>10.2f}"
+              f"{r['accuracy']:>10.3f}{r['disease_recall']:>8.3f}")
+
+    if args.min_accuracy is not None:
+        ok = [r for r in rows if r['mode'] == 'cascade' and r['accuracy'] >= args.min_accuracy]
+        if ok:
+            best = max(ok, key=lambda r: r['images_per_s'])
+            print(f"\nOperating point: margin {best['margin']:+.2f} -> {best['images_per_s']:.2f} images/s, "
+                  f"accuracy {best['accuracy']:.3f}, detector on {best['detector_share'] * 100:.0f}% of frames")
+        else:
+            print(f"\nNo margin reaches accuracy {args.min_accuracy}")
+
+    if args.csv:
+        with open(args.csv, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+    if args.plot:
+        plot(rows, args.plot)
+        print(f"Curve saved to {args.plot}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# export_tflite.py
+"""
+Export the trained model.h5 to TensorFlow Lite for the Raspberry Pi.
+- model_fp16.tflite : float16 weights, float32 compute
+- model_int8.tflite : full int8 quantization, calibrated on dataset/val
+Then compares every variant against model.h5 on the validation set (CPU only):
+file size, per-image latency and accuracy delta.
+"""
+
+import os
+
+# Measure on CPU only, like the Pi
+os.environ.setdefault('CUDA_VISIBLE_DEVICES', '-1')
+
+import time
+
+import numpy as np
+import tensorflow as tf
+
+from Disease_prediction_py import IMG_SIZE, KerasBackend, TFLiteBackend, load_leaf_image
+
+# -----------------------------
+# 1. Paths and settings
+# -----------------------------
+keras_model_path = 'model.h5'
+val_dir = 'dataset/val'
+fp16_path = 'model_fp16.tflite'
+int8_path = 'model_int8.tflite'
+
+representative_samples = 200   # Images used to calibrate int8 ranges
+num_threads = os.cpu_count() or 1
+IMAGE_EXTS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+# -----------------------------
+# 2. Validation images
+# -----------------------------
+def list_val_images(folder):
+    """(path, class_index) pairs; class order matches flow_from_directory (sorted)"""
+    classes = sorted(d for d in os.listdir(folder) if os.path.isdir(os.path.join(folder, d)))
+    samples = []
+    for idx, cls in enumerate(classes):
+        cls_dir = os.path.join(folder, cls)
+        for name in sorted(os.listdir(cls_dir)):
+            if name.lower().endswith(IMAGE_EXTS):
+                samples.append((os.path.join(cls_dir, name), idx))
+    return samples
+
+val_samples = list_val_images(val_dir)
+print(f"Validation images: {len(val_samples)}")
+
+def representative_dataset():
+    """Spread calibration images evenly over all classes"""
+    rng = np.random.default_rng(0)
+    count = min(representative_samples, len(val_samples))
+    for i in rng.choice(len(val_samples), size=count, replace=False):
+        path, _ = val_samples[i]
+        yield [np.expand_dims(load_leaf_image(path), axis=0).astype(np.float32)]
+
+# -----------------------------
+# 3. Convert
+# -----------------------------
+keras_model = tf.keras.models.load_model(keras_model_path)
+
+converter = tf.lite.TFLiteConverter.from_keras_model(keras_model)
+converter.optimizations = [tf.lite.Optimize.DEFAULT]
+converter.target_spec.supported_types = [tf.float16]
+with open(fp16_path, 'wb') as f:
+    f.write(converter.convert())
+print(f"Saved {fp16_path}")
+
+converter = tf.lite.TFLiteConverter.from_keras_model(keras_model)
+converter.optimizations = [tf.lite.Optimize.DEFAULT]
+converter.representative_dataset = representative_dataset
+converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+converter.inference_input_type = tf.int8
+converter.inference_output_type = tf.int8
+with open(int8_path, 'wb') as f:
+    f.write(converter.convert())
+print(f"Saved {int8_path}")
+
+# -----------------------------
+# 4. Evaluate size / latency / accuracy
+# -----------------------------
+def evaluate(backend):
+    """Batch-1 latency (like the Pi) and top-1 accuracy over val_samples"""
+    backend.predict(np.zeros((1,) + IMG_SIZE + (3,), dtype=np.float32))  # warm-up
+    correct = 0
+    infer_time = 0.0
+    for path, label in val_samples:
+        batch = np.expand_dims(load_leaf_image(path), axis=0)
+        start = time.perf_counter()
+        preds = backend.predict(batch)
+        infer_time += time.perf_counter() - start
+        correct += int(np.argmax(preds[0]) == label)
+    n = max(len(val_samples), 1)
+    return correct / n, infer_time / n * 1000
+
+results = []
+for name, path, backend in [
+    ('keras (.h5)', keras_model_path, KerasBackend(keras_model_path)),
+    ('tflite fp16', fp16_path, TFLiteBackend(fp16_path, num_threads)),
+    ('tflite int8', int8_path, TFLiteBackend(int8_path, num_threads)),
+]:
+    accuracy, latency_ms = evaluate(backend)
+    results.append((name, os.path.getsize(path) / 1e6, latency_ms, accuracy))
+
+baseline_acc = results[0][3]
+print(f"\n{'Model':<14}{'Size (MB)':>10}{'ms/image':>10}{'Accuracy':>10}{'Delta':>9}")
+for name, size_mb, latency_ms, accuracy in results:
+    print(f"{name:<14}{size_mb:>10.2f}{latency_ms:>10.2f}{accuracy * 100:>9.2f}%"
+          f"{(accuracy - baseline_acc) * 100:>+8.2f}%")
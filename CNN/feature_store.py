@@ -0,0 +1,252 @@
+# feature_store.py
+"""
+Frozen-backbone feature cache for fast head training
+- The MobileNetV2 backbone is frozen during training, so its pooled
+  1280-d output for a given (image, augmentation seed) never changes.
+- Features are computed once and kept in a memory-mapped float32 file;
+  entries are recomputed only when the source image changes (size/mtime).
+- The GlobalAveragePooling2D + Dense(1024) + softmax head is then trained
+  directly from the store (seconds on CPU), and grafted back onto the
+  backbone to produce a normal model.h5.
+
+Usage:
+    python feature_store.py     # builds/updates feature_cache/ and writes model.h5
+"""
+
+import json
+import os
+import zlib
+
+import numpy as np
+
+FEATURE_DIM = 1280   # MobileNetV2 pooled output
+
+# -----------------------------
+# 1. Memory-mapped store
+# -----------------------------
+class FeatureStore:
+    """
+    features.f32 : raw float32 matrix (capacity, FEATURE_DIM), memory-mapped
+    index.json   : "<path>|<seed>" -> {row, size, mtime_ns}
+    Labels are not stored: a feature row depends only on the image, while
+    class indices shift when class folders are added or renamed, so they
+    always come from the caller's current list_image_files() result.
+    """
+
+    def __init__(self, store_dir, feature_dim=FEATURE_DIM):
+        self.store_dir = store_dir
+        self.feature_dim = feature_dim
+        self.data_path = os.path.join(store_dir, 'features.f32')
+        self.index_path = os.path.join(store_dir, 'index.json')
+        os.makedirs(store_dir, exist_ok=True)
+
+        self.index = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path) as f:
+                self.index = json.load(f)
+
+        self.capacity = 0
+        self.features = None
+        if os.path.exists(self.data_path):
+            self.capacity = os.path.getsize(self.data_path) // (4 * feature_dim)
+        used = {entry['row'] for entry in self.index.values()}
+        self.free_rows = sorted(set(range(self.capacity)) - used, reverse=True)
+        self._open()
+
+    def _open(self):
+        if self.capacity:
+            self.features = np.memmap(self.data_path, dtype=np.float32, mode='r+',
+                                      shape=(self.capacity, self.feature_dim))
+
+    def _grow(self, min_free):
+        """Extend the backing file (at least doubling) so min_free rows are available"""
+        new_capacity = max(self.capacity * 2, self.capacity + min_free, 1024)
+        if self.features is not None:
+            self.features.flush()
+            del self.features
+        with open(self.data_path, 'ab') as f:
+            f.truncate(new_capacity * 4 * self.feature_dim)
+        self.free_rows = list(range(new_capacity - 1, self.capacity - 1, -1)) + self.free_rows
+        self.capacity = new_capacity
+        self._open()
+
+    @staticmethod
+    def key(path, seed):
+        return f"{path}|{seed}"
+
+    @staticmethod
+    def _signature(path):
+        st = os.stat(path)
+        return st.st_size, st.st_mtime_ns
+
+    def is_fresh(self, path, seed):
+        entry = self.index.get(self.key(path, seed))
+        if entry is None:
+            return False
+        try:
+            size, mtime_ns = self._signature(path)
+        except OSError:
+            return False
+        return entry['size'] == size and entry['mtime_ns'] == mtime_ns
+
+    def put_many(self, paths, seed, feats):
+        """Store one feature row per path, reusing the row of a stale entry"""
+        new_keys = [self.key(p, seed) for p in paths if self.key(p, seed) not in self.index]
+        if len(new_keys) > len(self.free_rows):
+            self._grow(len(new_keys) - len(self.free_rows))
+        for path, feat in zip(paths, feats):
+            k = self.key(path, seed)
+            entry = self.index.get(k)
+            row = entry['row'] if entry else self.free_rows.pop()
+            size, mtime_ns = self._signature(path)
+            self.features[row] = feat
+            self.index[k] = {'row': row, 'size': size, 'mtime_ns': mtime_ns}
+
+    def prune(self, valid_paths):
+        """Drop entries whose source file is gone; their rows are reused later"""
+        valid = set(valid_paths)
+        for k in [k for k in self.index if k.rsplit('|', 1)[0] not in valid]:
+            self.free_rows.append(self.index.pop(k)['row'])
+
+    def rows(self, paths, labels, seeds):
+        """
+        Return (features, labels) for every (path, seed) pair present in the
+        store; labels[i] is the current class index of paths[i]
+        """
+        pairs = [(self.index[self.key(p, s)], l) for s in seeds for p, l in zip(paths, labels)
+                 if self.key(p, s) in self.index]
+        rows = np.array([e['row'] for e, _ in pairs], dtype=np.int64)
+        labels = np.array([l for _, l in pairs], dtype=np.int64)
+        feats = np.empty((len(rows), self.feature_dim), dtype=np.float32)
+        if len(rows):
+            order = np.argsort(rows)   # sequential reads from the memmap
+            feats[order] = self.features[rows[order]]
+        return feats, labels
+
+    def save(self):
+        if self.features is not None:
+            self.features.flush()
+        tmp = self.index_path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.index, f)
+        os.replace(tmp, self.index_path)
+
+# -----------------------------
+# 2. Feature extraction
+# -----------------------------
+def build_backbone(img_size=(224, 224)):
+    """Frozen MobileNetV2 + global average pooling -> (N, 1280)"""
+    from tensorflow.keras.applications import MobileNetV2
+    backbone = MobileNetV2(weights='imagenet', include_top=False, pooling='avg',
+                           input_shape=img_size + (3,))
+    backbone.trainable = False
+    return backbone
+
+def update_store(store, backbone, paths, seeds, batch_size=64):
+    """
+    Run the backbone only for (path, seed) pairs that are missing or stale.
+    seed 0 = un-augmented image; other seeds get a deterministic augmentation.
+    """
+    import tensorflow as tf
+    from data_pipeline import _decode_resize, augment_images
+
+    computed = 0
+    for seed in seeds:
+        todo_paths = [p for p in paths if not store.is_fresh(p, seed)]
+        if not todo_paths:
+            continue
+        # Per-image seed: same augmentation for the same file, whatever the batch
+        image_seeds = [zlib.crc32(p.encode()) * 1000 + seed for p in todo_paths]
+
+        def load(path, image_seed):
+            img = tf.cast(_decode_resize(path), tf.float32) / 255.0
+            if seed:
+                img = augment_images(img[None], seed=image_seed)[0]
+            return img
+
+        ds = tf.data.Dataset.from_tensor_slices((todo_paths, image_seeds))
+        ds = ds.map(load, num_parallel_calls=tf.data.AUTOTUNE).batch(batch_size).prefetch(tf.data.AUTOTUNE)
+
+        start = 0
+        for images in ds:
+            feats = backbone(images, training=False).numpy()
+            end = start + len(feats)
+            store.put_many(todo_paths[start:end], seed, feats)
+            start = end
+        computed += len(todo_paths)
+        print(f"Seed {seed}: computed {len(todo_paths)} feature rows")
+    store.save()
+    return computed
+
+# -----------------------------
+# 3. Head training
+# -----------------------------
+def build_head(num_classes, feature_dim=FEATURE_DIM):
+    """Same Dense(1024) + softmax head as model_train_for_disease_detect.py"""
+    from tensorflow.keras.layers import Dense, Input
+    from tensorflow.keras.models import Model
+
+    inputs = Input(shape=(feature_dim,))
+    x = Dense(1024, activation='relu', name='head_dense')(inputs)
+    outputs = Dense(num_classes, activation='softmax', name='head_output')(x)
+    return Model(inputs, outputs)
+
+def graft_head(backbone, head):
+    """Backbone + trained head -> full 224x224 classifier, saved like model.h5"""
+    from tensorflow.keras.models import Model
+    x = backbone.output
+    for layer in head.layers[1:]:
+        x = layer(x)
+    return Model(inputs=backbone.input, outputs=x)
+
+def train_head(store, train_paths, train_labels, val_paths, val_labels, num_classes, seeds, epochs=10, batch_size=32):
+    """Labels are the current class indices from list_image_files(), never the store's"""
+    from tensorflow.keras.optimizers import Adam
+    from tensorflow.keras.utils import to_categorical
+
+    x_train, y_train = store.rows(train_paths, train_labels, seeds)
+    x_val, y_val = store.rows(val_paths, val_labels, [0])
+
+    head = build_head(num_classes, store.feature_dim)
+    head.compile(optimizer=Adam(learning_rate=0.0001), loss='categorical_crossentropy', metrics=['accuracy'])
+    history = head.fit(
+        x_train, to_categorical(y_train, num_classes),
+        validation_data=(x_val, to_categorical(y_val, num_classes)),
+        epochs=epochs, batch_size=batch_size, shuffle=True
+    )
+    return head, history
+
+# -----------------------------
+# 4. Run
+# -----------------------------
+if __name__ == "__main__":
+    import time
+
+    from data_pipeline import list_image_files
+
+    train_dir = 'dataset/train'
+    val_dir = 'dataset/val'
+    store_dir = 'feature_cache'
+    augment_copies = 4          # Augmented variants per training image (seeds 1..N)
+    epochs = 10
+
+    start = time.perf_counter()
+    train_paths, train_labels, class_labels = list_image_files(train_dir)
+    val_paths, val_labels, _ = list_image_files(val_dir)
+    print("Detected classes:", class_labels)
+
+    store = FeatureStore(store_dir)
+    store.prune(train_paths + val_paths)
+    backbone = build_backbone()
+    seeds = list(range(augment_copies + 1))
+    update_store(store, backbone, train_paths, seeds)
+    update_store(store, backbone, val_paths, [0])
+    print(f"Feature cache ready in {time.perf_counter() - start:.1f}s")
+
+    start = time.perf_counter()
+    head, history = train_head(store, train_paths, train_labels, val_paths, val_labels, len(class_labels), seeds,
+                               epochs=epochs)
+    print(f"Head trained in {time.perf_counter() - start:.1f}s")
+
+    graft_head(backbone, head).save('model.h5')
+    print("Training complete. Model saved as 'model.h5'")
@@ -0,0 +1,199 @@
+# inference_server.py
+"""
+CNN Inference Server (the other side of CNN_SERVER_URL in main_pi.py)
+- POST /upload with a multipart 'file' field (JPEG/PNG), decoded in memory
+- Requests arriving within max_wait_ms of each other are grouped into one
+  model batch (up to max_batch_size) by a single batching thread
+- Returns 503 + Retry-After when the queue is full (backpressure)
+- Optional prediction cache: identical or near-duplicate frames (dHash
+  within --cache-threshold bits) are answered without running the model
+- GET /health reports queue depth, batching and cache statistics
+- GET /metrics: the same plus latency histograms in Prometheus text format
+
+Usage:
+    python inference_server.py --port 5000 --max-batch-size 16 --max-wait-ms 5
+"""
+
+import argparse
+import atexit
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+from flask import Flask, Response, jsonify, request
+
+from Disease_prediction_py import (IMG_SIZE, get_backend, load_leaf_image_bytes, model_identity, top_k_predictions,
+                                   warm_up)
+from metrics import histogram, register_stats, render, timer
+from prediction_cache import PredictionCache, make_result
+
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+# ====== Micro-batching ======
+class MicroBatcher:
+    """
+    Collects single images from many request threads and runs them through
+    the model together. The first image of a batch waits at most max_wait_ms
+    for company before the batch is sent.
+    """
+
+    def __init__(self, backend, max_batch_size=16, max_wait_ms=5.0, max_queue=256, top_k=3):
+        self.backend = backend
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.top_k = top_k
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.stats = {'batches': 0, 'images': 0, 'rejected': 0, 'errors': 0}
+        self._batch = np.empty((max_batch_size,) + IMG_SIZE + (3,), dtype=np.float32)
+        self._batch_sizes = histogram('inference_batch_size', 'Images per model batch', BATCH_BUCKETS)
+        register_stats('inference_batcher', lambda: dict(self.stats, queue_depth=self.queue.qsize()))
+        self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, img_array):
+        """Queue one (224, 224, 3) image; raises queue.Full when overloaded"""
+        future = Future()
+        try:
+            self.queue.put_nowait((img_array, future))
+        except queue.Full:
+            self.stats['rejected'] += 1
+            raise
+        return future
+
+    def _collect(self):
+        items = [self.queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(items) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                items.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return items
+
+    def _run(self):
+        while True:
+            items = self._collect()
+            n = len(items)
+            for i, (img_array, _) in enumerate(items):
+                self._batch[i] = img_array
+            try:
+                with timer('leaf_model_seconds', backend=getattr(self.backend, 'name', 'custom')):
+                    preds = np.asarray(self.backend.predict(self._batch[:n]))
+                labels, confidences = top_k_predictions(preds, top_k=self.top_k)
+            except Exception as e:
+                self.stats['errors'] += 1
+                for _, future in items:
+                    future.set_exception(e)
+                continue
+
+            self.stats['batches'] += 1
+            self.stats['images'] += n
+            self._batch_sizes.observe(n)
+            for i, (_, future) in enumerate(items):
+                future.set_result((labels[i], confidences[i], n))
+
+# ====== Flask app ======
+def create_app(batcher, cache=None, request_timeout=30.0):
+    app = Flask(__name__)
+    model = model_identity(batcher.backend)
+
+    if cache is not None:
+        register_stats('prediction_cache', lambda: dict(cache.stats, entries=len(cache)))
+
+    @app.route('/upload', methods=['POST'])
+    def upload():
+        with timer('inference_request_seconds', 'Time per /upload request'):
+            return _upload()
+
+    def _upload():
+        start = time.perf_counter()
+        file = request.files.get('file')
+        if file is None:
+            return jsonify({'error': "missing multipart field 'file'"}), 400
+
+        data = file.read()
+        if cache is not None:
+            try:
+                cached, sha, phash = cache.lookup(data, model)
+            except Exception as e:
+                return jsonify({'error': f'could not decode image: {e}'}), 400
+            if cached is not None:
+                latency_ms = round((time.perf_counter() - start) * 1000, 2)
+                return jsonify(dict(cached, cached=True, latency_ms=latency_ms))
+
+        try:
+            img_array = load_leaf_image_bytes(data)
+        except Exception as e:
+            return jsonify({'error': f'could not decode image: {e}'}), 400
+
+        try:
+            future = batcher.submit(img_array)
+        except queue.Full:
+            response = jsonify({'error': 'server busy, retry later'})
+            response.headers['Retry-After'] = '1'
+            return response, 503
+
+        try:
+            labels, confidences, batch_size = future.result(timeout=request_timeout)
+        except Exception as e:
+            return jsonify({'error': f'inference failed: {e}'}), 500
+
+        result = make_result(labels, confidences)
+        if cache is not None:
+            cache.put(sha, phash, result, model)
+
+        latency_ms = round((time.perf_counter() - start) * 1000, 2)
+        return jsonify(dict(result, cached=False, batch_size=batch_size, latency_ms=latency_ms))
+
+    @app.route('/health', methods=['GET'])
+    def health():
+        status = {'status': 'ok', 'queue_depth': batcher.queue.qsize(), **batcher.stats}
+        if cache is not None:
+            status['cache'] = dict(cache.stats, entries=len(cache), bytes=cache.total_bytes)
+        return jsonify(status)
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        return Response(render(), mimetype='text/plain; version=0.0.4')
+
+    return app
+
+# ====== Main ======
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--backend', default=None, help="'keras' or 'tflite' (default: LEAF_BACKEND)")
+    parser.add_argument('--model', default=None, help='Model file for the chosen backend')
+    parser.add_argument('--threads', type=int, default=None, help='TFLite interpreter threads')
+    parser.add_argument('--max-batch-size', type=int, default=16)
+    parser.add_argument('--max-wait-ms', type=float, default=5.0)
+    parser.add_argument('--max-queue', type=int, default=256, help='Queued images before returning 503')
+    parser.add_argument('--top-k', type=int, default=3)
+    parser.add_argument('--cache-entries', type=int, default=1024, help='0 disables the prediction cache')
+    parser.add_argument('--cache-bytes', type=int, default=4 << 20)
+    parser.add_argument('--cache-threshold', type=int, default=4, help='Max dHash Hamming distance for a hit')
+    parser.add_argument('--cache-file', default=None, help='Persist the cache to this JSON file')
+    args = parser.parse_args()
+
+    backend = get_backend(args.backend, model_path=args.model, num_threads=args.threads)
+    warm_up(backend)
+    batcher = MicroBatcher(backend, args.max_batch_size, args.max_wait_ms, args.max_queue, args.top_k)
+
+    cache = None
+    if args.cache_entries > 0:
+        cache = PredictionCache(args.cache_entries, args.cache_bytes, args.cache_threshold, args.cache_file)
+        atexit.register(cache.save)
+
+    app = create_app(batcher, cache)
+    print(f"🧠 CNN server listening on http://{args.host}:{args.port}/upload")
+    app.run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+# load_generator.py
+"""
+Load generator for inference_server.py
+Posts leaf images from N concurrent clients (like many Pis) and reports
+throughput and p50/p99 latency for each concurrency level.
+- Every request carries a distinct variant of the input image (random crop,
+  flip/rotation, a coarse brightness pattern that scrambles its dHash, and
+  pixel noise, re-encoded as JPEG), so the server's prediction cache neither
+  exact- nor near-matches and the numbers measure micro-batching. The 'cached' column shows any hits that still happen;
+  use --variants 1 to measure the cache instead.
+
+Usage:
+    python load_generator.py sample_leaf.jpg --url http://localhost:5000/upload \
+        --concurrency 1,4,16,64 --requests 200
+"""
+
+import argparse
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+
+def make_variants(data, count, seed=0):
+    """`count` visually distinct JPEG encodings of one image (index 0 is the original)"""
+    from PIL import Image
+
+    rng = np.random.default_rng(seed)
+    with Image.open(io.BytesIO(data)) as img:
+        base = np.asarray(img.convert('RGB'))
+    variants = [data]
+    for _ in range(count - 1):
+        h, w = base.shape[:2]
+        ch, cw = int(h * rng.uniform(0.7, 1.0)), int(w * rng.uniform(0.7, 1.0))
+        top, left = rng.integers(0, h - ch + 1), rng.integers(0, w - cw + 1)
+        pixels = np.rot90(base[top:top + ch, left:left + cw], k=int(rng.integers(4)))
+        if rng.random() < 0.5:
+            pixels = pixels[:, ::-1]
+        # A random 8x9 brightness grid, upsampled: sets the dHash's gradient bits at random
+        grid = Image.fromarray(rng.integers(0, 256, (8, 9), dtype=np.uint8)).resize(pixels.shape[1::-1])
+        shade = (np.asarray(grid, dtype=np.float32)[..., None] - 128) * 0.4
+        noisy = np.clip(pixels + shade + rng.normal(0, 8, pixels.shape), 0, 255).astype(np.uint8)
+        out = io.BytesIO()
+        Image.fromarray(noisy).save(out, format='JPEG', quality=90)
+        variants.append(out.getvalue())
+    return variants
+
+
+def run_level(url, payloads, filename, concurrency, total_requests):
+    """Fire total_requests uploads using `concurrency` client threads"""
+    latencies = []
+    status_counts = {}
+    batch_sizes = []
+    cached = []
+    counter = iter(range(total_requests))
+
+    def worker(n):
+        session = requests.Session()
+        for _ in range(n):
+            payload = payloads[next(counter) % len(payloads)]
+            start = time.perf_counter()
+            try:
+                response = session.post(url, files={'file': (filename, payload, 'image/jpeg')}, timeout=60)
+                status = response.status_code
+                if status == 200:
+                    body = response.json()
+                    if body.get('cached'):
+                        cached.append(1)
+                    else:
+                        batch_sizes.append(body['batch_size'])
+            except requests.RequestException:
+                status = 'error'
+            latencies.append(time.perf_counter() - start)
+            status_counts[status] = status_counts.get(status, 0) + 1
+
+    per_worker = [total_requests // concurrency] * concurrency
+    for i in range(total_requests % concurrency):
+        per_worker[i] += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, per_worker))
+    elapsed = time.perf_counter() - start
+
+    lat_ms = np.array(latencies) * 1000
+    return {
+        'concurrency': concurrency,
+        'throughput': total_requests / elapsed,
+        'p50_ms': float(np.percentile(lat_ms, 50)),
+        'p99_ms': float(np.percentile(lat_ms, 99)),
+        'mean_batch': float(np.mean(batch_sizes)) if batch_sizes else 0.0,
+        'cached': len(cached),
+        'status': status_counts,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('image', help='Leaf image to upload')
+    parser.add_argument('--url', default='http://localhost:5000/upload')
+    parser.add_argument('--concurrency', default='1,4,16,64', help='Comma-separated client counts')
+    parser.add_argument('--requests', type=int, default=200, help='Requests per concurrency level')
+    parser.add_argument('--variants', type=int, default=None,
+                        help='Distinct payloads to cycle through (default: one per request over all levels)')
+    args = parser.parse_args()
+
+    with open(args.image, 'rb') as f:
+        data = f.read()
+    levels = [int(c) for c in args.concurrency.split(',')]
+    # Fresh images across levels too, so a later level never hits what an earlier one cached
+    payloads = make_variants(data, args.variants or args.requests * len(levels))
+
+    print(f"{'Clients':>8}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'avg batch':>11}{'cached':>8}  status")
+    for i, level in enumerate(levels):
+        offset = (i * args.requests) % len(payloads)
+        r = run_level(args.url, payloads[offset:] + payloads[:offset], args.image, level, args.requests)
+        print(f"{r['concurrency']:>8}{r['throughput']:>10.1f}{r['p50_ms']:>10.1f}{r['p99_ms']:>10.1f}"
+              f"{r['mean_batch']:>11.2f}{r['cached']:>8}  {r['status']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,398 @@
+# metrics.py
+"""
+Lightweight instrumentation shared by the CNN and Raspberry Pi code
+- Counters, gauges and histograms (fixed buckets, optional labels) in one
+  process-wide registry; no third-party client library needed
+- timer('name', stage=...) times a block or function into a histogram
+- Existing `stats` dicts (MicroBatcher, TelegramDispatcher, caches, ...)
+  are exposed as-is with register_stats() instead of being rewritten
+- render() produces the Prometheus text format (serve() / the /metrics
+  routes / the bot's /metrics command); summary_text() is a short human
+  version for Telegram
+- SlowPathProfiler: while a timed block runs, a background thread samples
+  its stack; if the block ends up slower than a threshold the samples are
+  written as collapsed stacks (flamegraph.pl / speedscope input)
+- PLANT_METRICS=0 turns timers into no-ops; PLANT_PROFILE_SLOW_MS enables
+  the profiler for blocks slower than that many milliseconds
+"""
+
+import bisect
+import inspect
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter as _Tally
+from datetime import datetime
+from functools import wraps
+
+ENABLED = os.environ.get('PLANT_METRICS', '1') != '0'
+SLOW_MS = float(os.environ.get('PLANT_PROFILE_SLOW_MS', '0') or 0)
+PROFILE_DIR = os.environ.get('PLANT_PROFILE_DIR', 'slow_stacks')
+
+# Seconds: 1 ms .. 60 s, roughly x2.5 per bucket
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# -----------------------------
+# 1. Metric types
+# -----------------------------
+def _label_key(labels):
+    return tuple(sorted(labels.items())) if labels else ()
+
+def _escape_label(value):
+    """Label value escaping required by the Prometheus text format"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(key, extra=None):
+    items = list(key) + ([extra] if extra else [])
+    if not items:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape_label(v)}"' for k, v in items) + '}'
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, help_text=''):
+        self.name = name
+        self.help = help_text
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self):
+        return [(self.name, key, value) for key, value in self.values.items()]
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        self.values[_label_key(labels)] = value
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, help_text='', buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self.series = {}            # label key -> [bucket counts..., +Inf count], sum
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        self.observe_key(_label_key(labels), value)
+
+    def observe_key(self, key, value):
+        """observe() with a precomputed label key (timers build it once)"""
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][i] += 1
+            series[1] += value
+
+    def samples(self):
+        out = []
+        for key, (counts, total) in self.series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                out.append((self.name + '_bucket', key, cumulative, ('le', le)))
+            out.append((self.name + '_sum', key, total))
+            out.append((self.name + '_count', key, cumulative))
+        return out
+
+    def quantile(self, q, **labels):
+        """Upper bucket bound containing quantile q (None if empty)"""
+        series = self.series.get(_label_key(labels))
+        if not series:
+            return None
+        counts = series[0]
+        target = q * sum(counts)
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += count
+            if cumulative >= target:
+                return bound
+        return float('inf')
+
+# -----------------------------
+# 2. Registry
+# -----------------------------
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self.stats_sources = {}     # prefix -> callable returning a flat dict of numbers
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, help_text, **kwargs):
+        metric = self.metrics.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self.metrics.get(name)
+                if metric is None:
+                    metric = self.metrics[name] = cls(name, help_text, **kwargs)
+        if help_text and not metric.help:
+            metric.help = help_text
+        return metric
+
+    def counter(self, name, help_text=''):
+        return self._get(Counter, name, help_text)
+
+    def gauge(self, name, help_text=''):
+        return self._get(Gauge, name, help_text)
+
+    def histogram(self, name, help_text='', buckets=DEFAULT_BUCKETS):
+        return self._get(Histogram, name, help_text, buckets=buckets)
+
+    def register_stats(self, prefix, source):
+        """Expose a stats dict (or a callable returning one) as gauges prefix_<key>"""
+        self.stats_sources[prefix] = source if callable(source) else (lambda: source)
+
+    def _stats_samples(self):
+        out = []
+        for prefix, source in list(self.stats_sources.items()):
+            try:
+                stats = source()
+            except Exception:
+                continue
+            for key, value in stats.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    out.append((re.sub(r'\W', '_', f"{prefix}_{key}"), value))
+        return out
+
+    def render(self):
+        """Prometheus text exposition format"""
+        lines = []
+        for metric in list(self.metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.help or metric.name}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for sample in metric.samples():
+                name, key, value = sample[:3]
+                extra = sample[3] if len(sample) > 3 else None
+                lines.append(f"{name}{_format_labels(key, extra)} {value}")
+        for name, value in self._stats_samples():
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+    def summary_text(self):
+        """Compact per-series view for chat: counters, and count / mean / ~p95 of timers"""
+        lines = []
+        for metric in list(self.metrics.values()):
+            if isinstance(metric, Histogram):
+                for key, (counts, total) in sorted(metric.series.items()):
+                    n = sum(counts)
+                    p95 = metric.quantile(0.95, **dict(key))
+                    lines.append(f"{metric.name}{_format_labels(key)}: n={n} avg {total / n * 1000:.1f}ms "
+                                 f"p95<={p95 * 1000:.0f}ms")
+            else:
+                for key, value in sorted(metric.values.items()):
+                    lines.append(f"{metric.name}{_format_labels(key)}: {value:g}")
+        for name, value in self._stats_samples():
+            lines.append(f"{name}: {value:g}")
+        return "\n".join(lines) or "No metrics recorded yet"
+
+REGISTRY = Registry()
+
+def counter(name, help_text=''):
+    return REGISTRY.counter(name, help_text)
+
+def gauge(name, help_text=''):
+    return REGISTRY.gauge(name, help_text)
+
+def histogram(name, help_text='', buckets=DEFAULT_BUCKETS):
+    return REGISTRY.histogram(name, help_text, buckets)
+
+def register_stats(prefix, source):
+    REGISTRY.register_stats(prefix, source)
+
+def render():
+    return REGISTRY.render()
+
+def summary_text():
+    return REGISTRY.summary_text()
+
+# -----------------------------
+# 3. Timers
+# -----------------------------
+class _Timer:
+    __slots__ = ('hist', 'labels', 'key', 'start', 'token')
+
+    def __init__(self, hist, labels):
+        self.hist = hist
+        self.labels = labels
+        self.key = _label_key(labels)
+
+    def __enter__(self):
+        self.token = profiler.enter(self.hist.name, self.labels) if profiler.active else None
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        elapsed = time.perf_counter() - self.start
+        self.hist.observe_key(self.key, elapsed)
+        if exc_type is not None:
+            REGISTRY.counter('plant_errors_total', 'Exceptions inside timed blocks').inc(where=self.hist.name)
+        if self.token is not None:
+            profiler.exit(self.token, elapsed)
+        return False
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_TIMER = _NullTimer()
+
+def timer(name, help_text='', **labels):
+    """
+    with timer('leaf_model_seconds', backend='tflite'): ...
+    (decorator form: timed())
+    """
+    if not ENABLED:
+        return _NULL_TIMER
+    hist = REGISTRY.metrics.get(name)
+    if hist is None or (help_text and not hist.help):
+        hist = REGISTRY.histogram(name, help_text)
+    return _Timer(hist, labels)
+
+def timed(name, **labels):
+    """Decorator form of timer(); coroutine functions are timed until they finish"""
+    def decorate(fn):
+        if inspect.iscoroutinefunction(fn):
+            @wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with timer(name, **labels):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timer(name, **labels):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+# -----------------------------
+# 4. Slow-path sampling profiler
+# -----------------------------
+class SlowPathProfiler:
+    """
+    Samples the stacks of threads inside timed blocks every `interval`
+    seconds. Blocks that finish faster than threshold_ms drop their
+    samples; slower ones are appended to <out_dir>/<metric>.folded as
+    'frame;frame;frame count' lines.
+    """
+
+    def __init__(self, threshold_ms=0.0, interval=0.005, out_dir=PROFILE_DIR, max_depth=64):
+        self.threshold = threshold_ms / 1000.0
+        self.interval = interval
+        self.out_dir = out_dir
+        self.max_depth = max_depth
+        self.active = threshold_ms > 0
+        self._sections = {}         # token -> [thread id, name, labels, Counter of stacks]
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._tokens = 0
+        self.dumps = 0
+
+    def enable(self, threshold_ms, interval=None, out_dir=None):
+        self.threshold = threshold_ms / 1000.0
+        self.interval = interval or self.interval
+        self.out_dir = out_dir or self.out_dir
+        self.active = threshold_ms > 0
+
+    def enter(self, name, labels):
+        with self._lock:
+            self._tokens += 1
+            token = self._tokens
+            self._sections[token] = [threading.get_ident(), name, labels, _Tally()]
+            # Started under the lock so two first callers cannot start two samplers
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='slow-path-profiler', daemon=True)
+                self._thread.start()
+        self._wake.set()
+        return token
+
+    def exit(self, token, elapsed):
+        with self._lock:
+            section = self._sections.pop(token, None)
+            if not self._sections:
+                self._wake.clear()
+        if section is not None and elapsed >= self.threshold and section[3]:
+            self._dump(section, elapsed)
+
+    def _stack(self, frame):
+        names = []
+        while frame is not None and len(names) < self.max_depth:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+            frame = frame.f_back
+        return ';'.join(reversed(names))
+
+    def _run(self):
+        me = threading.get_ident()
+        while True:
+            self._wake.wait()
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self._lock:
+                for thread_id, _name, _labels, tally in self._sections.values():
+                    frame = frames.get(thread_id)
+                    if frame is not None and thread_id != me:
+                        tally[self._stack(frame)] += 1
+
+    def _dump(self, section, elapsed):
+        _, name, labels, tally = section
+        os.makedirs(self.out_dir, exist_ok=True)
+        suffix = ''.join(f"_{v}" for _, v in sorted(labels.items()))
+        path = os.path.join(self.out_dir, f"{name}{suffix}.folded")
+        with open(path, 'a') as f:
+            f.write(f"# {datetime.now():%Y-%m-%d %H:%M:%S} {elapsed * 1000:.0f} ms\n")
+            for stack, count in tally.most_common():
+                f.write(f"{stack} {count}\n")
+        self.dumps += 1
+        REGISTRY.counter('plant_slow_path_dumps_total', 'Slow blocks written as stacks').inc(where=name)
+
+profiler = SlowPathProfiler(SLOW_MS)
+
+# -----------------------------
+# 5. HTTP endpoint
+# -----------------------------
+def serve(port=9108, host='127.0.0.1'):
+    """
+    Background /metrics endpoint (plain http.server, one daemon thread).
+    Unauthenticated, so loopback only unless a host is given explicitly.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = render().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+    return server
@@ -3,6 +3,13 @@
 Rose Plant Disease Detection - CNN Training Script
 Trains a CNN on rose leaf images to classify diseases.
 Generates model.h5 for predictions.
+Input comes from the tf.data pipeline in data_pipeline.py (parallel decode,
+cached images, prefetch); set USE_TF_DATA = False for ImageDataGenerator.
+If dataset/ingest_dataset.py has written 224x224 shards, those are read
+instead of the individual JPEGs.
+To retrain only the head in seconds from cached backbone features, run
+feature_store.py instead. For threaded/XLA/bfloat16 training and the
+two-phase fine-tuning schedule, see training_profiles.py.
 """
 
 import os
@@ -12,44 +19,61 @@ from tensorflow.keras.layers import Dense, GlobalAveragePooling2D
 from tensorflow.keras.applications import MobileNetV2
 from tensorflow.keras.optimizers import Adam
 
+from data_pipeline import make_dataset, make_shard_dataset
+
 # -----------------------------
 # 1. Dataset paths
 # -----------------------------
 train_dir = 'dataset/train'  # Training images
 val_dir = 'dataset/val'      # Validation images
+shard_dir = 'dataset/shards' # Packed 224x224 shards from dataset/ingest_dataset.py
+
+USE_TF_DATA = True           # False = legacy ImageDataGenerator input
+CACHE = True                 # True = cache decoded images in RAM, or a file path e.g. 'cache/train'
 
 # -----------------------------
-# 2. Image Data Generators
+# 2. Input pipeline
 # -----------------------------
-train_datagen = ImageDataGenerator(
-    rescale=1./255,
-    rotation_range=20,
-    width_shift_range=0.2,
-    height_shift_range=0.2,
-    horizontal_flip=True,
-    vertical_flip=True,
-    shear_range=0.2,
-    zoom_range=0.2
-)
+if USE_TF_DATA and os.path.exists(os.path.join(shard_dir, 'shards.json')):
+    train_generator, class_labels = make_shard_dataset(shard_dir, 'train', training=True, batch_size=32)
+    val_generator, _ = make_shard_dataset(shard_dir, 'val', training=False, batch_size=32)
+elif USE_TF_DATA:
+    train_generator, class_labels = make_dataset(train_dir, training=True, batch_size=32, cache=CACHE)
+    val_generator, _ = make_dataset(
+        val_dir, training=False, batch_size=32,
+        cache=(CACHE + '_val') if isinstance(CACHE, str) else CACHE
+    )
+else:
+    train_datagen = ImageDataGenerator(
+        rescale=1./255,
+        rotation_range=20,
+        width_shift_range=0.2,
+        height_shift_range=0.2,
+        horizontal_flip=True,
+        vertical_flip=True,
+        shear_range=0.2,
+        zoom_range=0.2
+    )
 
-val_datagen = ImageDataGenerator(rescale=1./255)
+    val_datagen = ImageDataGenerator(rescale=1./255)
 
-train_generator = train_datagen.flow_from_directory(
-    train_dir,
-    target_size=(224, 224),
-    batch_size=32,
-    class_mode='categorical'
-)
+    train_generator = train_datagen.flow_from_directory(
+        train_dir,
+        target_size=(224, 224),
+        batch_size=32,
+        class_mode='categorical'
+    )
 
-val_generator = val_datagen.flow_from_directory(
-    val_dir,
-    target_size=(224, 224),
-    batch_size=32,
-    class_mode='categorical'
-)
+    val_generator = val_datagen.flow_from_directory(
+        val_dir,
+        target_size=(224, 224),
+        batch_size=32,
+        class_mode='categorical'
+    )
+
+    # Get class labels
+    class_labels = list(train_generator.class_indices.keys())
 
-# Get class labels
-class_labels = list(train_generator.class_indices.keys())
 num_classes = len(class_labels)
 print("Detected classes:", class_labels)
 
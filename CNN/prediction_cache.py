@@ -0,0 +1,157 @@
+# prediction_cache.py
+"""
+Prediction cache for repeated and near-duplicate frames
+- Exact key: SHA-256 of the image bytes
+- Near-duplicate key: 64-bit dHash of an 9x8 grayscale thumbnail; a cached
+  entry is reused when the Hamming distance is <= hamming_threshold
+- LRU eviction bounded by entry count and approximate bytes
+- Entries are scoped to a model identity (backend, path, version): the
+  exact key hashes it with the image, and near-duplicate matches only
+  consider entries of the same model, so a retrained model or a second
+  backend sharing a persisted file never sees another model's answers
+- One value schema for every caller (see make_result):
+  {'disease', 'confidence' (0-1), 'predictions': [{'disease', 'confidence'}, ...]}
+- Optional JSON persistence so the cache survives restarts
+- Hit/miss counters in .stats
+"""
+
+import hashlib
+import io
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+ENTRY_OVERHEAD = 96   # Approximate bytes for keys and bookkeeping per entry
+
+# -----------------------------
+# 1. Hashing
+# -----------------------------
+def content_hash(data, model=''):
+    h = hashlib.sha256(model.encode() + b'\0')
+    h.update(data)
+    return h.hexdigest()
+
+def dhash(data, hash_size=8):
+    """Difference hash of an encoded image: 1 bit per horizontal gradient sign"""
+    from PIL import Image
+    with Image.open(io.BytesIO(data)) as img:
+        img.draft('L', (hash_size * 8, hash_size * 8))   # fast JPEG downscale on decode
+        small = img.convert('L').resize((hash_size + 1, hash_size), Image.BILINEAR)
+        px = np.asarray(small, dtype=np.int16)
+    bits = (px[:, 1:] > px[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+def hamming_distances(hashes, value):
+    """Vectorized popcount(hashes XOR value) over a uint64 array"""
+    xor = np.bitwise_xor(hashes, np.uint64(value))
+    return np.unpackbits(xor.view(np.uint8)).reshape(-1, 64).sum(axis=1)
+
+def make_result(labels, confidences):
+    """Cache value for one image from its top-k labels/confidences (best first)"""
+    return {
+        'disease': str(labels[0]),
+        'confidence': float(confidences[0]),
+        'predictions': [{'disease': str(label), 'confidence': float(conf)} for label, conf in zip(labels, confidences)],
+    }
+
+# -----------------------------
+# 2. Cache
+# -----------------------------
+class PredictionCache:
+    def __init__(self, max_entries=1024, max_bytes=1 << 20, hamming_threshold=4, persist_path=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hamming_threshold = hamming_threshold
+        self.persist_path = persist_path
+        self.entries = OrderedDict()     # sha256(model, image) -> (dhash, model, result, size)
+        self.total_bytes = 0
+        self.stats = {'exact_hits': 0, 'near_hits': 0, 'misses': 0, 'evictions': 0}
+        self._lock = threading.Lock()
+        if persist_path and os.path.exists(persist_path):
+            self.load()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def lookup(self, data, model=''):
+        """
+        Returns (result or None, sha, phash) for this image under `model`.
+        sha/phash can be passed to put() on a miss so the image is not hashed twice.
+        """
+        sha = content_hash(data, model)
+        with self._lock:
+            entry = self.entries.get(sha)
+            if entry is not None:
+                self.entries.move_to_end(sha)
+                self.stats['exact_hits'] += 1
+                return entry[2], sha, entry[0]
+
+        phash = dhash(data)
+        with self._lock:
+            keys = [k for k, entry in self.entries.items() if entry[1] == model]
+            if keys and self.hamming_threshold > 0:
+                hashes = np.fromiter((self.entries[k][0] for k in keys), dtype=np.uint64, count=len(keys))
+                distances = hamming_distances(hashes, phash)
+                best = int(np.argmin(distances))
+                if distances[best] <= self.hamming_threshold:
+                    self.entries.move_to_end(keys[best])
+                    self.stats['near_hits'] += 1
+                    return self.entries[keys[best]][2], sha, phash
+            self.stats['misses'] += 1
+        return None, sha, phash
+
+    def put(self, sha, phash, result, model=''):
+        """Store a make_result() value; model must match the one passed to lookup()"""
+        size = len(json.dumps(result)) + len(model) + ENTRY_OVERHEAD
+        with self._lock:
+            old = self.entries.pop(sha, None)
+            if old is not None:
+                self.total_bytes -= old[3]
+            self.entries[sha] = (phash, model, result, size)
+            self.total_bytes += size
+            while self.entries and (len(self.entries) > self.max_entries or self.total_bytes > self.max_bytes):
+                _, (_, _, _, evicted_size) = self.entries.popitem(last=False)
+                self.total_bytes -= evicted_size
+                self.stats['evictions'] += 1
+
+    def get_or_compute(self, data, compute, model=''):
+        """Return the cached result for these image bytes, or compute(data) and cache it"""
+        result, sha, phash = self.lookup(data, model)
+        if result is None:
+            result = compute(data)
+            self.put(sha, phash, result, model)
+        return result
+
+    def hit_rate(self):
+        hits = self.stats['exact_hits'] + self.stats['near_hits']
+        total = hits + self.stats['misses']
+        return hits / total if total else 0.0
+
+    # ------- Persistence -------
+    def save(self, path=None):
+        path = path or self.persist_path
+        if not path:
+            return
+        with self._lock:
+            rows = [[sha, phash, model, result] for sha, (phash, model, result, _) in self.entries.items()]
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(rows, f)
+        os.replace(tmp, path)
+
+    def load(self, path=None):
+        path = path or self.persist_path
+        try:
+            with open(path) as f:
+                rows = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Prediction cache not loaded: {e}")
+            return
+        for row in rows:
+            # Files written before entries carried a model identity are skipped
+            if len(row) == 4 and isinstance(row[3], dict):
+                sha, phash, model, result = row
+                self.put(sha, phash, result, model)
@@ -0,0 +1,276 @@
+# prediction_log.py
+"""
+Columnar prediction log (Parquet via pyarrow)
+- Rows are written to date=YYYY-MM-DD/part-NNNNNN.parquet (partitioned by day)
+- Small writes (the Pi logs a few rows per cycle) leave many tiny parts;
+  once a day has more than max_parts of them they are merged into one
+  (compact()), so the file count and query time stay bounded
+- Schema: frame_id int64, timestamp, disease dictionary-encoded,
+  confidence float32 (percent, like disease_predictions.csv)
+- query() uses partition pruning + row-group statistics (predicate pushdown),
+  so "Rose_Rust > 80% last week" reads only the matching row groups
+- frame_index.jsonl maps frame-id ranges to (file, row group) for direct
+  per-frame lookups without scanning
+- import_csv() / export_csv() keep the existing CSV consumers working
+"""
+
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+SCHEMA = pa.schema([
+    ('frame_id', pa.int64()),
+    ('timestamp', pa.timestamp('s')),
+    ('disease', pa.dictionary(pa.int8(), pa.string())),
+    ('confidence', pa.float32()),
+])
+CSV_TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# -----------------------------
+# 1. Prediction log
+# -----------------------------
+class PredictionLog:
+    def __init__(self, root='prediction_log', row_group_size=64 * 1024, max_parts=32):
+        self.root = root
+        self.row_group_size = row_group_size
+        self.max_parts = max_parts          # small part files per day before they are merged
+        self.index_path = os.path.join(root, 'frame_index.jsonl')
+        os.makedirs(root, exist_ok=True)
+        self._index = None
+        self._seq = self._next_seq()
+
+    def _next_seq(self):
+        seqs = [int(name[5:11]) for _, _, files in os.walk(self.root)
+                for name in files if name.startswith('part-') and name.endswith('.parquet')]
+        return max(seqs, default=-1) + 1
+
+    # ------- Writes -------
+    def write(self, frame_ids, timestamps, diseases, confidences):
+        """
+        Append a batch of predictions (parallel sequences). Each call writes
+        one new part file per day touched; a day that then has more than
+        max_parts small parts is compacted.
+        """
+        table = pa.table({
+            'frame_id': pa.array(frame_ids, pa.int64()),
+            'timestamp': pa.array(timestamps, pa.timestamp('s')),
+            'disease': pa.array(diseases, pa.string()).dictionary_encode().cast(SCHEMA.field('disease').type),
+            'confidence': pa.array(confidences, pa.float32()),
+        }, schema=SCHEMA)
+        if table.num_rows == 0:
+            return 0
+
+        days = pc.strftime(table['timestamp'], format='%Y-%m-%d')
+        index_lines = []
+        touched = pc.unique(days).to_pylist()
+        for day in touched:
+            part = table.filter(pc.equal(days, day)).sort_by('frame_id')
+            os.makedirs(os.path.join(self.root, f'date={day}'), exist_ok=True)
+            index_lines += self._write_part(day, part)
+
+        with open(self.index_path, 'a') as f:
+            for entry in index_lines:
+                f.write(json.dumps(entry) + '\n')
+        self._index = None
+
+        for day in touched:
+            if len(self._small_parts(day)) > self.max_parts:
+                self.compact(day)
+        return table.num_rows
+
+    def _write_part(self, day, part):
+        """Write one part file; returns its frame_index.jsonl entries"""
+        rel_path = os.path.join(f'date={day}', f'part-{self._seq:06d}.parquet')
+        self._seq += 1
+        # Written under a '.'-prefixed name (ignored by dataset()) and renamed into place
+        tmp = os.path.join(self.root, f'date={day}', f'.{os.path.basename(rel_path)}.tmp')
+        pq.write_table(part, tmp, row_group_size=self.row_group_size, use_dictionary=['disease'],
+                       compression='zstd', write_statistics=True)
+        os.replace(tmp, os.path.join(self.root, rel_path))
+
+        entries = []
+        frame_col = part['frame_id'].to_numpy()
+        for rg, start in enumerate(range(0, part.num_rows, self.row_group_size)):
+            chunk = frame_col[start:start + self.row_group_size]
+            entries.append({'file': rel_path, 'row_group': rg,
+                            'min_frame': int(chunk.min()), 'max_frame': int(chunk.max())})
+        return entries
+
+    # ------- Compaction -------
+    def _small_parts(self, day):
+        """Part files of one day holding less than one full row group"""
+        day_dir = os.path.join(self.root, f'date={day}')
+        if not os.path.isdir(day_dir):
+            return []
+        parts = sorted(os.path.join(f'date={day}', name) for name in os.listdir(day_dir)
+                       if name.startswith('part-') and name.endswith('.parquet'))
+        return [p for p in parts
+                if pq.ParquetFile(os.path.join(self.root, p)).metadata.num_rows < self.row_group_size]
+
+    def compact(self, day=None):
+        """
+        Merge the small part files of `day` (or of every day) into one part
+        and rewrite frame_index.jsonl. Returns the number of parts removed.
+        """
+        if day is None:
+            days = [name[5:] for name in sorted(os.listdir(self.root)) if name.startswith('date=')]
+            return sum(self.compact(d) for d in days)
+
+        small = self._small_parts(day)
+        if len(small) < 2:
+            return 0
+        merged = pa.concat_tables([
+            pq.read_table(os.path.join(self.root, p), columns=SCHEMA.names).cast(SCHEMA) for p in small
+        ]).sort_by('frame_id')
+        new_entries = self._write_part(day, merged)
+
+        removed = set(small)
+        entries = [e for e in self._load_index()[0] if e['file'] not in removed] + new_entries
+        tmp = self.index_path + '.tmp'
+        with open(tmp, 'w') as f:
+            for entry in entries:
+                f.write(json.dumps(entry) + '\n')
+        os.replace(tmp, self.index_path)
+        for p in small:
+            os.remove(os.path.join(self.root, p))
+        self._index = None
+        return len(small)
+
+    # ------- Index -------
+    def _load_index(self):
+        if self._index is None:
+            entries = []
+            if os.path.exists(self.index_path):
+                with open(self.index_path) as f:
+                    entries = [json.loads(line) for line in f if line.strip()]
+            self._index = (
+                entries,
+                np.array([e['min_frame'] for e in entries], dtype=np.int64),
+                np.array([e['max_frame'] for e in entries], dtype=np.int64),
+            )
+        return self._index
+
+    def frame(self, frame_id):
+        """All detections for one frame, reading only the row groups that can hold it"""
+        entries, mins, maxs = self._load_index()
+        hits = np.nonzero((mins <= frame_id) & (maxs >= frame_id))[0]
+        tables = []
+        for i in hits:
+            entry = entries[i]
+            rg = pq.ParquetFile(os.path.join(self.root, entry['file'])).read_row_group(entry['row_group'])
+            tables.append(rg.filter(pc.equal(rg['frame_id'], frame_id)))
+        return pa.concat_tables(tables) if tables else SCHEMA.empty_table()
+
+    # ------- Queries -------
+    def dataset(self):
+        return ds.dataset(self.root, format='parquet', partitioning='hive', exclude_invalid_files=True,
+                          ignore_prefixes=['.', '_', 'frame_index'])
+
+    def query(self, disease=None, min_confidence=None, start=None, end=None, columns=None):
+        """
+        Predictions matching every given condition:
+        disease == disease, confidence > min_confidence, start <= timestamp < end.
+        start/end are datetimes. Returns a pyarrow Table.
+        """
+        filters = []
+        if start is not None:
+            filters.append(ds.field('date') >= start.strftime('%Y-%m-%d'))
+            filters.append(ds.field('timestamp') >= pa.scalar(start, pa.timestamp('s')))
+        if end is not None:
+            filters.append(ds.field('date') <= end.strftime('%Y-%m-%d'))
+            filters.append(ds.field('timestamp') < pa.scalar(end, pa.timestamp('s')))
+        if disease is not None:
+            filters.append(ds.field('disease') == disease)
+        if min_confidence is not None:
+            filters.append(ds.field('confidence') > min_confidence)
+
+        expression = None
+        for f in filters:
+            expression = f if expression is None else expression & f
+        columns = columns or ['frame_id', 'timestamp', 'disease', 'confidence']
+        return self.dataset().to_table(columns=columns, filter=expression)
+
+    def frames_where(self, disease, min_confidence, start=None, end=None):
+        """Sorted unique frame IDs where `disease` scored above min_confidence"""
+        table = self.query(disease, min_confidence, start, end, columns=['frame_id'])
+        return np.unique(table['frame_id'].to_numpy())
+
+    # ------- CSV compatibility -------
+    def import_csv(self, csv_path, batch_rows=500000):
+        """Stream an existing disease_predictions.csv into the log"""
+        from pyarrow import csv as pacsv
+
+        convert = pacsv.ConvertOptions(
+            column_types={'FrameID': pa.int64(), 'Timestamp': pa.timestamp('s'),
+                          'Disease': pa.string(), 'Confidence': pa.float32()},
+            timestamp_parsers=[CSV_TIME_FORMAT],
+        )
+        reader = pacsv.open_csv(csv_path, read_options=pacsv.ReadOptions(block_size=1 << 24),
+                                convert_options=convert)
+        total = 0
+        pending = []
+        pending_rows = 0
+        for batch in reader:
+            pending.append(batch)
+            pending_rows += batch.num_rows
+            if pending_rows >= batch_rows:
+                total += self._write_batches(pending)
+                pending, pending_rows = [], 0
+        if pending:
+            total += self._write_batches(pending)
+        return total
+
+    def _write_batches(self, batches):
+        t = pa.Table.from_batches(batches)
+        return self.write(t['FrameID'], t['Timestamp'], t['Disease'], t['Confidence'])
+
+    def export_csv(self, csv_path, **filters):
+        """Write the log (optionally filtered, see query()) in the original CSV format"""
+        table = self.query(**filters).sort_by([('frame_id', 'ascending'), ('timestamp', 'ascending')])
+        with open(csv_path, 'w', newline='') as f:
+            f.write('FrameID,Timestamp,Disease,Confidence\n')
+            frame_ids = table['frame_id'].to_pylist()
+            timestamps = table['timestamp'].to_pylist()
+            diseases = table['disease'].cast(pa.string()).to_pylist()
+            confidences = table['confidence'].to_numpy()
+            for fid, ts, disease, conf in zip(frame_ids, timestamps, diseases, confidences):
+                f.write(f"{fid},{ts.strftime(CSV_TIME_FORMAT)},{disease},{round(float(conf), 2)}\n")
+        return table.num_rows
+
+# -----------------------------
+# 2. CLI
+# -----------------------------
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Import/export/query the Parquet prediction log")
+    parser.add_argument('--root', default='prediction_log')
+    sub = parser.add_subparsers(dest='command', required=True)
+    p_import = sub.add_parser('import', help='Import a disease_predictions.csv')
+    p_import.add_argument('csv')
+    p_export = sub.add_parser('export', help='Export to CSV')
+    p_export.add_argument('csv')
+    sub.add_parser('compact', help='Merge small part files')
+    p_query = sub.add_parser('query', help='Frames where disease > threshold')
+    p_query.add_argument('disease')
+    p_query.add_argument('threshold', type=float)
+    p_query.add_argument('--start', type=datetime.fromisoformat)
+    p_query.add_argument('--end', type=datetime.fromisoformat)
+    args = parser.parse_args()
+
+    log = PredictionLog(args.root)
+    if args.command == 'import':
+        print(f"Imported {log.import_csv(args.csv)} rows into {args.root}")
+    elif args.command == 'export':
+        print(f"Exported {log.export_csv(args.csv)} rows to {args.csv}")
+    elif args.command == 'compact':
+        print(f"Merged {log.compact()} small part files")
+    else:
+        frames = log.frames_where(args.disease, args.threshold, args.start, args.end)
+        print(f"{len(frames)} frames: {frames.tolist()}")
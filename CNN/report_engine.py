@@ -0,0 +1,230 @@
+# report_engine.py
+"""
+Incremental report generation for the Telegram bot
+- disease_predictions.csv : rows are appended as predictions stream in
+- Running per-class aggregates (count, mean confidence) are kept in a small
+  JSON state file, so confidence_chart.png / detection_chart.png are
+  redrawn in O(classes) instead of re-reading the whole CSV
+- disease_report.pdf / full_frames_report.pdf are built from page segments;
+  each update renders pages for the new frames only and then stitches the
+  existing segments together (old pages are copied, not re-rendered)
+- Frame pages can be drawn from thumbnails (thumbnail_for: path -> path,
+  e.g. ImageArchive.thumbnail) instead of full-resolution captures
+"""
+
+import csv
+import json
+import os
+from datetime import datetime
+
+CSV_HEADER = ['FrameID', 'Timestamp', 'Disease', 'Confidence']
+
+# -----------------------------
+# 1. Report engine
+# -----------------------------
+class ReportEngine:
+    def __init__(self, out_dir='.', csv_name='disease_predictions.csv',
+                 confidence_chart='confidence_chart.png', detection_chart='detection_chart.png',
+                 disease_pdf='disease_report.pdf', frames_pdf='full_frames_report.pdf', thumbnail_for=None):
+        self.out_dir = out_dir
+        self.thumbnail_for = thumbnail_for
+        os.makedirs(out_dir, exist_ok=True)
+        self.csv_path = os.path.join(out_dir, csv_name)
+        self.state_path = self.csv_path + '.state.json'
+        self.confidence_chart = os.path.join(out_dir, confidence_chart)
+        self.detection_chart = os.path.join(out_dir, detection_chart)
+        self.disease_pdf = os.path.join(out_dir, disease_pdf)
+        self.frames_pdf = os.path.join(out_dir, frames_pdf)
+        self.parts_dir = os.path.join(out_dir, 'report_parts')
+
+        # 'pending': frames appended since the last PDF build (persisted, so a
+        # restart does not lose their pages): frame_id -> {timestamp, image, detections}
+        self.state = {'rows': 0, 'csv_bytes': 0, 'classes': {}, 'segments': [], 'last_frame': None, 'pending': {}}
+        self._load_state()
+        self._csv_file = None
+
+    # ------- State -------
+    def _load_state(self):
+        if os.path.exists(self.state_path):
+            with open(self.state_path) as f:
+                self.state.update(json.load(f))
+        csv_bytes = os.path.getsize(self.csv_path) if os.path.exists(self.csv_path) else 0
+        if csv_bytes != self.state['csv_bytes']:
+            # CSV was edited or replaced outside the engine: rebuild aggregates once
+            self._rebuild_from_csv()
+
+    def _rebuild_from_csv(self):
+        classes, rows, last_frame = {}, 0, None
+        if os.path.exists(self.csv_path):
+            with open(self.csv_path, newline='') as f:
+                for row in csv.DictReader(f):
+                    agg = classes.setdefault(row['Disease'], [0, 0.0])
+                    agg[0] += 1
+                    agg[1] += float(row['Confidence'])
+                    rows += 1
+                    last_frame = row['FrameID']
+        self.state.update(rows=rows, classes=classes, last_frame=last_frame,
+                          csv_bytes=os.path.getsize(self.csv_path) if os.path.exists(self.csv_path) else 0)
+
+    def _save_state(self):
+        tmp = self.state_path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.state, f)
+        os.replace(tmp, self.state_path)
+
+    # ------- Streaming input -------
+    def append(self, frame_id, disease, confidence, timestamp=None, image_path=None):
+        """
+        Record one detection. confidence is in percent, as stored in the CSV.
+        Several detections may share a frame_id.
+        """
+        timestamp = timestamp or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        if self._csv_file is None:
+            new_file = not os.path.exists(self.csv_path) or os.path.getsize(self.csv_path) == 0
+            self._csv_file = open(self.csv_path, 'a', newline='')
+            self._csv_writer = csv.writer(self._csv_file)
+            if new_file:
+                self._csv_writer.writerow(CSV_HEADER)
+        self._csv_writer.writerow([frame_id, timestamp, disease, f"{confidence:.2f}"])
+
+        agg = self.state['classes'].setdefault(disease, [0, 0.0])
+        agg[0] += 1
+        agg[1] += confidence
+        self.state['rows'] += 1
+        self.state['last_frame'] = frame_id
+
+        frame = self.state['pending'].setdefault(
+            str(frame_id), {'timestamp': timestamp, 'image': image_path, 'detections': []}
+        )
+        frame['detections'].append((disease, confidence))
+        if image_path and not frame['image']:
+            frame['image'] = image_path
+
+    def flush(self):
+        """Make appended rows durable and record the CSV size in the state file"""
+        if self._csv_file is not None:
+            self._csv_file.flush()
+            os.fsync(self._csv_file.fileno())
+            self.state['csv_bytes'] = os.path.getsize(self.csv_path)
+        self._save_state()
+
+    def close(self):
+        self.flush()
+        if self._csv_file is not None:
+            self._csv_file.close()
+            self._csv_file = None
+
+    # ------- Aggregates / charts -------
+    def class_stats(self):
+        """{disease: (count, mean_confidence)} from the running aggregates"""
+        return {cls: (n, total / n if n else 0.0) for cls, (n, total) in sorted(self.state['classes'].items())}
+
+    def draw_charts(self):
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+
+        stats = self.class_stats()
+        names = list(stats)
+        counts = [stats[n][0] for n in names]
+        means = [stats[n][1] for n in names]
+
+        for path, values, title, ylabel in [
+            (self.confidence_chart, means, 'Average Disease Confidence', 'Confidence (%)'),
+            (self.detection_chart, counts, 'Total Disease Detections', 'Detections'),
+        ]:
+            fig, ax = plt.subplots(figsize=(7, 4))
+            ax.bar(names, values, color=['#4caf50', '#e65100', '#6a1b9a', '#1565c0'][:len(names)] or None)
+            ax.set_title(title)
+            ax.set_ylabel(ylabel)
+            ax.tick_params(axis='x', labelrotation=15)
+            fig.tight_layout()
+            fig.savefig(path, dpi=100)
+            plt.close(fig)
+
+    # ------- PDFs -------
+    def _render_segment(self, frames, seq):
+        """Render pages for new frames only: one disease-report and one full-frames segment"""
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+        from matplotlib.backends.backend_pdf import PdfPages
+
+        os.makedirs(self.parts_dir, exist_ok=True)
+        disease_part = os.path.join(self.parts_dir, f'disease_{seq:06d}.pdf')
+        frames_part = os.path.join(self.parts_dir, f'frames_{seq:06d}.pdf')
+
+        with PdfPages(disease_part) as disease_pdf, PdfPages(frames_part) as frames_pdf:
+            for frame_id, frame in frames.items():
+                image_path = frame['image']
+                if image_path and self.thumbnail_for is not None:
+                    image_path = self.thumbnail_for(image_path)
+                img = plt.imread(image_path) if image_path and os.path.exists(image_path) else None
+                lines = "\n".join(f"{d}: {c:.2f}%" for d, c in frame['detections'])
+
+                fig, ax = plt.subplots(figsize=(8.27, 11.69))   # A4 portrait
+                if img is not None:
+                    ax.imshow(img)
+                ax.axis('off')
+                ax.set_title(f"Frame {frame_id} — {frame['timestamp']}\n{lines}", fontsize=10, loc='left')
+                disease_pdf.savefig(fig)
+                plt.close(fig)
+
+                if img is not None:
+                    fig, ax = plt.subplots(figsize=(11.69, 8.27))  # A4 landscape
+                    ax.imshow(img)
+                    ax.axis('off')
+                    ax.set_title(f"Frame {frame_id} — {frame['timestamp']}", fontsize=10)
+                    frames_pdf.savefig(fig)
+                    plt.close(fig)
+        return disease_part, frames_part
+
+    def _render_summary(self):
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+        from matplotlib.backends.backend_pdf import PdfPages
+
+        os.makedirs(self.parts_dir, exist_ok=True)
+        path = os.path.join(self.parts_dir, 'summary.pdf')
+        stats = self.class_stats()
+        text = "\n".join(f"{cls:<28} {n:>8} detections   avg {mean:6.2f}%" for cls, (n, mean) in stats.items())
+        with PdfPages(path) as pdf:
+            fig = plt.figure(figsize=(8.27, 11.69))
+            fig.text(0.08, 0.92, "Plant Disease Detection Report", fontsize=18, weight='bold')
+            fig.text(0.08, 0.88, f"Generated {datetime.now():%Y-%m-%d %H:%M}  ·  {self.state['rows']} predictions",
+                     fontsize=10)
+            fig.text(0.08, 0.80, text, fontsize=10, family='monospace', va='top')
+            pdf.savefig(fig)
+            plt.close(fig)
+        return path
+
+    def build_pdfs(self):
+        """Render pages for frames added since the last build, then stitch the PDFs"""
+        from pypdf import PdfWriter
+
+        if self.state['pending']:
+            seq = len(self.state['segments'])
+            disease_part, frames_part = self._render_segment(self.state['pending'], seq)
+            self.state['segments'].append([disease_part, frames_part])
+            self.state['pending'] = {}
+
+        for out_path, parts in [
+            (self.disease_pdf, [self._render_summary()] + [d for d, _ in self.state['segments']]),
+            (self.frames_pdf, [f for _, f in self.state['segments']]),
+        ]:
+            writer = PdfWriter()
+            for part in parts:
+                if os.path.exists(part) and os.path.getsize(part):
+                    writer.append(part)
+            tmp = out_path + '.tmp'
+            with open(tmp, 'wb') as f:
+                writer.write(f)
+            os.replace(tmp, out_path)
+        self.flush()
+
+    def update_reports(self):
+        """Charts + PDFs; call after a detection run"""
+        self.flush()
+        self.draw_charts()
+        self.build_pdfs()
@@ -0,0 +1,191 @@
+# tiled_detection.py
+"""
+Frame-level tiled disease detection
+Squashing a full Pi camera still into 224x224 hides small rust spots, so:
+- The frame is cut into overlapping 224x224 tiles with strided NumPy views
+  (sliding_window_view, no per-tile copies), optionally at several scales;
+  a last row/column of tiles is aligned to the bottom/right edge, so the
+  whole frame is scanned whatever the stride
+- A cheap excess-green (ExG) mask skips tiles with too little leaf in them
+- All kept tiles are scored together in batched backend calls
+- Overlapping diseased tiles of the same class are merged into one
+  detection per region, which becomes a per-frame detection row (FrameID,
+  Timestamp, Disease, Confidence, like disease_predictions.csv); a
+  per-class heatmap keeps the tile-level detail
+"""
+
+from datetime import datetime
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from Disease_prediction_py import IMG_SIZE, class_labels, get_backend
+
+TILE = IMG_SIZE[0]
+MASK_STEP = 8   # ExG mask is computed on every 8th pixel
+
+# -----------------------------
+# 1. Leaf mask prefilter
+# -----------------------------
+def green_fraction_per_tile(frame, stride, tile=TILE, exg_threshold=20):
+    """
+    Fraction of "green" pixels under every tile position, shape (ny, nx).
+    ExG = 2G - R - B on a subsampled view, then a summed-area table gives
+    every tile's green count in O(1).
+    """
+    small = frame[::MASK_STEP, ::MASK_STEP].astype(np.int16)
+    exg = 2 * small[..., 1] - small[..., 0] - small[..., 2]
+    mask = (exg > exg_threshold).astype(np.int32)
+
+    sat = np.zeros((mask.shape[0] + 1, mask.shape[1] + 1), dtype=np.int32)
+    sat[1:, 1:] = mask.cumsum(0).cumsum(1)
+
+    h, w = frame.shape[:2]
+    ys = tile_origins(h, stride, tile) // MASK_STEP
+    xs = tile_origins(w, stride, tile) // MASK_STEP
+    size = max(tile // MASK_STEP, 1)
+    y0, x0 = np.meshgrid(ys, xs, indexing='ij')
+    y1 = np.minimum(y0 + size, mask.shape[0])
+    x1 = np.minimum(x0 + size, mask.shape[1])
+    counts = sat[y1, x1] - sat[y0, x1] - sat[y1, x0] + sat[y0, x0]
+    return counts / float(size * size)
+
+# -----------------------------
+# 2. Tiling
+# -----------------------------
+def tile_origins(length, stride, tile=TILE):
+    """
+    Tile start offsets along one axis: every `stride` pixels, plus one
+    tile flush with the far edge when the stride does not land there
+    """
+    origins = np.arange(0, length - tile + 1, stride)
+    if origins[-1] != length - tile:
+        origins = np.append(origins, length - tile)
+    return origins
+
+def tile_view(frame, tile=TILE):
+    """
+    (H - tile + 1, W - tile + 1, tile, tile, 3) view of every tile position;
+    no data is copied. Index it with tile_origins() rows/columns.
+    """
+    return sliding_window_view(frame, (tile, tile, frame.shape[2]))[:, :, 0]
+
+def _resize(frame, scale):
+    if scale == 1.0:
+        return frame
+    from PIL import Image
+    h, w = frame.shape[:2]
+    size = (max(int(w * scale), TILE), max(int(h * scale), TILE))
+    return np.asarray(Image.fromarray(frame).resize(size, Image.BILINEAR))
+
+# -----------------------------
+# 3. Merging
+# -----------------------------
+def merge_boxes(boxes):
+    """
+    (x0, y0, x1, y1, label, confidence) tile boxes -> one box per region:
+    boxes of the same class that overlap (directly or through a chain of
+    tiles) become their bounding box with the best confidence.
+    """
+    merged = []
+    for label in dict.fromkeys(b[4] for b in boxes):
+        group = np.array([b[:4] for b in boxes if b[4] == label], dtype=np.int64)
+        conf = np.array([b[5] for b in boxes if b[4] == label])
+        x0, y0, x1, y1 = (group[:, i] for i in range(4))
+        overlap = ((np.minimum(x1[:, None], x1[None, :]) > np.maximum(x0[:, None], x0[None, :])) &
+                   (np.minimum(y1[:, None], y1[None, :]) > np.maximum(y0[:, None], y0[None, :])))
+        # Connected components: every box takes the smallest id among its neighbours until stable
+        comp = np.arange(len(group))
+        while True:
+            new = np.where(overlap, comp[None, :], len(group)).min(axis=1)
+            if (new == comp).all():
+                break
+            comp = new
+        for c in np.unique(comp):
+            members = comp == c
+            merged.append((int(x0[members].min()), int(y0[members].min()), int(x1[members].max()),
+                           int(y1[members].max()), label, float(conf[members].max())))
+    return sorted(merged, key=lambda b: -b[5])
+
+# -----------------------------
+# 4. Detection
+# -----------------------------
+def detect_frame(frame, frame_id=1, timestamp=None, stride=112, scales=(1.0,), min_leaf_area=0.15,
+                 threshold=0.5, healthy_label='healthy', batch_size=64, backend=None):
+    """
+    Tile, filter, score and merge one RGB uint8 frame (H, W, 3; an alpha or
+    padding channel, as in RGBA/XRGB captures, is ignored).
+    Returns a dict with:
+      rows      : [(FrameID, Timestamp, Disease, Confidence%)], one per diseased region
+      boxes     : [(x0, y0, x1, y1, disease, confidence)] in frame pixels, same order
+      heatmap   : (H // MASK_STEP, W // MASK_STEP, num_classes) mean class probability
+      tiles_total / tiles_scored
+    """
+    backend = get_backend(backend)
+    frame = frame[..., :3]
+    timestamp = timestamp or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    h, w = frame.shape[:2]
+    num_classes = len(class_labels)
+
+    heat_sum = np.zeros((h // MASK_STEP + 1, w // MASK_STEP + 1, num_classes), dtype=np.float32)
+    heat_count = np.zeros(heat_sum.shape[:2], dtype=np.float32)
+    tile_boxes = []
+    tiles_total = tiles_scored = 0
+    buffer = np.empty((batch_size, TILE, TILE, 3), dtype=np.float32)
+
+    for scale in scales:
+        scaled = _resize(frame, scale)
+        if scaled.shape[0] < TILE or scaled.shape[1] < TILE:
+            continue
+        tiles = tile_view(scaled)
+        oy, ox = tile_origins(scaled.shape[0], stride), tile_origins(scaled.shape[1], stride)
+        tiles_total += len(oy) * len(ox)
+
+        keep = green_fraction_per_tile(scaled, stride) >= min_leaf_area
+        ys, xs = np.nonzero(keep)
+        tiles_scored += len(ys)
+
+        for start in range(0, len(ys), batch_size):
+            by, bx = ys[start:start + batch_size], xs[start:start + batch_size]
+            n = len(by)
+            # Fancy indexing gathers the tiles into one uint8 copy, scaled into the float buffer
+            np.multiply(tiles[oy[by], ox[bx]], 1 / 255.0, out=buffer[:n], casting='unsafe')
+            probs = np.asarray(backend.predict(buffer[:n]))
+
+            top = probs.argmax(axis=1)
+            conf = probs[np.arange(n), top]
+            for i in range(n):
+                # Tile position back in full-frame pixels
+                x0, y0 = int(ox[bx[i]] / scale), int(oy[by[i]] / scale)
+                x1, y1 = int((ox[bx[i]] + TILE) / scale), int((oy[by[i]] + TILE) / scale)
+                hy0, hx0, hy1, hx1 = y0 // MASK_STEP, x0 // MASK_STEP, y1 // MASK_STEP, x1 // MASK_STEP
+                heat_sum[hy0:hy1, hx0:hx1] += probs[i]
+                heat_count[hy0:hy1, hx0:hx1] += 1
+
+                label = class_labels[top[i]]
+                if label != healthy_label and conf[i] >= threshold:
+                    tile_boxes.append((x0, y0, x1, y1, label, float(conf[i])))
+
+    boxes = merge_boxes(tile_boxes)
+    rows = [(frame_id, timestamp, b[4], round(b[5] * 100, 2)) for b in boxes]
+    heatmap = heat_sum / np.maximum(heat_count, 1)[..., None]
+    return {'rows': rows, 'boxes': boxes, 'heatmap': heatmap,
+            'tiles_total': tiles_total, 'tiles_scored': tiles_scored}
+
+def load_frame(img_path):
+    """Full-resolution RGB uint8 frame from disk"""
+    from PIL import Image
+    with Image.open(img_path) as img:
+        return np.asarray(img.convert('RGB'))
+
+# -----------------------------
+# 5. Example
+# -----------------------------
+if __name__ == "__main__":
+    import sys
+
+    frame_path = sys.argv[1] if len(sys.argv) > 1 else 'sample_frame.jpg'
+    result = detect_frame(load_frame(frame_path), scales=(1.0, 0.5))
+    print(f"Scored {result['tiles_scored']}/{result['tiles_total']} tiles")
+    for row in result['rows']:
+        print(",".join(str(v) for v in row))
@@ -3,14 +3,14 @@
 Train YOLO model on rose leaf disease dataset
 - Uses YOLOv5 (PyTorch hub)
 - Dataset must be in YOLO format (images + labels)
+- Loads offline from a local/cached yolov5 checkout (see yolo_engine.load_yolo)
 """
 
-import torch
-
+from yolo_engine import load_yolo
 
 data_yaml = 'dataset.yaml'  # YAML config for YOLO dataset
-# Load YOLOv5 model from PyTorch hub
-model = torch.hub.load('ultralytics/yolov5', 'custom', path='yolov5s.pt', force_reload=True)
+# Load YOLOv5 model from local weights (no re-download on every run)
+model = load_yolo('yolov5s.pt')
 
 # Training parameters
 epochs = 50
@@ -0,0 +1,282 @@
+# training_profiles.py
+"""
+CPU training profiles for the MobileNetV2 disease classifier
+- Explicit intra-op / inter-op thread pools (TF defaults leave cores idle)
+- XLA JIT compilation
+- bfloat16 mixed precision, only where the CPU supports it natively
+  (avx512_bf16 / amx_bf16); otherwise the profile falls back to float32
+- Two-phase schedule: head only, then the top N MobileNetV2 blocks
+  unfrozen at a lower learning rate
+- EarlyStopping, best-weights checkpoints and BackupAndRestore, so an
+  interrupted run resumes from its last epoch; checkpoints are keyed on
+  the dataset and the profile settings and removed once a run completes,
+  so a retrain or a repeated comparison always trains from scratch
+- Each profile runs in its own process (thread pools can only be set once)
+  and reports seconds/epoch and final validation accuracy
+
+Usage:
+    python training_profiles.py                                  # all profiles
+    python training_profiles.py --profiles baseline,xla_bf16 --target-accuracy 0.9
+    python training_profiles.py --profile finetune_top4 --save model.h5
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+train_dir = 'dataset/train'
+val_dir = 'dataset/val'
+shard_dir = 'dataset/shards'
+CHECKPOINT_DIR = 'checkpoints'
+
+CORES = os.cpu_count() or 1
+DEFAULTS = {
+    'intra_threads': 0,            # 0 = TensorFlow default
+    'inter_threads': 0,
+    'jit': False,
+    'precision': 'float32',        # or 'mixed_bfloat16'
+    'batch_size': 32,
+    'head_epochs': 10,
+    'head_lr': 1e-4,
+    'finetune_epochs': 0,
+    'finetune_lr': 1e-5,
+    'unfreeze_blocks': 0,          # top N of MobileNetV2's 16 inverted-residual blocks
+    'patience': 3,
+}
+
+# baseline = what model_train_for_disease_detect.py does today
+PROFILES = {
+    'baseline': {},
+    'threads': {'intra_threads': CORES, 'inter_threads': 2},
+    'xla': {'intra_threads': CORES, 'inter_threads': 2, 'jit': True},
+    'xla_bf16': {'intra_threads': CORES, 'inter_threads': 2, 'jit': True, 'precision': 'mixed_bfloat16'},
+    'finetune_top4': {'intra_threads': CORES, 'inter_threads': 2, 'jit': True,
+                      'head_epochs': 5, 'finetune_epochs': 10, 'unfreeze_blocks': 4},
+}
+
+# -----------------------------
+# 1. Runtime configuration
+# -----------------------------
+def cpu_supports_bf16():
+    try:
+        with open('/proc/cpuinfo') as f:
+            flags = f.read()
+    except OSError:
+        return False
+    return 'avx512_bf16' in flags or 'amx_bf16' in flags
+
+def configure_runtime(profile):
+    """Must run before TensorFlow executes any op"""
+    import tensorflow as tf
+
+    tf.config.threading.set_intra_op_parallelism_threads(profile['intra_threads'])
+    tf.config.threading.set_inter_op_parallelism_threads(profile['inter_threads'])
+    tf.config.optimizer.set_jit(profile['jit'])
+
+    precision = profile['precision']
+    if precision == 'mixed_bfloat16' and not cpu_supports_bf16():
+        print("⚠️ CPU has no native bfloat16; using float32")
+        precision = 'float32'
+    tf.keras.mixed_precision.set_global_policy(precision)
+    return precision
+
+# -----------------------------
+# 2. Model
+# -----------------------------
+def build_model(num_classes):
+    """Same architecture as model_train_for_disease_detect.py"""
+    from tensorflow.keras.applications import MobileNetV2
+    from tensorflow.keras.layers import Dense, GlobalAveragePooling2D
+    from tensorflow.keras.models import Model
+
+    base_model = MobileNetV2(weights='imagenet', include_top=False, input_shape=(224, 224, 3))
+    base_model.trainable = False
+    x = GlobalAveragePooling2D()(base_model.output)
+    x = Dense(1024, activation='relu')(x)
+    # Softmax in float32 for numerical stability under mixed precision
+    predictions = Dense(num_classes, activation='softmax', dtype='float32')(x)
+    return Model(inputs=base_model.input, outputs=predictions), base_model
+
+def unfreeze_top_blocks(base_model, n_blocks):
+    """
+    Make the last n_blocks inverted-residual blocks (block_16, block_15, ...)
+    and the final Conv_1 trainable. BatchNorm layers stay frozen so their
+    statistics are not disturbed by small fine-tuning batches.
+    """
+    from tensorflow.keras.layers import BatchNormalization
+
+    first = 17 - n_blocks
+    base_model.trainable = True
+    for layer in base_model.layers:
+        name = layer.name
+        in_top = name.startswith('Conv_1') or (
+            name.startswith('block_') and int(name.split('_')[1]) >= first
+        )
+        layer.trainable = in_top and not isinstance(layer, BatchNormalization)
+
+def epoch_timer():
+    """Keras callback that records wall time per epoch in .times"""
+    import tensorflow as tf
+
+    class EpochTimer(tf.keras.callbacks.Callback):
+        def on_epoch_begin(self, epoch, logs=None):
+            self._start = time.perf_counter()
+
+        def on_epoch_end(self, epoch, logs=None):
+            self.times.append(time.perf_counter() - self._start)
+
+    timer = EpochTimer()
+    timer.times = []
+    return timer
+
+# -----------------------------
+# 3. Training run
+# -----------------------------
+def load_data(batch_size):
+    from data_pipeline import make_dataset, make_shard_dataset
+
+    if os.path.exists(os.path.join(shard_dir, 'shards.json')):
+        train_ds, class_names = make_shard_dataset(shard_dir, 'train', training=True, batch_size=batch_size)
+        val_ds, _ = make_shard_dataset(shard_dir, 'val', training=False, batch_size=batch_size)
+    else:
+        train_ds, class_names = make_dataset(train_dir, training=True, batch_size=batch_size)
+        val_ds, _ = make_dataset(val_dir, training=False, batch_size=batch_size)
+    return train_ds, val_ds, class_names
+
+def run_key(profile):
+    """Digest of the profile settings and the dataset files (names, sizes, mtimes)"""
+    digest = hashlib.sha1(json.dumps(profile, sort_keys=True).encode())
+    roots = [shard_dir] if os.path.exists(os.path.join(shard_dir, 'shards.json')) else [train_dir, val_dir]
+    for root in roots:
+        for folder, _, files in sorted(os.walk(root)):
+            for name in sorted(files):
+                st = os.stat(os.path.join(folder, name))
+                digest.update(f"{os.path.relpath(os.path.join(folder, name), root)}:{st.st_size}:{st.st_mtime_ns}\n".encode())
+    return digest.hexdigest()[:12]
+
+def _fit_phase(model, phase, lr, epochs, train_ds, val_ds, profile, ckpt_dir, timer):
+    """
+    One phase of the schedule. If an interrupted run (same data, same
+    settings) already finished this phase, it is skipped and its best
+    weights are loaded; an interrupted phase resumes from the
+    BackupAndRestore state.
+    """
+    import tensorflow as tf
+    from tensorflow.keras.optimizers import Adam
+
+    best_path = os.path.join(ckpt_dir, f'{phase}_best.weights.h5')
+    done_marker = os.path.join(ckpt_dir, f'{phase}.done')
+    model.compile(optimizer=Adam(learning_rate=lr), loss='categorical_crossentropy',
+                  metrics=['accuracy'], jit_compile=profile['jit'])
+    if os.path.exists(done_marker) and os.path.exists(best_path):
+        print(f"⏭️ Phase '{phase}' already complete, loading {best_path}")
+        model.load_weights(best_path)
+        return
+    callbacks = [
+        tf.keras.callbacks.BackupAndRestore(os.path.join(ckpt_dir, f'backup_{phase}')),
+        tf.keras.callbacks.ModelCheckpoint(best_path, monitor='val_accuracy',
+                                           save_best_only=True, save_weights_only=True),
+        tf.keras.callbacks.EarlyStopping(monitor='val_accuracy', patience=profile['patience'],
+                                         restore_best_weights=True),
+        timer,
+    ]
+    model.fit(train_ds, validation_data=val_ds, epochs=epochs, callbacks=callbacks)
+    open(done_marker, 'w').close()
+
+def run_profile(name, overrides=None, save_path=None):
+    """Train one profile in this process. Returns a result dict."""
+    profile = dict(DEFAULTS, **PROFILES.get(name, {}), **(overrides or {}))
+    precision = configure_runtime(profile)
+    train_ds, val_ds, class_names = load_data(profile['batch_size'])
+
+    model, base_model = build_model(len(class_names))
+    ckpt_dir = os.path.join(CHECKPOINT_DIR, name, run_key(profile))
+    os.makedirs(ckpt_dir, exist_ok=True)
+    timer = epoch_timer()
+
+    start = time.perf_counter()
+    _fit_phase(model, 'head', profile['head_lr'], profile['head_epochs'], train_ds, val_ds, profile, ckpt_dir, timer)
+    if profile['unfreeze_blocks'] and profile['finetune_epochs']:
+        unfreeze_top_blocks(base_model, profile['unfreeze_blocks'])
+        _fit_phase(model, 'finetune', profile['finetune_lr'], profile['finetune_epochs'],
+                   train_ds, val_ds, profile, ckpt_dir, timer)
+    total = time.perf_counter() - start
+
+    _, val_accuracy = model.evaluate(val_ds, verbose=0)
+    if save_path:
+        model.save(save_path)
+    # Completed: resume state is only for interrupted runs
+    shutil.rmtree(ckpt_dir, ignore_errors=True)
+    # First epoch includes graph tracing / XLA compilation; report it separately
+    steady = timer.times[1:] or timer.times
+    return {
+        'profile': name,
+        'precision': precision,
+        'epochs': len(timer.times),
+        'first_epoch_s': round(timer.times[0], 2) if timer.times else None,
+        'sec_per_epoch': round(sum(steady) / len(steady), 2) if steady else None,
+        'total_s': round(total, 1),
+        'val_accuracy': round(float(val_accuracy), 4),
+    }
+
+# -----------------------------
+# 4. CLI
+# -----------------------------
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profiles', default=','.join(PROFILES), help='Comma-separated, each run in a subprocess')
+    parser.add_argument('--profile', help='Run a single profile in this process')
+    parser.add_argument('--head-epochs', type=int)
+    parser.add_argument('--finetune-epochs', type=int)
+    parser.add_argument('--target-accuracy', type=float, default=None)
+    parser.add_argument('--save', help='Save the trained model (single profile only)')
+    parser.add_argument('--result-json', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    overrides = {k: v for k, v in (('head_epochs', args.head_epochs),
+                                   ('finetune_epochs', args.finetune_epochs)) if v is not None}
+
+    if args.profile:
+        result = run_profile(args.profile, overrides, args.save)
+        print(json.dumps(result))
+        if args.result_json:
+            with open(args.result_json, 'w') as f:
+                json.dump(result, f)
+        return
+
+    results = []
+    for name in args.profiles.split(','):
+        with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as tmp:
+            result_path = tmp.name
+        cmd = [sys.executable, __file__, '--profile', name, '--result-json', result_path]
+        for flag, key in (('--head-epochs', 'head_epochs'), ('--finetune-epochs', 'finetune_epochs')):
+            if key in overrides:
+                cmd += [flag, str(overrides[key])]
+        print(f"▶ {name}")
+        subprocess.run(cmd, check=True)
+        with open(result_path) as f:
+            results.append(json.load(f))
+        os.remove(result_path)
+
+    print(f"\n{'profile':<16}{'precision':<16}{'epochs':>7}{'1st ep s':>10}{'s/epoch':>9}{'val acc':>9}")
+    for r in results:
+        print(f"{r['profile']:<16}{r['precision']:<16}{r['epochs']:>7}{str(r['first_epoch_s']):>10}"
+              f"{str(r['sec_per_epoch']):>9}{r['val_accuracy']:>9.4f}")
+
+    if args.target_accuracy is not None:
+        ok = [r for r in results if r['val_accuracy'] >= args.target_accuracy]
+        if ok:
+            best = min(ok, key=lambda r: r['total_s'])
+            print(f"\n✅ Fastest profile meeting {args.target_accuracy:.2%}: {best['profile']} ({best['total_s']} s)")
+        else:
+            print(f"\n❌ No profile reached {args.target_accuracy:.2%}")
+
+
+if __name__ == "__main__":
+    main()
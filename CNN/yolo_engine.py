@@ -0,0 +1,242 @@
+# yolo_engine.py
+"""
+YOLOv5 rose-leaf detector: offline loading, ONNX export and CPU inference
+- load_yolo(): uses local weights and a local/cached yolov5 repo, so it
+  works without network access (no force_reload on every run)
+- export_onnx(): yolov5_rose_best.pt -> yolov5_rose_best.onnx (dynamic batch/size)
+- YoloEngine: onnxruntime (or OpenCV DNN) CPU inference with batched
+  letterbox preprocessing, vectorized NMS and a configurable thread count
+- Output rows match disease_predictions.csv: FrameID, Timestamp, Disease, Confidence
+"""
+
+import ast
+import os
+import subprocess
+import sys
+from datetime import datetime
+
+import numpy as np
+
+WEIGHTS = 'yolov5_rose_best.pt'
+ONNX_PATH = 'yolov5_rose_best.onnx'
+YOLO_REPO_DIR = os.environ.get('YOLOV5_DIR', 'yolov5')          # Local clone of ultralytics/yolov5
+HUB_CACHE_DIR = os.environ.get('TORCH_HUB_DIR', 'torch_hub')    # torch.hub cache used when no clone exists
+DEFAULT_NAMES = ['Healthy_Leaf_Rose', 'Rose_Rust', 'Rose_sawfly_Rose_slug']
+
+# -----------------------------
+# 1. Offline loading / export
+# -----------------------------
+def find_yolo_repo():
+    """Local yolov5 clone, else the copy torch.hub cached on a previous run (or None)"""
+    if os.path.isfile(os.path.join(YOLO_REPO_DIR, 'hubconf.py')):
+        return YOLO_REPO_DIR
+    cached = os.path.join(HUB_CACHE_DIR, 'ultralytics_yolov5_master')
+    if os.path.isfile(os.path.join(cached, 'hubconf.py')):
+        return cached
+    return None
+
+def load_yolo(weights=WEIGHTS):
+    """
+    Load a YOLOv5 model from local weights.
+    Downloads the yolov5 code only if no local clone or hub cache exists yet.
+    """
+    import torch
+
+    torch.hub.set_dir(HUB_CACHE_DIR)
+    repo = find_yolo_repo()
+    if repo is not None:
+        return torch.hub.load(repo, 'custom', path=weights, source='local')
+    print("No local yolov5 code found; fetching it once into", HUB_CACHE_DIR)
+    return torch.hub.load('ultralytics/yolov5', 'custom', path=weights, skip_validation=True)
+
+def export_onnx(weights=WEIGHTS, img_size=640, opset=12):
+    """Run yolov5's export.py: dynamic batch and image size, written next to the weights"""
+    repo = find_yolo_repo()
+    if repo is None:
+        load_yolo(weights)   # populates the hub cache
+        repo = find_yolo_repo()
+    subprocess.run([
+        sys.executable, os.path.join(repo, 'export.py'),
+        '--weights', weights, '--include', 'onnx', '--dynamic',
+        '--imgsz', str(img_size), '--opset', str(opset),
+    ], check=True)
+    return os.path.splitext(weights)[0] + '.onnx'
+
+# -----------------------------
+# 2. Pre/post-processing
+# -----------------------------
+def letterbox_batch(images, size=640, pad_value=114):
+    """
+    Resize every image to fit size x size keeping aspect ratio, pad the rest,
+    and pack them into one (N, 3, size, size) float32 batch in [0, 1].
+    Returns (batch, scales, pads) to map boxes back to each image.
+    """
+    import cv2
+
+    n = len(images)
+    canvas = np.full((n, size, size, 3), pad_value, dtype=np.uint8)
+    scales = np.empty(n, dtype=np.float32)
+    pads = np.empty((n, 2), dtype=np.float32)
+    for i, img in enumerate(images):
+        h, w = img.shape[:2]
+        r = min(size / h, size / w)
+        nh, nw = int(round(h * r)), int(round(w * r))
+        top, left = (size - nh) // 2, (size - nw) // 2
+        canvas[i, top:top + nh, left:left + nw] = cv2.resize(img, (nw, nh), interpolation=cv2.INTER_LINEAR)
+        scales[i] = r
+        pads[i] = (left, top)
+    batch = canvas.transpose(0, 3, 1, 2).astype(np.float32)
+    batch *= 1 / 255.0
+    return batch, scales, pads
+
+def xywh_to_xyxy(boxes):
+    out = np.empty_like(boxes)
+    out[:, :2] = boxes[:, :2] - boxes[:, 2:4] / 2
+    out[:, 2:4] = boxes[:, :2] + boxes[:, 2:4] / 2
+    return out
+
+def nms(boxes, scores, iou_threshold):
+    """Greedy NMS; IoU of the current best box against all others is one vector op"""
+    x1, y1, x2, y2 = boxes.T
+    areas = (x2 - x1) * (y2 - y1)
+    order = scores.argsort()[::-1]
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        w = np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+        h = np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None)
+        inter = w * h
+        iou = inter / (areas[i] + areas[rest] - inter + 1e-9)
+        order = rest[iou <= iou_threshold]
+    return np.array(keep, dtype=np.int64)
+
+def postprocess(pred, conf_threshold=0.25, iou_threshold=0.45, max_det=300):
+    """
+    pred: (num_boxes, 5 + num_classes) raw YOLOv5 output for one image.
+    Returns (boxes_xyxy, scores, class_ids) after per-class NMS.
+    """
+    scores_all = pred[:, 5:] * pred[:, 4:5]          # obj_conf * cls_conf
+    class_ids = scores_all.argmax(axis=1)
+    scores = scores_all[np.arange(len(pred)), class_ids]
+    mask = scores > conf_threshold
+    if not mask.any():
+        return np.empty((0, 4), np.float32), np.empty(0, np.float32), np.empty(0, np.int64)
+
+    boxes = xywh_to_xyxy(pred[mask, :4])
+    scores, class_ids = scores[mask], class_ids[mask]
+    # Offset boxes by class so one NMS pass never suppresses across classes
+    offsets = class_ids[:, None].astype(np.float32) * 4096
+    keep = nms(boxes + offsets, scores, iou_threshold)[:max_det]
+    return boxes[keep], scores[keep], class_ids[keep]
+
+# -----------------------------
+# 3. Inference engine
+# -----------------------------
+class YoloEngine:
+    def __init__(self, onnx_path=ONNX_PATH, img_size=640, num_threads=None, conf_threshold=0.25,
+                 iou_threshold=0.45, class_names=None, runtime='onnxruntime'):
+        self.img_size = img_size
+        self.conf_threshold = conf_threshold
+        self.iou_threshold = iou_threshold
+        self.num_threads = num_threads or os.cpu_count() or 1
+        self.runtime = runtime
+
+        if runtime == 'onnxruntime':
+            import onnxruntime as ort
+            options = ort.SessionOptions()
+            options.intra_op_num_threads = self.num_threads
+            options.inter_op_num_threads = 1
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            self.session = ort.InferenceSession(onnx_path, options, providers=['CPUExecutionProvider'])
+            model_input = self.session.get_inputs()[0]
+            self.input_name = model_input.name
+            self.dynamic_batch = not isinstance(model_input.shape[0], int)
+            meta = self.session.get_modelmeta().custom_metadata_map
+            names = ast.literal_eval(meta['names']) if 'names' in meta else None
+        else:
+            import cv2
+            cv2.setNumThreads(self.num_threads)
+            self.net = cv2.dnn.readNetFromONNX(onnx_path)
+            self.dynamic_batch = False
+            names = None
+
+        if isinstance(names, dict):
+            names = [names[k] for k in sorted(names)]
+        self.class_names = class_names or names or DEFAULT_NAMES
+
+    def _forward(self, batch):
+        if self.runtime == 'onnxruntime':
+            if self.dynamic_batch:
+                return self.session.run(None, {self.input_name: batch})[0]
+            return np.concatenate([self.session.run(None, {self.input_name: b[None]})[0] for b in batch])
+        outputs = []
+        for b in batch:
+            self.net.setInput(b[None])
+            outputs.append(self.net.forward())
+        return np.concatenate(outputs)
+
+    def detect(self, images):
+        """
+        images: list of RGB uint8 arrays (any size).
+        Returns per image a list of (x0, y0, x1, y1, class_name, score) in image pixels.
+        """
+        batch, scales, pads = letterbox_batch(images, self.img_size)
+        preds = self._forward(batch)
+        results = []
+        for i, pred in enumerate(preds):
+            boxes, scores, class_ids = postprocess(pred, self.conf_threshold, self.iou_threshold)
+            boxes = (boxes - np.tile(pads[i], 2)) / scales[i]
+            h, w = images[i].shape[:2]
+            boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, w)
+            boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, h)
+            results.append([
+                (*map(float, box), self.class_names[c], float(s))
+                for box, s, c in zip(boxes, scores, class_ids)
+            ])
+        return results
+
+    def detect_rows(self, images, frame_ids, timestamps=None):
+        """Same rows as disease_predictions.csv: (FrameID, Timestamp, Disease, Confidence%)"""
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        timestamps = timestamps or [now] * len(images)
+        rows = []
+        for frame_id, ts, dets in zip(frame_ids, timestamps, self.detect(images)):
+            rows.extend((frame_id, ts, name, round(score * 100, 2)) for *_, name, score in dets)
+        return rows
+
+def load_rgb(path):
+    import cv2
+    img = cv2.imread(path)
+    if img is None:
+        raise FileNotFoundError(path)
+    return cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+
+# -----------------------------
+# 4. CLI
+# -----------------------------
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export / run the YOLOv5 rose-leaf detector on CPU")
+    sub = parser.add_subparsers(dest='command', required=True)
+    p_export = sub.add_parser('export', help='Export .pt weights to ONNX')
+    p_export.add_argument('--weights', default=WEIGHTS)
+    p_export.add_argument('--img-size', type=int, default=640)
+    p_detect = sub.add_parser('detect', help='Detect on images and print CSV rows')
+    p_detect.add_argument('images', nargs='+')
+    p_detect.add_argument('--onnx', default=ONNX_PATH)
+    p_detect.add_argument('--img-size', type=int, default=640)
+    p_detect.add_argument('--threads', type=int, default=None)
+    p_detect.add_argument('--runtime', choices=['onnxruntime', 'opencv'], default='onnxruntime')
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        print("Saved", export_onnx(args.weights, args.img_size))
+    else:
+        engine = YoloEngine(args.onnx, args.img_size, args.threads, runtime=args.runtime)
+        frames = [load_rgb(p) for p in args.images]
+        print("FrameID,Timestamp,Disease,Confidence")
+        for row in engine.detect_rows(frames, frame_ids=range(1, len(frames) + 1)):
+            print(",".join(str(v) for v in row))
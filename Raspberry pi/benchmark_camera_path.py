@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark: camera -> model input -> archive/notify, disk path vs in-memory path
+- disk: the old main_pi.py flow; capture_file() writes a JPEG, the file is
+  read back for the CNN upload and for Telegram, and decoded again for
+  the model (load_img-equivalent decode + resize)
+- memory: camera.py; capture into a NumPy array, one resize into the model
+  input (load_leaf_array), JPEG encoded once and the same bytes archived,
+  uploaded and sent
+Runs on any Linux box with ReplayCamera over a folder of images (or
+synthetic frames). Each mode runs in its own process so peak RSS is per
+mode; "over setup" is the peak above the RSS once the replay frames are
+loaded, i.e. what the capture path itself needs.
+
+Usage:
+    python benchmark_camera_path.py --frames 50 --size 1640x1232
+    python benchmark_camera_path.py --folder leaf_images/ --backend tflite
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from camera import ReplayCamera
+
+CNN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'CNN')
+sys.path.insert(0, CNN_DIR)
+from Disease_prediction_py import IMG_SIZE, load_leaf_array, load_leaf_image_bytes, predict_arrays  # noqa: E402
+
+
+def make_frames(folder, count, size):
+    from PIL import Image
+    rng = np.random.default_rng(0)
+    w, h = size
+    for i in range(count):
+        # Smooth gradients plus noise: compresses like a photo, not like pure noise
+        yy, xx = np.mgrid[0:h, 0:w]
+        img = np.stack([(xx * (i + 1)) % 256, (yy + 40 * i) % 256, (xx + yy) % 256], axis=-1)
+        img = np.clip(img + rng.integers(-8, 8, img.shape), 0, 255).astype(np.uint8)
+        Image.fromarray(img).save(os.path.join(folder, f"leaf_{i:03d}.jpg"), quality=90)
+
+
+def run_disk(camera, out_dir, frames, backend):
+    batch = np.empty((1,) + IMG_SIZE + (3,), dtype=np.float32)
+    for i in range(frames):
+        path = os.path.join(out_dir, f"plant_{i:05d}.jpg")
+        camera.capture_file(path)
+        for _consumer in ('upload', 'telegram'):
+            with open(path, 'rb') as f:
+                payload = f.read()
+        with open(path, 'rb') as f:
+            batch[0] = load_leaf_image_bytes(f.read())
+        if backend:
+            predict_arrays(batch, backend=backend)
+    return len(payload)
+
+
+def run_memory(camera, out_dir, frames, backend):
+    batch = np.empty((1,) + IMG_SIZE + (3,), dtype=np.float32)
+    for i in range(frames):
+        frame = camera.capture()
+        load_leaf_array(frame.array, out=batch[0])
+        if backend:
+            predict_arrays(batch, backend=backend)
+        with open(os.path.join(out_dir, f"plant_{i:05d}.jpg"), 'wb') as f:
+            f.write(frame.jpeg)
+        for _consumer in ('upload', 'telegram'):
+            payload = frame.jpeg
+    return len(payload)
+
+
+def proc_status_kb(field):
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(field + ':'):
+                return int(line.split()[1])
+    return 0
+
+
+def reset_peak_rss():
+    """Restart VmHWM at the current RSS (Linux 4.0+), so setup does not count"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+def child(args):
+    """One mode in this process; prints a JSON line"""
+    camera = ReplayCamera(args.folder, size=args.size_tuple, limit=args.frames)
+    if args.backend:
+        from Disease_prediction_py import get_backend, warm_up
+        warm_up(get_backend(args.backend))
+    run = run_disk if args.mode == 'disk' else run_memory
+    with tempfile.TemporaryDirectory() as out_dir:
+        run(camera, out_dir, 2, args.backend)            # warm-up (index tables, allocator)
+        rss_before = proc_status_kb('VmRSS')
+        reset_peak_rss()
+        start = time.perf_counter()
+        cpu_start = time.process_time()
+        jpeg_bytes = run(camera, out_dir, args.frames, args.backend)
+        elapsed = time.perf_counter() - start
+        cpu = time.process_time() - cpu_start
+        peak = proc_status_kb('VmHWM')
+    print(json.dumps({'mode': args.mode, 'ms_per_frame': elapsed / args.frames * 1000,
+                      'cpu_ms_per_frame': cpu / args.frames * 1000, 'peak_rss_mb': peak / 1024,
+                      'peak_over_setup_mb': (peak - rss_before) / 1024, 'jpeg_kb': jpeg_bytes / 1024}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--folder', default=None, help='Images to replay (default: synthetic frames)')
+    parser.add_argument('--frames', type=int, default=30)
+    parser.add_argument('--size', default='1640x1232', help='Camera resolution WxH')
+    parser.add_argument('--backend', default=None, help='Also run the model (keras/tflite); default: input only')
+    parser.add_argument('--mode', choices=('disk', 'memory'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    args.size_tuple = tuple(int(v) for v in args.size.split('x'))
+
+    if args.mode:
+        return child(args)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = args.folder
+        if folder is None:
+            folder = tmp
+            make_frames(folder, min(args.frames, 10), args.size_tuple)
+        print(f"{args.frames} frames at {args.size}, model: {args.backend or 'input prep only'}\n")
+        print(f"{'mode':<8}{'ms/frame':>10}{'cpu ms':>9}{'peak RSS MB':>13}{'over setup':>12}{'JPEG KB':>9}")
+        for mode in ('disk', 'memory'):
+            cmd = [sys.executable, os.path.abspath(__file__), '--mode', mode, '--folder', folder,
+                   '--frames', str(args.frames), '--size', args.size]
+            if args.backend:
+                cmd += ['--backend', args.backend]
+            result = json.loads(subprocess.run(cmd, check=True, capture_output=True, text=True).stdout.splitlines()[-1])
+            print(f"{mode:<8}{result['ms_per_frame']:>10.1f}{result['cpu_ms_per_frame']:>9.1f}"
+                  f"{result['peak_rss_mb']:>13.1f}{result['peak_over_setup_mb']:>12.1f}{result['jpeg_kb']:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
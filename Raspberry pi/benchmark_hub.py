@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+
+"""
+Load test: a few hundred simulated Pis pushing readings and frames to one hub
+Runs plant_hub.PlantHub in-process with a stand-in model (fixed ms per
+batch) behind the shared MicroBatcher, then reports per-device memory and
+ingest latency.
+
+Usage:
+    python benchmark_hub.py --devices 300 --rounds 10 --frame-every 10 --model-ms 20
+"""
+
+import argparse
+import asyncio
+import io
+import random
+import sys
+import time
+import tracemalloc
+
+import aiohttp
+import numpy as np
+from aiohttp import web
+
+from plant_hub import CNN_DIR, DeviceRegistry, PlantHub
+from sensor_protocol import encode_frame
+
+sys.path.insert(0, CNN_DIR)
+from inference_server import MicroBatcher  # noqa: E402
+
+
+class FixedCostBackend:
+    """Stand-in model: random probabilities after a fixed per-batch delay"""
+
+    def __init__(self, ms_per_batch, num_classes=3):
+        self.ms_per_batch = ms_per_batch
+        self.rng = np.random.default_rng(0)
+        self.num_classes = num_classes
+
+    def predict(self, batch):
+        time.sleep(self.ms_per_batch / 1000)
+        probs = self.rng.random((len(batch), self.num_classes))
+        return probs / probs.sum(axis=1, keepdims=True)
+
+
+def rss_kb():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+    return 0
+
+
+def jpeg_bytes(seed):
+    from PIL import Image
+    rng = np.random.default_rng(seed)
+    buf = io.BytesIO()
+    Image.fromarray(rng.integers(0, 255, (480, 640, 3), dtype=np.uint8)).save(buf, 'JPEG', quality=80)
+    return buf.getvalue()
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) * 1000 if values else float('nan')
+
+
+async def device(session, base, name, token, rounds, frame_every, frame, latencies, interval):
+    headers = {'X-Device-Token': token}
+    rng = random.Random(name)
+    await asyncio.sleep(rng.uniform(0, interval))   # devices are not in lock-step
+    offset = rng.randrange(frame_every) if frame_every else 0
+    for r in range(rounds):
+        line = encode_frame(rng.uniform(18, 32), rng.uniform(40, 80), rng.randint(300, 700),
+                            rng.randint(100, 900), rng.random() < 0.2, rng.random() < 0.5)
+        start = time.perf_counter()
+        async with session.post(f"{base}/devices/{name}/reading", data=line, headers=headers) as resp:
+            await resp.read()
+        latencies['reading'].append(time.perf_counter() - start)
+
+        if frame_every and (r + offset) % frame_every == 0:
+            start = time.perf_counter()
+            async with session.post(f"{base}/devices/{name}/frame", data=frame,
+                                    headers=dict(headers, **{'Content-Type': 'image/jpeg'})) as resp:
+                await resp.read()
+                ok = resp.status == 200
+            latencies['frame' if ok else 'frame_rejected'].append(time.perf_counter() - start)
+        await asyncio.sleep(interval)
+
+
+async def bench(args):
+    frame = jpeg_bytes(0)
+    rss_start = rss_kb()
+    tracemalloc.start()
+
+    registry = DeviceRegistry(path=None)
+    batcher = MicroBatcher(FixedCostBackend(args.model_ms), max_batch_size=args.max_batch_size,
+                           max_wait_ms=args.max_wait_ms, max_queue=args.max_queue, top_k=1)
+    hub = PlantHub(registry, batcher)
+    runner = web.AppRunner(hub.app())
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    base = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+
+    before = tracemalloc.take_snapshot()
+    tokens = {f"plant-{i:04d}": registry.register(f"plant-{i:04d}", save=False)[1] for i in range(args.devices)}
+    after = tracemalloc.take_snapshot()
+    registry_bytes = sum(s.size_diff for s in after.compare_to(before, 'filename'))
+
+    latencies = {'reading': [], 'frame': [], 'frame_rejected': []}
+    start = time.perf_counter()
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=args.connections)) as session:
+        await asyncio.gather(*(
+            device(session, base, name, token, args.rounds, args.frame_every, frame, latencies, args.interval)
+            for name, token in tokens.items()
+        ))
+        async with session.get(f"{base}/devices/plant-0000/status") as resp:
+            sample_status = await resp.json()
+    elapsed = time.perf_counter() - start
+    await runner.cleanup()
+
+    n = args.devices
+    print(f"{n} devices x {args.rounds} rounds in {elapsed:.1f}s "
+          f"({len(latencies['reading']) / elapsed:.0f} readings/s, {len(latencies['frame']) / elapsed:.1f} frames/s)")
+    print(f"State array: {registry.state.itemsize} B/device ({registry.state.nbytes} B for {len(registry.state)} slots)")
+    print(f"Registry (names, tokens, slots, state): {registry_bytes / n:.0f} B/device")
+    print(f"Process RSS growth: {(rss_kb() - rss_start) / n:.1f} KB/device (includes client side)")
+    for kind in ('reading', 'frame'):
+        print(f"{kind:<8} p50 {percentile(latencies[kind], 50):7.1f} ms   p99 {percentile(latencies[kind], 99):7.1f} ms"
+              f"   n={len(latencies[kind])}")
+    if latencies['frame_rejected']:
+        print(f"Frames rejected (503 backpressure): {len(latencies['frame_rejected'])}")
+    print(f"Batches: {batcher.stats['batches']}, avg batch {batcher.stats['images'] / max(batcher.stats['batches'], 1):.1f}")
+    print(f"Sample status: {sample_status}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--devices', type=int, default=300)
+    parser.add_argument('--rounds', type=int, default=10)
+    parser.add_argument('--interval', type=float, default=1.0, help='Seconds between a device\'s readings')
+    parser.add_argument('--frame-every', type=int, default=10, help='Send a frame every N readings (0 = never)')
+    parser.add_argument('--model-ms', type=float, default=20.0)
+    parser.add_argument('--max-batch-size', type=int, default=16)
+    parser.add_argument('--max-wait-ms', type=float, default=5.0)
+    parser.add_argument('--max-queue', type=int, default=512)
+    parser.add_argument('--connections', type=int, default=400)
+    args = parser.parse_args()
+    asyncio.run(bench(args))
+
+
+if __name__ == "__main__":
+    main()
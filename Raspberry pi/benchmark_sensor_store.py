@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark: SensorStore write and query throughput
+Writes N synthetic readings (one every 2 s, like the Arduino sketch), then
+times "last 24h" queries from the rollups against a raw-table scan.
+
+Usage:
+    python benchmark_sensor_store.py --readings 500000
+"""
+
+import argparse
+import math
+import os
+import tempfile
+import time
+
+from sensor_store import SensorStore
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--readings', type=int, default=500000)
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--queries', type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SensorStore(os.path.join(tmp, 'bench.db'), batch_size=args.batch_size, flush_interval=1e9)
+        now = time.time()
+        first_ts = now - args.readings * 2
+
+        start = time.perf_counter()
+        for i in range(args.readings):
+            store.append({
+                'temp': 24 + 4 * math.sin(i / 500), 'humidity': 60 + 10 * math.cos(i / 700),
+                'soil': 450 + (i % 300), 'ldr': 300 + (i % 500), 'pump': 'ON' if i % 300 < 50 else 'OFF',
+            }, ts=first_ts + i * 2)
+        store.flush()
+        write_time = time.perf_counter() - start
+
+        day_ago = now - 86400
+        start = time.perf_counter()
+        for _ in range(args.queries):
+            summary = store.summary(24)
+        rollup_ms = (time.perf_counter() - start) / args.queries * 1000
+
+        start = time.perf_counter()
+        for _ in range(args.queries):
+            store.conn.execute(
+                "SELECT count(*), avg(temp), min(temp), max(temp), avg(humidity), avg(soil), avg(ldr), avg(pump) "
+                "FROM readings WHERE ts >= ?", (day_ago,)
+            ).fetchone()
+        raw_ms = (time.perf_counter() - start) / args.queries * 1000
+
+        size_mb = sum(os.path.getsize(os.path.join(tmp, f)) for f in os.listdir(tmp)) / 1e6
+        store.close()
+
+    print(f"Writes           : {args.readings / write_time:10.0f} readings/s ({write_time:.2f}s, batch {args.batch_size})")
+    print(f"Last 24h (rollup): {rollup_ms:10.2f} ms/query ({summary['readings']} readings summarised)")
+    print(f"Last 24h (raw)   : {raw_ms:10.2f} ms/query")
+    print(f"Database size    : {size_mb:10.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark: polling serial reader (original read_serial_data) vs the
+event-driven reader in sensor_protocol.py, both fed by the pty simulator.
+Reports samples/sec and reader CPU usage (% of one core).
+
+Usage:
+    python benchmark_serial_reader.py --seconds 5 --rate 50
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+import serial
+
+from sensor_protocol import SensorParser, iter_serial_lines
+from serial_simulator import FakeArduino
+
+
+def polling_reader(port_path, seconds):
+    """Original main_pi.read_serial_data loop: spins on ser.in_waiting"""
+    ser = serial.Serial(port_path, 9600, timeout=1)
+    parser = SensorParser()
+    start = time.monotonic()
+    while time.monotonic() - start < seconds:
+        if ser.in_waiting:
+            line = ser.readline().decode('utf-8', errors='ignore')
+            if line.strip():
+                parser.feed_line(line)
+    ser.close()
+    return parser
+
+
+async def _event_reader(port_path, seconds):
+    fd = os.open(port_path, os.O_RDONLY | os.O_NOCTTY | os.O_NONBLOCK)
+    parser = SensorParser()
+
+    async def consume():
+        async for line in iter_serial_lines(fd):
+            parser.feed_line(line)
+
+    try:
+        await asyncio.wait_for(consume(), seconds)
+    except asyncio.TimeoutError:
+        pass
+    finally:
+        os.close(fd)
+    return parser
+
+
+def event_reader(port_path, seconds):
+    return asyncio.run(_event_reader(port_path, seconds))
+
+
+def run(reader, fmt, rate, seconds):
+    arduino = FakeArduino(fmt, rate).start()
+    try:
+        cpu_start, wall_start = time.thread_time(), time.monotonic()
+        parser = reader(arduino.port_path, seconds)
+        cpu, wall = time.thread_time() - cpu_start, time.monotonic() - wall_start
+    finally:
+        arduino.close()
+    return parser.samples / wall, cpu / wall * 100, parser.stats['bad_frames']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=5.0, help='Duration of each run')
+    parser.add_argument('--rate', type=float, default=50.0, help='Simulated samples per second')
+    args = parser.parse_args()
+
+    print(f"{'Reader':<10}{'Format':<9}{'samples/s':>11}{'CPU %':>8}{'bad':>6}")
+    for name, reader, fmt in [
+        ('polling', polling_reader, 'legacy'),
+        ('event', event_reader, 'legacy'),
+        ('event', event_reader, 'framed'),
+    ]:
+        rate, cpu, bad = run(reader, fmt, args.rate, args.seconds)
+        print(f"{name:<10}{fmt:<9}{rate:>11.1f}{cpu:>8.1f}{bad:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,361 @@
+# -*- coding: utf-8 -*-
+
+"""
+End-to-end benchmark suite (no hardware, no network)
+- predict: images/s of predict_leaf_disease (file decode + resize + model)
+  and predict_frame (in-memory frame), using a tiny random model with the
+  shape of the MobileNetV2 head (7x7x1280 features -> global average pool
+  -> Dense(1024) -> Dense(3)), so the numbers measure our code, not the net
+- serial: samples/s read by sensor_protocol from a pty fake Arduino
+  sending the plant_detection.ino output format (serial_simulator.py)
+- cycle: latency of main_pi.main() capture cycles with the pty Arduino,
+  ReplayCamera over a folder of leaf images, the tiny model on-device and
+  Telegram going to the local fake Bot API (fake_bot_api.py)
+- bot: telegram_bot.py command handler latency, replies included
+A workload whose dependencies are missing is recorded as skipped. Results
+are written as JSON; --compare prints the change against an earlier run
+(e.g. the same suite on the previous commit).
+
+Usage:
+    python benchmark_suite.py --out bench.json
+    git checkout HEAD~1 && python benchmark_suite.py --out old.json
+    python benchmark_suite.py --out new.json --compare old.json
+    python benchmark_suite.py --only serial,cycle --images leaf_images/
+"""
+
+import argparse
+import asyncio
+import contextlib
+import glob
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+import numpy as np
+
+from fake_bot_api import start_fake_api
+from sensor_protocol import SensorParser, iter_serial_lines
+from serial_simulator import FakeArduino
+from telegram_dispatcher import TelegramDispatcher
+
+CNN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'CNN')
+sys.path.insert(0, CNN_DIR)
+
+WORKLOADS = ('predict', 'serial', 'cycle', 'bot')
+# /water is left out: it holds the pump on for 5 s by design
+BOT_COMMANDS = ('start', 'status', 'toggle_uv', 'history', 'jobs', 'photo', 'metrics')
+TOKEN = 'TEST:TOKEN'
+
+
+class TinyLeafModel:
+    """
+    Random-weight stand-in for model.h5 with the same input, head and output:
+    (N, 224, 224, 3) -> 7x7x1280 feature map (32x32 average pool + 1x1
+    projection, ReLU6 like MobileNetV2) -> GAP -> Dense(1024, relu) -> Dense(3, softmax)
+    """
+    name = 'tiny'
+
+    def __init__(self, num_classes=3, seed=0):
+        rng = np.random.default_rng(seed)
+        self.w_features = rng.normal(0, 2.0, (3, 1280)).astype(np.float32)
+        self.w_hidden = rng.normal(0, 1 / 36, (1280, 1024)).astype(np.float32)
+        self.b_hidden = np.zeros(1024, dtype=np.float32)
+        self.w_out = rng.normal(0, 1 / 32, (1024, num_classes)).astype(np.float32)
+        self.b_out = np.zeros(num_classes, dtype=np.float32)
+
+    def predict(self, batch):
+        batch = np.asarray(batch, dtype=np.float32)
+        n = len(batch)
+        pooled = batch.reshape(n, 7, 32, 7, 32, 3).mean(axis=(2, 4))
+        features = np.clip(pooled @ self.w_features, 0, 6)
+        hidden = np.maximum(features.mean(axis=(1, 2)) @ self.w_hidden + self.b_hidden, 0)
+        logits = hidden @ self.w_out + self.b_out
+        exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+        return exp / exp.sum(axis=1, keepdims=True)
+
+
+def latency_stats(seconds):
+    """ms summary of a list of durations"""
+    ms = np.asarray(seconds) * 1000
+    return {'n': int(len(ms)), 'mean_ms': float(ms.mean()), 'p50_ms': float(np.percentile(ms, 50)),
+            'p95_ms': float(np.percentile(ms, 95)), 'max_ms': float(ms.max())}
+
+
+def unlimited_dispatcher(base_url, workdir, name):
+    """
+    TelegramDispatcher without flood limits: back-to-back cycles would
+    otherwise measure the 1 msg/s per-chat wait
+    (benchmark_telegram_dispatcher.py covers the limits themselves)
+    """
+    return TelegramDispatcher(TOKEN, api_base=base_url, per_chat_rate=1e6, per_chat_burst=1e6, global_rate=1e6,
+                              cache_path=os.path.join(workdir, f"{name}_file_ids.json"))
+
+
+def image_paths(folder):
+    return sorted(p for ext in ('jpg', 'jpeg', 'png') for p in glob.glob(os.path.join(folder, f'*.{ext}')))
+
+
+# ====== Workloads ======
+def bench_predict(images, model, seconds):
+    from camera import ReplayCamera
+    from Disease_prediction_py import predict_frame, predict_leaf_disease
+
+    def rate(fn, items):
+        fn(items[0])                                    # warm-up (index tables, lazy imports)
+        count, start = 0, time.perf_counter()
+        while time.perf_counter() - start < seconds:
+            fn(items[count % len(items)])
+            count += 1
+        return count / (time.perf_counter() - start)
+
+    result = {}
+    paths = image_paths(images)
+    try:
+        result['predict_leaf_disease_images_per_s'] = rate(lambda p: predict_leaf_disease(p, backend=model), paths)
+    except ImportError as e:
+        result['predict_leaf_disease_skipped'] = f"{e.name} not installed (load_leaf_image decodes with keras)"
+    camera = ReplayCamera(images)
+    frames = [camera.capture().array for _ in camera.paths]
+    result['predict_frame_images_per_s'] = rate(lambda f: predict_frame(f, backend=model), frames)
+    result['frame_size'] = list(frames[0].shape[1::-1])
+    return result
+
+
+async def bench_serial(seconds):
+    """Fake Arduino at full speed -> SensorParser, like main_pi.SerialReader"""
+    arduino = FakeArduino('both', rate=0).start()
+    fd = os.open(arduino.port_path, os.O_RDONLY | os.O_NOCTTY | os.O_NONBLOCK)
+    parser = SensorParser()
+
+    async def consume():
+        async for line in iter_serial_lines(fd):
+            parser.feed_line(line)
+
+    reader = asyncio.create_task(consume())
+    await asyncio.sleep(0.2)                            # let the pipe fill
+    start_samples, start = parser.samples, time.perf_counter()
+    cpu_start = time.process_time()
+    await asyncio.sleep(seconds)
+    samples, elapsed = parser.samples - start_samples, time.perf_counter() - start
+    cpu = time.process_time() - cpu_start
+    # Keep draining until the writer thread is gone, or it blocks on a full pty
+    await asyncio.get_running_loop().run_in_executor(None, arduino.stop)
+    reader.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await reader
+    os.close(fd)
+    arduino.close()
+    return {'samples_per_s': samples / elapsed, 'bad_frames': parser.stats['bad_frames'],
+            'process_cpu_percent': cpu / elapsed * 100}
+
+
+async def bench_cycle(arduino, api, dispatcher, model, cycles, warmup, timeout):
+    """main_pi.main() against the fakes; every preview triggers a full cycle"""
+    import main_pi
+    from capture_scheduler import AdaptiveScheduler
+
+    class StageRecorder(main_pi.StageMetrics):
+        def __init__(self):
+            super().__init__()
+            self.samples = {}
+
+        def record(self, stage, seconds):
+            super().record(stage, seconds)
+            self.samples.setdefault(stage, []).append(seconds)
+
+    recorder = main_pi.metrics = StageRecorder()
+    main_pi.scheduler = AdaptiveScheduler(0, 0, 0, heartbeat=0)
+    main_pi.LOCAL_BACKEND = model
+    main_pi.dispatcher = dispatcher
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        task = asyncio.create_task(main_pi.main())
+        deadline = time.monotonic() + timeout
+        while len(recorder.samples.get('cycle', ())) < warmup + cycles and time.monotonic() < deadline:
+            if task.done():
+                task.result()                           # surface the error
+            await asyncio.sleep(0.01)
+        await asyncio.get_running_loop().run_in_executor(None, arduino.stop)
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+
+    done = recorder.samples.get('cycle', [])[warmup:]
+    if not done:
+        raise RuntimeError(f"no cycles completed within {timeout}s")
+    result = {'cycle': latency_stats(done)}
+    for stage in ('sensor', 'preview', 'capture', 'inference', 'telegram'):
+        if recorder.samples.get(stage):
+            result[stage] = latency_stats(recorder.samples[stage][warmup:] or recorder.samples[stage])
+    result['telegram_messages'] = api.stats['messages']
+    result['serial_samples'] = main_pi.serial_samples.values.get((), 0)
+    return result
+
+
+async def bench_bot(dispatcher, rounds):
+    import telegram
+    from telegram import Update
+
+    import telegram_bot
+
+    telegram_bot.dispatcher = dispatcher
+    bot = telegram_bot.bot
+    await bot.initialize()
+    context = SimpleNamespace(args=[])
+    result = {}
+    message_id = 0
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            for name in BOT_COMMANDS:
+                handler = getattr(telegram_bot, f"{name}_command")
+                seconds = []
+                for _ in range(rounds):
+                    message_id += 1
+                    update = Update.de_json({'update_id': message_id, 'message': {
+                        'message_id': message_id, 'date': int(time.time()), 'text': f"/{name}",
+                        'chat': {'id': 1, 'type': 'private'},
+                        'from': {'id': 1, 'is_bot': False, 'first_name': 'Bench'}}}, bot)
+                    start = time.perf_counter()
+                    await handler(update, context)
+                    seconds.append(time.perf_counter() - start)
+                result[name] = latency_stats(seconds)
+    except telegram.error.TelegramError as e:
+        raise RuntimeError(f"Bot API call failed: {e}") from e
+    finally:
+        await telegram_bot.dispatcher.close()
+        await bot.shutdown()
+    return result
+
+
+async def run_async(args, images, workdir, model, results):
+    """Workloads that need the event loop, the fake Bot API or main_pi's import-time setup"""
+    if 'serial' in args.only:
+        results['serial'] = await guarded(bench_serial(args.seconds))
+    if 'cycle' not in args.only and 'bot' not in args.only:
+        return
+
+    # Unlimited rates and no simulated latency: the fake API should not be the bottleneck
+    api, runner, base_url = await start_fake_api(chat_rate=1e6, chat_burst=1e6, global_rate=1e6, latency=0)
+    arduino = FakeArduino('both', rate=args.serial_rate).start()
+    import metrics
+    metrics_server = metrics.serve(0, '127.0.0.1')
+    os.environ.update({
+        'PLANT_SERIAL_PORT': arduino.port_path,
+        'PLANT_REPLAY_FOLDER': images,
+        'PLANT_IMAGE_FOLDER': os.path.join(workdir, 'archive'),
+        'PLANT_SENSOR_DB': os.path.join(workdir, 'sensors.db'),
+        'PLANT_TELEGRAM_API': base_url,
+        'PLANT_METRICS_PORT': '0',
+        'PLANT_METRICS_URL': f"http://127.0.0.1:{metrics_server.server_address[1]}/metrics",
+    })
+    try:
+        if 'cycle' in args.only:
+            dispatcher = unlimited_dispatcher(base_url, workdir, 'main_pi')
+            results['cycle'] = await guarded(bench_cycle(arduino, api, dispatcher, model, args.cycles, args.warmup,
+                                                         args.timeout))
+        if 'bot' in args.only:
+            results['bot'] = await guarded(bench_bot(unlimited_dispatcher(base_url, workdir, 'bot'), args.rounds))
+    finally:
+        await asyncio.get_running_loop().run_in_executor(None, arduino.stop)
+        arduino.close()
+        metrics_server.shutdown()
+        await runner.cleanup()
+
+
+async def guarded(coro):
+    """A workload's result, or why it could not run"""
+    try:
+        return await coro
+    except ImportError as e:
+        return {'skipped': f"{e.name} not installed"}
+
+
+# ====== Reporting ======
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {'commit': commit, 'date': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(), 'machine': platform.machine(), 'cpus': os.cpu_count()}
+
+
+def flatten(tree, prefix=''):
+    out = {}
+    for key, value in tree.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            out.update(flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            out[name] = value
+    return out
+
+
+def compare(old, new):
+    """Print every numeric result of both runs with the relative change"""
+    before, after = flatten(old['results']), flatten(new['results'])
+    print(f"\nvs {old['environment'].get('commit')} ({old['environment'].get('date')})")
+    print(f"{'metric':<44}{'before':>12}{'after':>12}{'change':>9}")
+    for name in sorted(set(before) | set(after)):
+        a, b = before.get(name), after.get(name)
+        change = f"{(b - a) / a * 100:+.1f}%" if a and b is not None else '-'
+        print(f"{name:<44}{'-' if a is None else f'{a:.2f}':>12}{'-' if b is None else f'{b:.2f}':>12}{change:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--only', default=','.join(WORKLOADS), help='Comma-separated subset of ' + ','.join(WORKLOADS))
+    parser.add_argument('--images', default=None, help='Leaf images to replay (default: synthetic frames)')
+    parser.add_argument('--size', default='1640x1232', help='Synthetic frame size WxH')
+    parser.add_argument('--seconds', type=float, default=3.0, help='Duration of the throughput workloads')
+    parser.add_argument('--cycles', type=int, default=20)
+    parser.add_argument('--warmup', type=int, default=2, help='Cycles not counted (archive upkeep, lazy imports)')
+    parser.add_argument('--timeout', type=float, default=120.0, help='Give up on the cycle workload after this')
+    parser.add_argument('--serial-rate', type=float, default=20.0, help='Fake Arduino samples/s during cycles')
+    parser.add_argument('--rounds', type=int, default=20, help='Calls per bot command')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default='benchmark_results.json')
+    parser.add_argument('--compare', default=None, help='Earlier JSON result to compare against')
+    args = parser.parse_args()
+    args.only = [w for w in args.only.split(',') if w]
+    unknown = set(args.only) - set(WORKLOADS)
+    if unknown:
+        parser.error(f"unknown workloads {sorted(unknown)}; choose from {WORKLOADS}")
+
+    model = TinyLeafModel(seed=args.seed)
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        images = args.images
+        if images is None:
+            from benchmark_camera_path import make_frames
+            images = os.path.join(workdir, 'leaves')
+            os.makedirs(images)
+            make_frames(images, 8, tuple(int(v) for v in args.size.split('x')))
+
+        if 'predict' in args.only:
+            try:
+                results['predict'] = bench_predict(images, model, args.seconds)
+            except ImportError as e:
+                results['predict'] = {'skipped': f"{e.name} not installed"}
+        asyncio.run(run_async(args, images, workdir, model, results))
+
+    report = {'environment': environment(), 'config': vars(args), 'results': results}
+    with open(args.out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(results, indent=2))
+    print(f"Saved to {args.out}")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
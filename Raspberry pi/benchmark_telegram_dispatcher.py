@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark: Telegram sends for many plants against the local fake Bot API
+Each plant (chat) gets a cycle update (text + photo) and a report (PDF,
+CSV, two charts), for several rounds with unchanged report files.
+- sequential: one await per message, like send_disease_report_auto();
+  a 429 is printed and the message is lost
+- dispatcher: TelegramDispatcher (rate limits, media groups, retries,
+  file_id cache)
+
+Usage:
+    python benchmark_telegram_dispatcher.py --plants 20 --rounds 2
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+import aiohttp
+
+from fake_bot_api import start_fake_api
+from telegram_dispatcher import TelegramDispatcher
+
+TOKEN = 'TEST:TOKEN'
+
+
+def make_files(folder):
+    sizes = {'plant.jpg': 300_000, 'report.pdf': 800_000, 'predictions.csv': 50_000,
+             'confidence_chart.png': 40_000, 'detection_chart.png': 40_000}
+    paths = {}
+    for name, size in sizes.items():
+        paths[name] = os.path.join(folder, name)
+        with open(paths[name], 'wb') as f:
+            f.write(os.urandom(size))
+    return paths
+
+
+async def run_sequential(base_url, plants, rounds, files):
+    lost = 0
+    async with aiohttp.ClientSession() as session:
+        async def call(method, chat, field=None, path=None, **fields):
+            nonlocal lost
+            form = aiohttp.FormData()
+            form.add_field('chat_id', str(chat))
+            for k, v in fields.items():
+                form.add_field(k, v)
+            if path:
+                with open(path, 'rb') as f:
+                    form.add_field(field, f.read(), filename=os.path.basename(path))
+            async with session.post(f"{base_url}/bot{TOKEN}/{method}", data=form) as resp:
+                if not (await resp.json())['ok']:
+                    lost += 1
+
+        for _ in range(rounds):
+            for chat in range(plants):
+                await call('sendMessage', chat, text='🌿 Smart Plant Monitor Update')
+                await call('sendPhoto', chat, 'photo', files['plant.jpg'])
+                await call('sendDocument', chat, 'document', files['report.pdf'])
+                await call('sendDocument', chat, 'document', files['predictions.csv'])
+                await call('sendPhoto', chat, 'photo', files['confidence_chart.png'])
+                await call('sendPhoto', chat, 'photo', files['detection_chart.png'])
+    return lost
+
+
+async def run_dispatcher(base_url, plants, rounds, files, cache_path):
+    dispatcher = TelegramDispatcher(TOKEN, api_base=base_url, cache_path=cache_path)
+    futures = []
+    for _ in range(rounds):
+        for chat in range(plants):
+            futures.append(dispatcher.send_text(chat, '🌿 Smart Plant Monitor Update'))
+            futures.append(dispatcher.send_photo(chat, files['plant.jpg']))
+            futures.append(dispatcher.send_document(chat, files['report.pdf']))
+            futures.append(dispatcher.send_document(chat, files['predictions.csv']))
+            futures.append(dispatcher.send_photo(chat, files['confidence_chart.png']))
+            futures.append(dispatcher.send_photo(chat, files['detection_chart.png']))
+    results = await asyncio.gather(*futures, return_exceptions=True)
+    await dispatcher.close()
+    return sum(isinstance(r, Exception) for r in results), dispatcher.stats
+
+
+async def bench(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        files = make_files(tmp)
+        total = args.plants * args.rounds * 6
+        print(f"{args.plants} plants x {args.rounds} rounds = {total} messages\n")
+        print(f"{'mode':<12}{'seconds':>9}{'msg/s':>8}{'calls':>7}{'429s':>6}{'lost':>6}{'uploaded MB':>13}")
+
+        for mode in ('sequential', 'dispatcher'):
+            api, runner, base_url = await start_fake_api(chat_rate=args.chat_rate, global_rate=args.global_rate,
+                                                         latency=args.latency)
+            start = time.perf_counter()
+            if mode == 'sequential':
+                lost = await run_sequential(base_url, args.plants, args.rounds, files)
+            else:
+                lost, _ = await run_dispatcher(base_url, args.plants, args.rounds, files,
+                                               os.path.join(tmp, 'file_ids.json'))
+            elapsed = time.perf_counter() - start
+            s = api.stats
+            print(f"{mode:<12}{elapsed:>9.2f}{(total - lost) / elapsed:>8.1f}{s['calls']:>7}"
+                  f"{s['rejected_429']:>6}{lost:>6}{s['upload_bytes'] / 1e6:>13.1f}")
+            await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--plants', type=int, default=20)
+    parser.add_argument('--rounds', type=int, default=2)
+    parser.add_argument('--chat-rate', type=float, default=1.0)
+    parser.add_argument('--global-rate', type=float, default=30.0)
+    parser.add_argument('--latency', type=float, default=0.03)
+    args = parser.parse_args()
+    asyncio.run(bench(args))
+
+
+if __name__ == "__main__":
+    main()
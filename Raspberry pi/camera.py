@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+
+"""
+Camera abstraction with an in-memory frame path
+- PiCamera: Picamera2 capture_array() into a NumPy buffer (no JPEG written
+  just to be read back), plus the low-res preview used by capture_scheduler
+- ReplayCamera: same interface over a folder of saved images, so the whole
+  capture -> model -> archive/notify path runs on any Linux box
+- Frame: one capture; the model input is made straight from the array
+  (Disease_prediction_py.load_leaf_array) and the JPEG is encoded at most
+  once, the same bytes going to the archive file, the CNN/hub upload and
+  Telegram
+"""
+
+import glob
+import io
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+
+from capture_scheduler import PREVIEW_SIZE, downscale, yuv420_to_rgb
+
+try:
+    import simplejpeg           # Installed with picamera2; much faster than PIL on the Pi
+except ImportError:
+    simplejpeg = None
+
+JPEG_QUALITY = 90
+
+# ====== Frames ======
+def encode_jpeg(array, quality=JPEG_QUALITY):
+    if simplejpeg is not None:
+        return simplejpeg.encode_jpeg(np.ascontiguousarray(array), quality=quality, colorspace='RGB')
+    from PIL import Image
+    buf = io.BytesIO()
+    Image.fromarray(array).save(buf, 'JPEG', quality=quality)
+    return buf.getvalue()
+
+class Frame:
+    __slots__ = ('array', 'timestamp', 'quality', '_jpeg')
+
+    def __init__(self, array, timestamp=None, quality=JPEG_QUALITY):
+        self.array = array          # (H, W, 3) uint8 RGB, owned by this frame
+        self.timestamp = timestamp or datetime.now()
+        self.quality = quality
+        self._jpeg = None
+
+    @property
+    def jpeg(self):
+        """Encoded on first use, then shared by every consumer"""
+        if self._jpeg is None:
+            self._jpeg = encode_jpeg(self.array, self.quality)
+        return self._jpeg
+
+    @property
+    def filename(self):
+        return f"plant_{self.timestamp.strftime('%Y%m%d_%H%M%S')}.jpg"
+
+    def save(self, folder):
+        """Write the JPEG into folder (same naming as before); returns the path"""
+        path = os.path.join(folder, self.filename)
+        with open(path, 'wb') as f:
+            f.write(self.jpeg)
+        return path
+
+    def preview(self, size=PREVIEW_SIZE):
+        return downscale(self.array, size)
+
+# ====== Cameras ======
+class PiCamera:
+    def __init__(self, preview_size=PREVIEW_SIZE, main_size=None, warmup=2.0):
+        from picamera2 import Picamera2
+        self.preview_size = preview_size
+        self.picam2 = Picamera2()
+        # Picamera2 names formats by register order: 'BGR888' arrays are R, G, B in memory
+        main = {'format': 'BGR888'}
+        if main_size:
+            main['size'] = main_size
+        self.picam2.configure(self.picam2.create_still_configuration(main=main, lores={'size': preview_size}))
+        self.picam2.start()
+        time.sleep(warmup)
+
+    def capture(self):
+        return Frame(self.picam2.capture_array('main'))
+
+    def capture_preview(self):
+        """Low-resolution RGB preview from the lores stream (no JPEG, no disk)"""
+        frame = self.picam2.capture_array('lores')
+        if frame.ndim == 2:  # YUV420 (the only lores format on most Pis)
+            return yuv420_to_rgb(frame, *self.preview_size)
+        return frame[..., :3]
+
+    def capture_file(self, path):
+        self.picam2.capture_file(path)
+
+    def close(self):
+        self.picam2.close()
+
+class ReplayCamera:
+    """
+    Stand-in camera over a folder of images, looping forever.
+    Frames are decoded once up front (preload) so that, like a real camera,
+    capture() costs no decode time.
+    """
+
+    def __init__(self, folder, preview_size=PREVIEW_SIZE, size=None, preload=True, limit=None):
+        from PIL import Image
+        self._open = Image.open
+        self.paths = sorted(p for ext in ('jpg', 'jpeg', 'png') for p in glob.glob(os.path.join(folder, f'*.{ext}')))
+        if limit:
+            self.paths = self.paths[:limit]
+        if not self.paths:
+            raise FileNotFoundError(f"No images in {folder}")
+        self.preview_size = preview_size
+        self.size = size                # (width, height) like Picamera2's main size
+        self._frames = [self._load(p) for p in self.paths] if preload else None
+        self._next = 0
+
+    def _load(self, path):
+        with self._open(path) as img:
+            img = img.convert('RGB')
+            if self.size and img.size != tuple(self.size):
+                img = img.resize(self.size)
+            return np.asarray(img)
+
+    def _array(self):
+        i = self._next % len(self.paths)
+        self._next += 1
+        # A camera hands out a new buffer per capture
+        return self._frames[i].copy() if self._frames is not None else self._load(self.paths[i])
+
+    def capture(self):
+        return Frame(self._array())
+
+    def capture_preview(self):
+        """Preview of the frame the next capture() returns"""
+        i = self._next % len(self.paths)
+        array = self._frames[i] if self._frames is not None else self._load(self.paths[i])
+        return downscale(array, self.preview_size)
+
+    def capture_file(self, path):
+        """What Picamera2.capture_file does: encode and write, nothing kept in memory"""
+        with open(path, 'wb') as f:
+            f.write(encode_jpeg(self._array()))
+
+    def close(self):
+        self._frames = None
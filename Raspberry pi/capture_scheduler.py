@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+
+"""
+Adaptive capture scheduling for main_pi.py
+- A low-resolution preview is scored with NumPy only: mean absolute
+  difference against the last captured view, plus the vegetation
+  (excess-green, ExG = 2G - R - B) fraction
+- Full capture / upload / inference only happens when the view changed,
+  a sensor crossed a threshold, or a heartbeat is due
+- Recent diseased predictions shorten the interval; quiet periods
+  stretch it back towards max_interval
+"""
+
+import time
+from collections import Counter, deque
+
+import numpy as np
+
+PREVIEW_SIZE = (160, 120)
+
+# ====== Preview scoring ======
+def yuv420_to_rgb(yuv, width, height):
+    """Picamera2 'lores' YUV420 (I420) buffer -> RGB uint8, nearest-neighbour chroma"""
+    y = yuv[:height, :width].astype(np.int16)
+    chroma = yuv[height:height + height // 2].reshape(-1)
+    quarter = (width // 2) * (height // 2)
+    u = chroma[:quarter].reshape(height // 2, width // 2).repeat(2, 0).repeat(2, 1).astype(np.int16) - 128
+    v = chroma[quarter:2 * quarter].reshape(height // 2, width // 2).repeat(2, 0).repeat(2, 1).astype(np.int16) - 128
+    r = y + ((359 * v) >> 8)
+    g = y - ((88 * u + 183 * v) >> 8)
+    b = y + ((454 * u) >> 8)
+    return np.clip(np.stack([r, g, b], axis=-1), 0, 255).astype(np.uint8)
+
+def preview_features(preview, exg_threshold=20, block=4):
+    """
+    (gray, green_fraction) of an RGB uint8 preview.
+    gray is averaged over block x block cells (sensor noise cancels out)
+    and has its mean removed, so a light level change alone is not a change
+    of the view.
+    """
+    rgb = preview.astype(np.int16)
+    exg = 2 * rgb[..., 1] - rgb[..., 0] - rgb[..., 2]
+    gray = (rgb[..., 0] * 77 + rgb[..., 1] * 150 + rgb[..., 2] * 29) >> 8
+    h, w = (gray.shape[0] // block) * block, (gray.shape[1] // block) * block
+    gray = gray[:h, :w].reshape(h // block, block, w // block, block).mean(axis=(1, 3), dtype=np.float32)
+    return gray - gray.mean(), float((exg > exg_threshold).mean())
+
+def downscale(frame, size=PREVIEW_SIZE):
+    """Cheap preview from a full frame by striding (no interpolation)"""
+    h, w = frame.shape[:2]
+    sy, sx = max(h // size[1], 1), max(w // size[0], 1)
+    return frame[::sy, ::sx][:size[1], :size[0]]
+
+# ====== Decision ======
+class Decision:
+    __slots__ = ('capture', 'reasons', 'interval', 'diff', 'green', 'green_change')
+
+    def __init__(self, capture, reasons, interval, diff, green, green_change):
+        self.capture = capture
+        self.reasons = reasons
+        self.interval = interval
+        self.diff = diff
+        self.green = green
+        self.green_change = green_change
+
+    def __repr__(self):
+        action = 'capture' if self.capture else 'skip'
+        return (f"{action} ({', '.join(self.reasons) or 'no change'}; diff {self.diff:.1f}, "
+                f"green {self.green:.2f}, next in {self.interval:.0f}s)")
+
+class AdaptiveScheduler:
+    def __init__(self, base_interval=300, min_interval=60, max_interval=900, heartbeat=3600,
+                 diff_threshold=8.0, green_threshold=0.05, disease_window=3, disease_confidence=0.6,
+                 healthy_labels=('healthy', 'Healthy_Leaf_Rose'), sensor_bands=None):
+        self.base_interval = base_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.heartbeat = heartbeat
+        self.diff_threshold = diff_threshold        # mean |gray - reference| (0-255 scale)
+        self.green_threshold = green_threshold      # absolute change in vegetation fraction
+        self.disease_confidence = disease_confidence
+        self.healthy_labels = set(healthy_labels)
+        # Same thresholds the bot and Arduino sketch use
+        self.sensor_bands = sensor_bands or {'soil': (None, 500), 'temp': (15, 30), 'humidity': (40, 70)}
+
+        self.reference = None           # gray preview of the last capture
+        self.reference_green = None
+        self.last_capture = None
+        self.sensor_state = {}
+        self.recent = deque(maxlen=disease_window)
+        self.interval = base_interval
+        self.stats = Counter()
+
+    def _sensor_crossings(self, sensor_data):
+        """Names of sensors whose band (low / ok / high) changed since the last call"""
+        crossed = []
+        for name, (low, high) in self.sensor_bands.items():
+            try:
+                value = float(sensor_data.get(name))
+            except (TypeError, ValueError):
+                continue
+            band = 'low' if low is not None and value < low else 'high' if high is not None and value > high else 'ok'
+            previous = self.sensor_state.get(name)
+            self.sensor_state[name] = band
+            if previous is not None and previous != band:
+                crossed.append(f"{name} {previous}->{band}")
+        return crossed
+
+    def record_prediction(self, disease, confidence):
+        """Feed back a result; confidence as 0-1"""
+        self.recent.append(disease not in self.healthy_labels and confidence >= self.disease_confidence)
+
+    def _next_interval(self, captured):
+        if any(self.recent):
+            return self.min_interval
+        if captured:
+            return self.base_interval
+        # Nothing happening: back off gradually
+        return min(self.interval * 1.5, self.max_interval)
+
+    def next_interval(self):
+        """Interval to sleep now, after any record_prediction() since decide()"""
+        if any(self.recent):
+            self.interval = self.min_interval
+        return self.interval
+
+    def decide(self, preview, sensor_data=None, now=None):
+        now = time.time() if now is None else now
+        gray, green = preview_features(preview)
+        self.stats['previews'] += 1
+
+        reasons = []
+        diff = green_change = 0.0
+        if self.reference is None or self.reference.shape != gray.shape:
+            reasons.append('first frame')
+        else:
+            diff = float(np.abs(gray - self.reference).mean())
+            green_change = abs(green - self.reference_green)
+            if diff >= self.diff_threshold:
+                reasons.append('view changed')
+            if green_change >= self.green_threshold:
+                reasons.append('vegetation changed')
+        reasons += self._sensor_crossings(sensor_data or {})
+        if any(self.recent):
+            reasons.append('recent disease')
+        if self.last_capture is not None and now - self.last_capture >= self.heartbeat:
+            reasons.append('heartbeat')
+
+        capture = bool(reasons)
+        if capture:
+            self.reference, self.reference_green = gray, green
+            self.last_capture = now
+            self.stats['captures'] += 1
+            self.stats.update(r.split(' ')[0] if '->' in r else r for r in reasons)
+        else:
+            self.stats['skipped'] += 1
+        self.interval = self._next_interval(capture)
+        return Decision(capture, reasons, self.interval, diff, green, green_change)
@@ -0,0 +1,292 @@
+# -*- coding: utf-8 -*-
+
+"""
+Background detection jobs for the Telegram bot's /detect
+- Jobs are queued and run one after another; the stages (capture,
+  inference, report generation) run in a process pool so the bot's
+  polling loop never blocks
+- A /detect while another one is queued joins that job, which then runs
+  the larger of the requested frame counts; while one is running it is
+  joined if it already covers the requested frames, otherwise a single
+  follow-up job is queued. Every requester of a job gets its results
+- Progress is reported through an async callback (the bot edits one
+  message per requester), throttled to one update per second
+- Per-job stage timings and queue depth are kept for /jobs
+- With cascade_margin set, inference is the classifier -> YOLO cascade
+  (CNN/cascade.py): the detector only runs on frames that look diseased
+- Frames come from the date-sharded ImageArchive; predictions are
+  attached to them (retention) and report pages use thumbnails
+"""
+
+import asyncio
+import itertools
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+CNN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'CNN')
+PROGRESS_INTERVAL = 1.0     # Seconds between progress edits (Telegram rate-limits edits)
+_cascades = {}              # (backend, margin) -> CascadeDetector, kept in the worker process
+
+# ====== Stages (run in the worker process) ======
+def capture_stage(image_folder, max_frames):
+    """
+    Try to take a fresh picture, then return the newest max_frames images.
+    The camera is usually owned by main_pi.py; its captures are used then.
+    """
+    from image_archive import ImageArchive
+    archive = ImageArchive(image_folder, background=False)
+    try:
+        from camera import PiCamera
+        camera = PiCamera()
+        frame = camera.capture()
+        archive.add(frame.jpeg, frame.timestamp)
+        camera.close()
+    except Exception as e:
+        print(f"Fresh capture skipped ({e}); using latest saved images")
+    return archive.latest(max_frames)
+
+def inference_stage(paths, backend=None, cascade_margin=None):
+    """[(path, disease, confidence_percent)]; the model stays loaded in the worker"""
+    if CNN_DIR not in sys.path:
+        sys.path.insert(0, CNN_DIR)
+    if cascade_margin is None:
+        from Disease_prediction_py import predict_batch
+
+        labels, confidences = predict_batch(paths, top_k=1, backend=backend)
+        return [(p, str(l[0]), float(c[0]) * 100) for p, l, c in zip(paths, labels, confidences)]
+
+    import numpy as np
+    from PIL import Image
+    from cascade import CascadeDetector
+
+    key = (backend, cascade_margin)
+    if key not in _cascades:
+        _cascades[key] = CascadeDetector(backend, margin=cascade_margin)
+    images = []
+    for p in paths:
+        with Image.open(p) as img:
+            images.append(np.asarray(img.convert('RGB')))
+    records = _cascades[key].run(images)
+    return [(p, r['disease'], r['confidence']) for p, r in zip(paths, records)]
+
+def report_stage(results, out_dir='.', image_folder=None):
+    """Append predictions and refresh CSV, charts and PDFs"""
+    if CNN_DIR not in sys.path:
+        sys.path.insert(0, CNN_DIR)
+    from report_engine import ReportEngine
+    from image_archive import frame_timestamp
+
+    archive = None
+    if image_folder:
+        from image_archive import ImageArchive
+        archive = ImageArchive(image_folder, background=False)
+        for path, disease, confidence in results:
+            archive.label(path, disease, confidence / 100)   # results carry percent, labels.jsonl 0-1
+    engine = ReportEngine(out_dir, thumbnail_for=archive.thumbnail if archive else None)
+    try:
+        next_frame = int(engine.state['last_frame'] or 0) + 1
+    except ValueError:
+        next_frame = engine.state['rows'] + 1
+    now = datetime.now()
+    for frame_id, (path, disease, confidence) in enumerate(results, next_frame):
+        # Capture time from the archive name; files named otherwise fall back to now
+        taken = frame_timestamp(path) or now
+        engine.append(frame_id, disease, confidence, timestamp=taken.strftime('%Y-%m-%d %H:%M:%S'), image_path=path)
+    engine.update_reports()
+    engine.close()
+    return len(results)
+
+# ====== Jobs ======
+class DetectionJob:
+    _ids = itertools.count(1)
+
+    def __init__(self, key, chat_id, params):
+        self.job_id = next(self._ids)
+        self.key = key
+        self.params = params
+        self.requested_by = [chat_id]   # chats that get this job's reports (see on_complete)
+        self.subscribers = []           # (chat_id, message_id) of progress messages
+        self.status = 'queued'
+        self.done = 0
+        self.total = 0
+        self.results = []
+        self.error = None
+        self.timings = {}
+        self.created = time.monotonic()
+        self.started = None
+        self.finished = None
+        self._last_progress = 0.0
+
+    def progress_text(self):
+        lines = [f"🖥️ Detection job #{self.job_id}: {self.status}"]
+        if self.status == 'queued':
+            lines.append("Waiting for the previous job...")
+        if self.total:
+            filled = int(10 * self.done / self.total)
+            lines.append(f"[{'█' * filled}{'░' * (10 - filled)}] {self.done}/{self.total} images")
+        if self.timings:
+            lines.append(" · ".join(f"{stage} {secs:.1f}s" for stage, secs in self.timings.items()))
+        if self.error:
+            lines.append(f"❌ {self.error}")
+        return "\n".join(lines)
+
+class DetectionScheduler:
+    def __init__(self, image_folder, out_dir='.', max_frames=20, chunk_size=8, backend=None,
+                 on_progress=None, on_complete=None, max_workers=1, cascade_margin=None, frame_limit=200):
+        self.image_folder = image_folder
+        self.out_dir = out_dir
+        self.max_frames = max_frames        # default frames per job
+        self.frame_limit = frame_limit      # most frames one request may ask for
+        self.chunk_size = chunk_size
+        self.backend = backend
+        self.cascade_margin = cascade_margin  # None = classifier only
+        self.on_progress = on_progress      # async fn(job)
+        self.on_complete = on_complete      # async fn(job)
+        self.max_workers = max_workers
+        self._pool = None
+        self._queue = None
+        self._runner = None
+        self.active = []                    # queued/running jobs, oldest first
+        self.history = deque(maxlen=50)
+        self.stats = {'submitted': 0, 'deduplicated': 0, 'completed': 0, 'failed': 0, 'max_queue_depth': 0}
+
+    # ------- Submission -------
+    def submit(self, chat_id, max_frames=None):
+        """
+        Returns (job, is_new). Requests are coalesced per job kind: a queued
+        job is joined and grows to the larger max_frames; a running job is
+        joined only if it already covers max_frames (clamped to 1..frame_limit).
+        """
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+            self._runner = asyncio.create_task(self._run_forever())
+        max_frames = self.max_frames if max_frames is None else min(max(int(max_frames), 1), self.frame_limit)
+        key = 'detect'
+
+        job = self._joinable(key, max_frames)
+        if job is not None:
+            self.stats['deduplicated'] += 1
+            if chat_id not in job.requested_by:
+                job.requested_by.append(chat_id)
+            return job, False
+
+        job = DetectionJob(key, chat_id, {'max_frames': max_frames})
+        self.active.append(job)
+        self._queue.put_nowait(job)
+        self.stats['submitted'] += 1
+        self.stats['max_queue_depth'] = max(self.stats['max_queue_depth'], self.queue_depth)
+        return job, True
+
+    def _joinable(self, key, max_frames):
+        """Newest unfinished job of this kind that can serve max_frames, or None"""
+        job = next((j for j in reversed(self.active) if j.key == key), None)
+        if job is None:
+            return None
+        if job.status == 'queued':
+            # Not captured yet: run the larger request for everyone
+            job.params['max_frames'] = max(job.params['max_frames'], max_frames)
+            return job
+        return job if job.params['max_frames'] >= max_frames else None
+
+    @property
+    def queue_depth(self):
+        """Jobs waiting or running"""
+        return len(self.active)
+
+    # ------- Execution -------
+    def _get_pool(self):
+        if self._pool is None:
+            # spawn: the bot process has threads and an event loop; do not fork it
+            self._pool = ProcessPoolExecutor(self.max_workers, mp_context=multiprocessing.get_context('spawn'))
+        return self._pool
+
+    async def _progress(self, job, force=False):
+        now = time.monotonic()
+        if self.on_progress and (force or now - job._last_progress >= PROGRESS_INTERVAL):
+            job._last_progress = now
+            try:
+                await self.on_progress(job)
+            except Exception as e:
+                print(f"Progress update failed: {e}")
+
+    async def _stage(self, job, name, fn, *args):
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        result = await loop.run_in_executor(self._get_pool(), fn, *args)
+        job.timings[name] = job.timings.get(name, 0.0) + time.perf_counter() - start
+        return result
+
+    async def _run_job(self, job):
+        job.started = time.monotonic()
+        job.timings['wait'] = job.started - job.created
+
+        job.status = 'capturing'
+        await self._progress(job, force=True)
+        paths = await self._stage(job, 'capture', capture_stage, self.image_folder, job.params['max_frames'])
+        if not paths:
+            raise RuntimeError(f"No images in {self.image_folder}")
+
+        job.status = 'running inference'
+        job.total = len(paths)
+        await self._progress(job, force=True)
+        for start in range(0, len(paths), self.chunk_size):
+            chunk = paths[start:start + self.chunk_size]
+            job.results += await self._stage(job, 'inference', inference_stage, chunk,
+                                             self.backend, self.cascade_margin)
+            job.done = len(job.results)
+            await self._progress(job)
+
+        job.status = 'generating reports'
+        await self._progress(job, force=True)
+        await self._stage(job, 'report', report_stage, job.results, self.out_dir, self.image_folder)
+
+    async def _run_forever(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run_job(job)
+                job.status = 'done'
+                self.stats['completed'] += 1
+            except Exception as e:
+                job.status = 'failed'
+                job.error = str(e)
+                self.stats['failed'] += 1
+            finally:
+                job.finished = time.monotonic()
+                job.timings['total'] = job.finished - job.created
+                self.active.remove(job)
+                self.history.append(job)
+                self._queue.task_done()
+            await self._progress(job, force=True)
+            if self.on_complete:
+                try:
+                    await self.on_complete(job)
+                except Exception as e:
+                    print(f"Job completion handler failed: {e}")
+
+    def metrics_text(self):
+        s = self.stats
+        lines = [
+            f"Queue depth: {self.queue_depth} (max {s['max_queue_depth']})",
+            f"Jobs: {s['submitted']} submitted, {s['deduplicated']} deduplicated, "
+            f"{s['completed']} done, {s['failed']} failed",
+        ]
+        finished = [j for j in self.history if j.status == 'done']
+        if finished:
+            for stage in ('wait', 'capture', 'inference', 'report', 'total'):
+                values = [j.timings.get(stage, 0.0) for j in finished]
+                lines.append(f"{stage:<10} avg {sum(values) / len(values):6.1f}s  max {max(values):6.1f}s")
+            per_image = [j.timings.get('inference', 0.0) / max(j.total, 1) for j in finished]
+            lines.append(f"{'per image':<10} {sum(per_image) / len(per_image) * 1000:.0f} ms inference")
+        return "\n".join(lines)
+
+    async def close(self):
+        if self._runner is not None:
+            self._runner.cancel()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
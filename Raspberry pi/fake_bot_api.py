@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+
+"""
+Local fake Telegram Bot API (aiohttp) for throughput tests
+- sendMessage / sendPhoto / sendDocument / sendMediaGroup
+- Enforces flood limits like Telegram: token bucket per chat and one for
+  the bot; over the limit -> 429 with parameters.retry_after
+- Uploads get a new file_id; unknown file_ids -> 400 "wrong file identifier"
+- Counts calls, messages, uploaded bytes and 429s (GET /stats)
+- getMe and python-telegram-bot shaped results, so telegram.Bot(base_url=...)
+  can run against it too
+
+Usage:
+    python fake_bot_api.py --port 8081
+    # then TelegramDispatcher(token, api_base='http://127.0.0.1:8081')
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import time
+
+from aiohttp import web
+
+class _Bucket:
+    def __init__(self, rate, capacity):
+        self.rate, self.capacity = rate, capacity
+        self.tokens, self.updated = capacity, time.monotonic()
+
+    def take(self):
+        """0 if allowed, else seconds until a token is available"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+class FakeBotAPI:
+    def __init__(self, chat_rate=1.0, chat_burst=3, global_rate=30.0, latency=0.03):
+        self.chat_rate, self.chat_burst = chat_rate, chat_burst
+        self.global_bucket = _Bucket(global_rate, global_rate)
+        self.latency = latency                     # simulated round trip (seconds)
+        self.chat_buckets = {}
+        self.file_ids = set()
+        self._ids = itertools.count(1)
+        self.stats = {'calls': 0, 'messages': 0, 'uploads': 0, 'upload_bytes': 0, 'rejected_429': 0, 'errors': 0}
+
+    def app(self):
+        app = web.Application(client_max_size=50 * 1024 * 1024)
+        app.router.add_post('/bot{token}/{method}', self.handle)
+        app.router.add_get('/stats', self.handle_stats)
+        return app
+
+    async def handle_stats(self, request):
+        return web.json_response(self.stats)
+
+    def _error(self, status, description, **extra):
+        body = {'ok': False, 'error_code': status, 'description': description}
+        body.update(extra)
+        return web.json_response(body, status=status)
+
+    def _file(self, value, uploads, kind):
+        """Resolve an attached upload or a file_id reference to a message part"""
+        if hasattr(value, 'file'):
+            data = value.file.read()
+            self.stats['uploads'] += 1
+            self.stats['upload_bytes'] += len(data)
+            file_id = f"FAKE{next(self._ids)}"
+            self.file_ids.add(file_id)
+        elif isinstance(value, str) and value.startswith('attach://'):
+            return self._file(uploads[value[len('attach://'):]], uploads, kind)
+        elif value in self.file_ids:
+            file_id = value
+        else:
+            raise KeyError(value)
+        if kind == 'photo':
+            return {'photo': [{'file_id': file_id + 's'}, {'file_id': file_id}]}
+        return {'document': {'file_id': file_id}}
+
+    async def handle(self, request):
+        await asyncio.sleep(self.latency)
+        self.stats['calls'] += 1
+        method = request.match_info['method']
+        form = await request.post()
+        chat_id = form.get('chat_id')
+
+        bucket = self.chat_buckets.setdefault(chat_id, _Bucket(self.chat_rate, self.chat_burst))
+        wait = max(bucket.take(), self.global_bucket.take())
+        if wait:
+            self.stats['rejected_429'] += 1
+            retry_after = max(1, math.ceil(wait))
+            return self._error(429, f"Too Many Requests: retry after {retry_after}",
+                               parameters={'retry_after': retry_after})
+
+        message_id = next(self._ids)
+        base = {'message_id': message_id, 'chat': {'id': chat_id, 'type': 'private'}, 'date': int(time.time())}
+        try:
+            if method == 'getMe':
+                result = {'id': 1, 'is_bot': True, 'first_name': 'FakeBot', 'username': 'fake_bot'}
+            elif method == 'sendMessage':
+                result = dict(base, text=form.get('text', ''))
+                self.stats['messages'] += 1
+            elif method in ('sendPhoto', 'sendDocument'):
+                kind = 'photo' if method == 'sendPhoto' else 'document'
+                result = dict(base, **self._file(form[kind], form, kind))
+                self.stats['messages'] += 1
+            elif method == 'sendMediaGroup':
+                media = json.loads(form['media'])
+                if not 2 <= len(media) <= 10:
+                    return self._error(400, "Bad Request: media group must have 2-10 items")
+                result = [dict(base, message_id=message_id + i, **self._file(m['media'], form, m['type']))
+                          for i, m in enumerate(media)]
+                self.stats['messages'] += len(media)
+            else:
+                return self._error(404, "Not Found: method not found")
+        except KeyError:
+            self.stats['errors'] += 1
+            return self._error(400, "Bad Request: wrong file identifier/HTTP URL specified")
+        return web.json_response({'ok': True, 'result': result})
+
+async def start_fake_api(host='127.0.0.1', port=0, **kwargs):
+    """Start in the current loop; returns (FakeBotAPI, runner, base_url)"""
+    api = FakeBotAPI(**kwargs)
+    runner = web.AppRunner(api.app())
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return api, runner, f"http://{host}:{port}"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--chat-rate', type=float, default=1.0)
+    parser.add_argument('--global-rate', type=float, default=30.0)
+    args = parser.parse_args()
+    web.run_app(FakeBotAPI(args.chat_rate, global_rate=args.global_rate).app(), host=args.host, port=args.port)
@@ -0,0 +1,378 @@
+# -*- coding: utf-8 -*-
+
+"""
+Image archive for IMAGE_FOLDER (captures from main_pi.py)
+- New frames go to date-sharded folders: <root>/YYYY/MM/DD/plant_<ts>.jpg,
+  so no directory grows without bound and "latest N" never scans everything
+- Thumbnails (<root>/thumbs/YYYY/MM/DD/) are made by a background thread;
+  reports and the bot use them instead of the full-size originals
+- Days older than compact_after_days are packed into one append-only
+  bundle per day (<root>/bundles/YYYY-MM-DD.bundle) plus a fixed-record
+  index (.idx: timestamp, offset, length, flags), so a frame is found by
+  timestamp with one dict lookup and read with one seek
+- Retention while packing: frames predicted as diseased stay at full
+  resolution, healthy (or never classified) ones are downsampled
+- Predictions are attached with label(); they are kept in an append-only
+  labels.jsonl per day until the day is packed
+
+Usage:
+    python image_archive.py /home/pi/smartplant_images --migrate --compact
+    python image_archive.py /home/pi/smartplant_images --get 20250301_101500 --out frame.jpg
+"""
+
+import argparse
+import glob
+import io
+import json
+import os
+import queue
+import shutil
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+import numpy as np
+
+THUMB_SIZE = (320, 240)
+HEALTHY_MAX_SIDE = 800
+HEALTHY_LABELS = ('healthy', 'Healthy_Leaf_Rose')
+
+INDEX_DTYPE = np.dtype([('ts', '<i8'), ('offset', '<u8'), ('length', '<u4'), ('flags', 'u1')])
+FLAG_DISEASED = 1
+FLAG_DOWNSAMPLED = 2
+
+# ====== Names ======
+def frame_timestamp(name):
+    """plant_YYYYmmdd_HHMMSS.jpg -> datetime (None for other names)"""
+    stem = os.path.splitext(os.path.basename(name))[0]
+    try:
+        return datetime.strptime(stem[-15:], '%Y%m%d_%H%M%S')
+    except ValueError:
+        return None
+
+def frame_name(ts):
+    return f"plant_{ts.strftime('%Y%m%d_%H%M%S')}.jpg"
+
+def _resize_jpeg(data, max_size, quality):
+    from PIL import Image
+    with Image.open(io.BytesIO(data)) as img:
+        img.draft('RGB', max_size)          # JPEG: decode at a reduced scale directly
+        img = img.convert('RGB')
+        img.thumbnail(max_size)
+        buf = io.BytesIO()
+        img.save(buf, 'JPEG', quality=quality)
+    return buf.getvalue()
+
+# ====== Archive ======
+class ImageArchive:
+    def __init__(self, root, thumb_size=THUMB_SIZE, healthy_max_side=HEALTHY_MAX_SIDE, compact_after_days=7,
+                 healthy_labels=HEALTHY_LABELS, background=True):
+        self.root = root
+        self.thumb_size = thumb_size
+        self.healthy_max_side = healthy_max_side
+        self.compact_after_days = compact_after_days
+        self.healthy_labels = set(healthy_labels)
+        self.bundle_dir = os.path.join(root, 'bundles')
+        self.thumb_dir = os.path.join(root, 'thumbs')
+        os.makedirs(self.bundle_dir, exist_ok=True)
+        self._indexes = OrderedDict()       # day -> {ts: (offset, length, flags)}, a few days cached
+        self._lock = threading.Lock()
+        self._queue = queue.Queue() if background else None
+        self._worker = None
+        self.stats = {'added': 0, 'thumbnails': 0, 'packed': 0, 'downsampled': 0, 'bytes_saved': 0}
+
+    # ------- Paths -------
+    def _day_parts(self, ts):
+        return ts.strftime('%Y'), ts.strftime('%m'), ts.strftime('%d')
+
+    def path_for(self, ts):
+        """Where the original of a frame taken at ts lives until its day is packed"""
+        return os.path.join(self.root, *self._day_parts(ts), frame_name(ts))
+
+    def thumb_path_for(self, ts):
+        return os.path.join(self.thumb_dir, *self._day_parts(ts), frame_name(ts))
+
+    def _bundle_paths(self, day):
+        stem = os.path.join(self.bundle_dir, day.strftime('%Y-%m-%d'))
+        return stem + '.bundle', stem + '.idx'
+
+    def _day_dirs(self, newest_first=False):
+        """Date folders in order, without listing any frames"""
+        days = []
+        for year in sorted(glob.glob(os.path.join(self.root, '[0-9]' * 4)), reverse=newest_first):
+            for month in sorted(glob.glob(os.path.join(year, '[0-9]' * 2)), reverse=newest_first):
+                for day in sorted(glob.glob(os.path.join(month, '[0-9]' * 2)), reverse=newest_first):
+                    days.append(day)
+        return days
+
+    # ------- Adding frames -------
+    def add(self, data, ts=None):
+        """Store an encoded JPEG; returns its path. The thumbnail follows in the background."""
+        ts = (ts or datetime.now()).replace(microsecond=0)
+        path = self.path_for(ts)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+        self.stats['added'] += 1
+        self._request_thumbnail(ts, data)
+        return path
+
+    def add_file(self, src, move=True):
+        """Bring an existing plant_<ts>.jpg into the archive"""
+        ts = frame_timestamp(src) or datetime.fromtimestamp(os.path.getmtime(src))
+        path = self.path_for(ts)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        (shutil.move if move else shutil.copy2)(src, path)
+        self._request_thumbnail(ts)
+        return path
+
+    def migrate(self):
+        """Move frames from the old flat IMAGE_FOLDER layout into date folders"""
+        moved = 0
+        for src in glob.glob(os.path.join(self.root, '*.jpg')):
+            self.add_file(src)
+            moved += 1
+        return moved
+
+    def label(self, path, disease, confidence=None):
+        """Attach a prediction (confidence 0-1) to a frame; decides its retention when packed"""
+        ts = frame_timestamp(path)
+        if ts is None:
+            return
+        labels_path = os.path.join(self.root, *self._day_parts(ts), 'labels.jsonl')
+        os.makedirs(os.path.dirname(labels_path), exist_ok=True)
+        with self._lock, open(labels_path, 'a') as f:
+            f.write(json.dumps({'name': frame_name(ts), 'disease': disease, 'confidence': confidence}) + '\n')
+
+    def _labels(self, day_dir):
+        labels = {}
+        try:
+            with open(os.path.join(day_dir, 'labels.jsonl')) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue            # torn last line after a power cut
+                    labels[entry['name']] = entry['disease']
+        except FileNotFoundError:
+            pass
+        return labels
+
+    # ------- Thumbnails -------
+    def _request_thumbnail(self, ts, data=None):
+        if self._queue is None:
+            self._make_thumbnail(ts, data)
+            return
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._run_thumbnails, name='thumbnails', daemon=True)
+            self._worker.start()
+        self._queue.put((ts, data))
+
+    def _run_thumbnails(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                self._make_thumbnail(*item)
+            except Exception as e:
+                print(f"Thumbnail Error: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _make_thumbnail(self, ts, data=None):
+        thumb = self.thumb_path_for(ts)
+        if data is None:
+            data = self.get(ts)
+            if data is None:
+                return None
+        os.makedirs(os.path.dirname(thumb), exist_ok=True)
+        tmp = thumb + '.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(_resize_jpeg(data, self.thumb_size, quality=80))
+        os.replace(tmp, thumb)
+        self.stats['thumbnails'] += 1
+        return thumb
+
+    def thumbnail(self, path_or_ts):
+        """Thumbnail path for a frame (made now if the worker has not got to it); None if unknown"""
+        ts = frame_timestamp(path_or_ts) if isinstance(path_or_ts, str) else path_or_ts
+        if ts is None:
+            return path_or_ts if isinstance(path_or_ts, str) and os.path.exists(path_or_ts) else None
+        thumb = self.thumb_path_for(ts)
+        if os.path.exists(thumb):
+            return thumb
+        return self._make_thumbnail(ts)
+
+    def flush(self):
+        """Wait for queued thumbnails"""
+        if self._queue is not None:
+            self._queue.join()
+
+    def close(self):
+        if self._worker is not None:
+            self._queue.put(None)
+            self._worker.join()
+            self._worker = None
+
+    # ------- Lookup -------
+    def _index(self, day):
+        """{ts: (offset, length, flags)} for one packed day ({} if none)"""
+        key = day.strftime('%Y-%m-%d')
+        with self._lock:
+            if key in self._indexes:
+                self._indexes.move_to_end(key)
+                return self._indexes[key]
+        _, idx_path = self._bundle_paths(day)
+        index = {}
+        if os.path.exists(idx_path):
+            records = np.fromfile(idx_path, dtype=INDEX_DTYPE)
+            index = {int(r['ts']): (int(r['offset']), int(r['length']), int(r['flags'])) for r in records}
+        with self._lock:
+            self._indexes[key] = index
+            while len(self._indexes) > 8:
+                self._indexes.popitem(last=False)
+        return index
+
+    def get(self, ts):
+        """JPEG bytes of the frame taken at ts (datetime or plant_<ts> name), or None"""
+        if isinstance(ts, str):
+            ts = frame_timestamp(ts)
+        path = self.path_for(ts)
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            pass
+        entry = self._index(ts).get(int(ts.timestamp()))
+        if entry is None:
+            return None
+        offset, length, _ = entry
+        with open(self._bundle_paths(ts)[0], 'rb') as f:
+            f.seek(offset)
+            return f.read(length)
+
+    def latest(self, n):
+        """Paths of the newest n unpacked originals (walks date folders newest first)"""
+        paths = []
+        if n <= 0:
+            return paths
+        for day_dir in self._day_dirs(newest_first=True):
+            paths = sorted(glob.glob(os.path.join(day_dir, 'plant_*.jpg')))[-(n - len(paths)):] + paths
+            if len(paths) >= n:
+                break
+        return paths
+
+    # ------- Packing / retention -------
+    def compact(self, now=None):
+        """
+        Pack every day older than compact_after_days into its bundle and
+        remove the originals. Safe to re-run after a crash: frames already
+        in the index are not appended twice.
+        """
+        cutoff = (now or datetime.now()).date() - timedelta(days=self.compact_after_days)
+        packed_days = 0
+        for day_dir in self._day_dirs():
+            try:
+                day = datetime.strptime('/'.join(day_dir.split(os.sep)[-3:]), '%Y/%m/%d')
+            except ValueError:
+                continue
+            if day.date() >= cutoff:
+                break
+            self._pack_day(day, day_dir)
+            packed_days += 1
+        return packed_days
+
+    def _pack_day(self, day, day_dir):
+        bundle_path, idx_path = self._bundle_paths(day)
+        labels = self._labels(day_dir)
+        known = self._index(day)
+        records = []
+        frames = sorted(glob.glob(os.path.join(day_dir, 'plant_*.jpg')))
+
+        with open(bundle_path, 'ab') as bundle:
+            offset = bundle.tell()
+            for path in frames:
+                ts = frame_timestamp(path)
+                key = int(ts.timestamp())
+                if key in known:
+                    continue
+                with open(path, 'rb') as f:
+                    data = f.read()
+                if not os.path.exists(self.thumb_path_for(ts)):
+                    self._make_thumbnail(ts, data)
+
+                disease = labels.get(os.path.basename(path))
+                flags = 0
+                if disease is not None and disease not in self.healthy_labels:
+                    flags |= FLAG_DISEASED
+                else:
+                    small = _resize_jpeg(data, (self.healthy_max_side, self.healthy_max_side), quality=85)
+                    if len(small) < len(data):
+                        self.stats['bytes_saved'] += len(data) - len(small)
+                        self.stats['downsampled'] += 1
+                        data = small
+                        flags |= FLAG_DOWNSAMPLED
+                bundle.write(data)
+                records.append((key, offset, len(data), flags))
+                offset += len(data)
+            bundle.flush()
+            os.fsync(bundle.fileno())
+
+        # Index after data: a crash in between leaves unindexed bytes, never a dangling entry
+        if records:
+            with open(idx_path, 'ab') as f:
+                np.array(records, dtype=INDEX_DTYPE).tofile(f)
+                f.flush()
+                os.fsync(f.fileno())
+        with self._lock:
+            self._indexes.pop(day.strftime('%Y-%m-%d'), None)
+
+        for path in frames:
+            os.remove(path)
+        try:
+            os.remove(os.path.join(day_dir, 'labels.jsonl'))
+        except FileNotFoundError:
+            pass
+        for folder in (day_dir, os.path.dirname(day_dir), os.path.dirname(os.path.dirname(day_dir))):
+            try:
+                os.rmdir(folder)
+            except OSError:
+                break
+        self.stats['packed'] += len(records)
+        return len(records)
+
+    def disk_usage(self):
+        """Bytes in originals, thumbnails and bundles"""
+        usage = {'originals': 0, 'thumbnails': 0, 'bundles': 0}
+        for folder, key in ((self.thumb_dir, 'thumbnails'), (self.bundle_dir, 'bundles')):
+            for dirpath, _, files in os.walk(folder):
+                usage[key] += sum(os.path.getsize(os.path.join(dirpath, f)) for f in files)
+        for day_dir in self._day_dirs():
+            usage['originals'] += sum(os.path.getsize(p) for p in glob.glob(os.path.join(day_dir, '*.jpg')))
+        return usage
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('root')
+    parser.add_argument('--migrate', action='store_true', help='Move flat plant_*.jpg files into date folders')
+    parser.add_argument('--compact', action='store_true', help='Pack old days into bundles')
+    parser.add_argument('--days', type=int, default=7, help='Keep this many recent days unpacked')
+    parser.add_argument('--get', help='Timestamp (YYYYmmdd_HHMMSS) of a frame to extract')
+    parser.add_argument('--out', default=None)
+    args = parser.parse_args()
+
+    archive = ImageArchive(args.root, compact_after_days=args.days, background=False)
+    if args.migrate:
+        print(f"📁 Moved {archive.migrate()} frames into date folders")
+    if args.compact:
+        print(f"📦 Packed {archive.compact()} days: {archive.stats}")
+    if args.get:
+        data = archive.get(f"plant_{args.get}.jpg")
+        if data is None:
+            raise SystemExit(f"No frame at {args.get}")
+        with open(args.out or f"plant_{args.get}.jpg", 'wb') as f:
+            f.write(data)
+    print("Disk usage: " + ", ".join(f"{k} {v / 1e6:.1f} MB" for k, v in archive.disk_usage().items()))
@@ -6,86 +6,160 @@ Smart Plant Monitoring System - Raspberry Pi Script
 - Captures plant image via Pi Camera
 - Sends updates and images to Telegram bot
 - Can forward images to a CNN server for disease detection
+- Stages run concurrently: a background serial reader keeps the latest
+  readings, capture runs in an executor, CNN uploads share a pooled HTTP
+  client and Telegram messages are sent without holding up the next cycle
+- Optionally pushes readings and frames to a shared plant hub
+  (plant_hub.py) so one bot can serve many Pis
+- Telegram sends go through TelegramDispatcher (rate limits, retries on 429,
+  file_id cache)
+- Adaptive scheduling (capture_scheduler.py): a low-res preview is checked
+  every cycle; the full capture, upload and Telegram update only happen when
+  the view changed, a sensor crossed a threshold or disease was recently seen
+- Frames stay in memory (camera.py): captured into a NumPy array, JPEG
+  encoded once and the same bytes archived, uploaded and sent to Telegram;
+  with PLANT_LOCAL_BACKEND set the model runs on the array directly
+- Frames are kept by ImageArchive (image_archive.py): date folders,
+  background thumbnails, and once a day older days are packed into
+  bundles (diseased frames full size, healthy ones downsampled)
+- Stage timings, error counts and the dispatcher/scheduler/archive stats
+  are exported on http://127.0.0.1:PLANT_METRICS_PORT/metrics (CNN/metrics.py);
+  PLANT_METRICS_HOST=0.0.0.0 opts in to exposing them on the LAN
+- Hardware and endpoints can be redirected with PLANT_* variables (serial
+  port, replay camera folder, Telegram API base); benchmark_suite.py runs
+  the loop that way against a fake Arduino and a fake Bot API
 """
 
 import asyncio
 import serial
+import time
 from datetime import datetime
-from picamera2 import Picamera2
-import telegram
 import requests
+import aiohttp
 import os
+import socket
+import sys
+
+from sensor_protocol import SensorParser, iter_serial_lines
+from sensor_store import SensorStore
+from capture_scheduler import AdaptiveScheduler
+from camera import PiCamera, ReplayCamera
+from image_archive import ImageArchive
+from telegram_dispatcher import TelegramDispatcher
+
+CNN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'CNN')
+sys.path.insert(0, CNN_DIR)
+from metrics import counter, histogram, profiler, register_stats, serve as serve_metrics  # noqa: E402
 
 # ====== Configuration ======
 BOT_TOKEN = 'YOUR_TELEGRAM_BOT_TOKEN'
 CHAT_ID = 'YOUR_TELEGRAM_CHAT_ID'
 
-SERIAL_PORT = '/dev/ttyUSB0'
+TELEGRAM_API = os.environ.get('PLANT_TELEGRAM_API', 'https://api.telegram.org')
+
+SERIAL_PORT = os.environ.get('PLANT_SERIAL_PORT', '/dev/ttyUSB0')
 BAUD_RATE = 9600
+REPLAY_FOLDER = os.environ.get('PLANT_REPLAY_FOLDER')  # Replay these images instead of the Pi camera
+
+IMAGE_FOLDER = os.environ.get('PLANT_IMAGE_FOLDER', '/home/pi/smartplant_images')
+SENSOR_DB = os.environ.get('PLANT_SENSOR_DB', '/home/pi/smartplant_sensors.db')  # Shared with telegram_bot.py
+CNN_SERVER_URL = os.environ.get('PLANT_CNN_SERVER_URL', 'http://your_cnn_server/upload')  # Optional
 
-IMAGE_FOLDER = '/home/pi/smartplant_images'
-CNN_SERVER_URL = 'http://your_cnn_server/upload'  # Optional
+# Multi-plant hub (optional): register once with POST {HUB_URL}/register
+HUB_URL = os.environ.get('PLANT_HUB_URL')
+DEVICE_NAME = os.environ.get('PLANT_DEVICE_NAME', socket.gethostname())
+DEVICE_TOKEN = os.environ.get('PLANT_DEVICE_TOKEN', '')
+
+# On-device inference (optional): 'keras' or 'tflite', run on the in-memory frame
+LOCAL_BACKEND = os.environ.get('PLANT_LOCAL_BACKEND')
+
+# Prometheus-format /metrics for this process (0 = off)
+METRICS_PORT = int(os.environ.get('PLANT_METRICS_PORT', '9108'))
+METRICS_HOST = os.environ.get('PLANT_METRICS_HOST', '127.0.0.1')   # loopback: the bot on this Pi reads it
+
+CYCLE_INTERVAL = 300        # Seconds between updates when nothing special happens
+MIN_INTERVAL = 60           # Interval while disease is being detected
+MAX_INTERVAL = 900          # Longest back-off when the view is unchanged
+HEARTBEAT_INTERVAL = 3600   # Full update at least this often
+SENSOR_WAIT_TIMEOUT = 3     # Seconds to wait for the first sensor reading
+CNN_TIMEOUT = 10            # Seconds per CNN upload
+COMPACT_INTERVAL = 24 * 3600    # Seconds between archive packing runs
 
 # Create image folder if not exists
 os.makedirs(IMAGE_FOLDER, exist_ok=True)
 
-# Initialize Telegram bot
-bot = telegram.Bot(token=BOT_TOKEN)
+# Date-sharded image archive (thumbnails, bundles, retention)
+archive = ImageArchive(IMAGE_FOLDER)
+
+# Telegram outbound queue
+dispatcher = TelegramDispatcher(BOT_TOKEN, api_base=TELEGRAM_API)
+
+# Sensor history store
+sensor_store = SensorStore(SENSOR_DB)
 
 # Initialize Serial connection to Arduino
 ser = serial.Serial(SERIAL_PORT, BAUD_RATE, timeout=1)
 
 # Initialize Pi Camera
-picam2 = Picamera2()
-picam2.configure(picam2.create_still_configuration())
-picam2.start()
-asyncio.sleep(2)  # Camera warm-up
+camera = ReplayCamera(REPLAY_FOLDER) if REPLAY_FOLDER else PiCamera()  # PiCamera includes the 2 s warm-up
+
+# Decides when a full capture is worth it
+scheduler = AdaptiveScheduler(CYCLE_INTERVAL, MIN_INTERVAL, MAX_INTERVAL, HEARTBEAT_INTERVAL)
+
+# Shared metrics (exported on METRICS_PORT)
+errors = counter('plant_errors_total', 'Errors by stage')
+serial_samples = counter('plant_serial_samples_total', 'Complete sensor samples read from the Arduino')
+stage_seconds = histogram('plant_stage_seconds', 'main_pi.py cycle stage wall time')
+register_stats('telegram_dispatcher', dispatcher.stats)
+register_stats('capture_scheduler', scheduler.stats)
+register_stats('image_archive', archive.stats)
 
 # ====== Helper Functions ======
 def parse_sensor_data(lines):
     """
     Parse Arduino serial output into dictionary
+    (framed $PLANT lines and the legacy text format are both accepted)
     """
-    data = {}
+    parser = SensorParser()
     for line in lines:
-        line = line.strip()
-        if line.startswith("Temperature:"):
-            data['temp'] = line.split(":")[1].strip().split()[0]
-        elif line.startswith("Humidity:"):
-            data['humidity'] = line.split(":")[1].strip().split()[0]
-        elif line.startswith("Soil Moisture:"):
-            data['soil'] = line.split(":")[1].strip()
-        elif line.startswith("LDR Value:"):
-            data['ldr'] = line.split(":")[1].strip()
-        elif "Pump ON" in line:
-            data['pump'] = "ON"
-        elif "Pump OFF" in line:
-            data['pump'] = "OFF"
-    return data
+        parser.feed_line(line)
+    return parser.latest
 
 def read_serial_data(timeout=3):
     """
     Read sensor data from Arduino for a few seconds
+    readline() blocks until a line or the port timeout, so no busy-waiting
     """
-    start_time = datetime.now()
+    deadline = time.monotonic() + timeout
     lines = []
-    while (datetime.now() - start_time).seconds < timeout:
-        if ser.in_waiting:
-            line = ser.readline().decode('utf-8', errors='ignore')
-            if line.strip():
-                lines.append(line)
+    while time.monotonic() < deadline:
+        line = ser.readline().decode('utf-8', errors='ignore')
+        if line.strip():
+            lines.append(line)
     return parse_sensor_data(lines)
 
+def capture_frame():
+    """
+    Capture into memory and archive the JPEG with timestamp.
+    Returns (frame, image_path); frame.jpeg holds the bytes that were written.
+    """
+    frame = camera.capture()
+    return frame, archive.add(frame.jpeg, frame.timestamp)
+
 def capture_image():
     """
     Capture image using Pi Camera and save with timestamp
     """
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    image_path = os.path.join(IMAGE_FOLDER, f"plant_{timestamp}.jpg")
-    picam2.capture_file(image_path)
-    return image_path
+    return capture_frame()[1]
+
+def predict_local(frame):
+    """Run the model on the captured array (one resize, no decode)"""
+    from Disease_prediction_py import predict_frame
 
-async def send_telegram(sensor_data, image_path):
+    label, confidence = predict_frame(frame.array, backend=LOCAL_BACKEND)
+    return {'disease': str(label), 'confidence': float(confidence)}   # 0-1, like the CNN server
+
+async def send_telegram(sensor_data, image_path, image_bytes=None):
     """
     Send sensor data and plant image to Telegram
     """
@@ -110,10 +184,11 @@ async def send_telegram(sensor_data, image_path):
         f"📸 Plant Image attached."
     )
 
-    await bot.send_message(chat_id=CHAT_ID, text=message)
-
-    with open(image_path, 'rb') as photo:
-        await bot.send_photo(chat_id=CHAT_ID, photo=photo)
+    # Queued in order for this chat; rate limiting/retries happen in the dispatcher
+    await asyncio.gather(
+        dispatcher.send_text(CHAT_ID, message),
+        dispatcher.send_photo(CHAT_ID, image_path, data=image_bytes),
+    )
 
 def send_to_cnn_server(image_path):
     """
@@ -126,27 +201,251 @@ def send_to_cnn_server(image_path):
         return response.json()  # Expect JSON with disease info
     except Exception as e:
         print(f"CNN Server Error: {e}")
+        errors.inc(where='cnn_upload')
         return None
 
+async def send_to_cnn_server_async(session, image_path, image_bytes=None):
+    """
+    Async version of send_to_cnn_server using a shared (pooled) aiohttp session
+    (image_bytes: the already encoded JPEG, so the file is not read back)
+    """
+    try:
+        if image_bytes is None:
+            with open(image_path, 'rb') as img_file:
+                image_bytes = img_file.read()
+        data = aiohttp.FormData()
+        data.add_field('file', image_bytes, filename=os.path.basename(image_path),
+                       content_type='image/jpeg')
+        async with session.post(CNN_SERVER_URL, data=data) as response:
+            return await response.json()  # Expect JSON with disease info
+    except Exception as e:
+        print(f"CNN Server Error: {e}")
+        errors.inc(where='cnn_upload')
+        return None
+
+async def push_to_hub(session, sensor_data, image_path, image_bytes=None):
+    """Send this device's latest reading and frame to the plant hub (confidence returned as 0-1)"""
+    headers = {'X-Device-Token': DEVICE_TOKEN}
+    base = f"{HUB_URL}/devices/{DEVICE_NAME}"
+    try:
+        async with session.post(f"{base}/reading", json=sensor_data, headers=headers) as resp:
+            resp.raise_for_status()
+        if image_bytes is None:
+            with open(image_path, 'rb') as f:
+                image_bytes = f.read()
+        async with session.post(f"{base}/frame", data=image_bytes,
+                                headers=dict(headers, **{'Content-Type': 'image/jpeg'})) as resp:
+            resp.raise_for_status()
+            result = await resp.json()
+        result['confidence'] = float(result['confidence']) / 100   # the hub reports percent
+        return result
+    except Exception as e:
+        print(f"Hub Error: {e}")
+        errors.inc(where='hub')
+        return None
+
+# ====== Concurrent Stages ======
+class SerialReader:
+    """
+    Background task that keeps reading the Arduino and holds the latest
+    value of every field. Event-driven: the loop only wakes up when the
+    serial port has data (see sensor_protocol.iter_serial_lines).
+    """
+
+    def __init__(self, port, store=None):
+        self.port = port
+        self.store = store
+        self.parser = SensorParser()
+        self.updated_at = None
+        self._has_data = asyncio.Event()
+
+    @property
+    def latest(self):
+        return self.parser.latest
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                async for line in iter_serial_lines(self.port):
+                    samples = self.parser.samples
+                    if self.parser.feed_line(line):
+                        self.updated_at = datetime.now()
+                        self._has_data.set()
+                    # One complete sample, counted once across both formats (see SensorParser)
+                    if self.parser.samples > samples:
+                        serial_samples.inc()
+                        if self.store is not None:
+                            # append() may flush to SQLite; keep that off the event loop
+                            await loop.run_in_executor(None, self.store.append, dict(self.parser.latest))
+            except (OSError, EOFError) as e:
+                print(f"Serial Error: {e}")
+                errors.inc(where='serial')
+                await asyncio.sleep(1)
+
+    async def snapshot(self, timeout=SENSOR_WAIT_TIMEOUT):
+        """Latest readings; waits up to timeout only if nothing has arrived yet"""
+        try:
+            await asyncio.wait_for(self._has_data.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return dict(self.latest)
+
+class StageMetrics:
+    """
+    Per-stage wall-time: last value, mean and max (seconds), for the console.
+    Every value also goes into the plant_stage_seconds histogram, and slow
+    stages are sampled by the metrics profiler when it is enabled.
+    """
+
+    def __init__(self):
+        self.stats = {}
+
+    def record(self, stage, seconds):
+        s = self.stats.setdefault(stage, {'count': 0, 'total': 0.0, 'max': 0.0, 'last': 0.0})
+        s['count'] += 1
+        s['total'] += seconds
+        s['max'] = max(s['max'], seconds)
+        s['last'] = seconds
+        stage_seconds.observe(seconds, stage=stage)
+
+    def timer(self, stage):
+        metrics = self
+
+        class _Timer:
+            def __enter__(self):
+                self.token = profiler.enter('plant_stage', {'stage': stage}) if profiler.active else None
+                self.start = time.perf_counter()
+
+            def __exit__(self, exc_type, *exc):
+                elapsed = time.perf_counter() - self.start
+                metrics.record(stage, elapsed)
+                if exc_type is not None:
+                    errors.inc(where=stage)
+                if self.token is not None:
+                    profiler.exit(self.token, elapsed)
+
+        return _Timer()
+
+    def summary(self):
+        return " | ".join(
+            f"{stage} {s['last'] * 1000:.0f}ms (avg {s['total'] / s['count'] * 1000:.0f}, max {s['max'] * 1000:.0f})"
+            for stage, s in self.stats.items()
+        )
+
+metrics = StageMetrics()
+pending_sends = set()
+
+async def _timed_telegram(sensor_data, image_path, image_bytes=None):
+    start = time.perf_counter()
+    try:
+        await send_telegram(sensor_data, image_path, image_bytes)
+    except Exception as e:
+        print(f"Telegram Error: {e}")
+        errors.inc(where='telegram')
+    finally:
+        metrics.record('telegram', time.perf_counter() - start)
+
+def dispatch_telegram(sensor_data, image_path, image_bytes=None):
+    """Send the update in the background; the next cycle does not wait for it"""
+    task = asyncio.create_task(_timed_telegram(sensor_data, image_path, image_bytes))
+    pending_sends.add(task)
+    task.add_done_callback(pending_sends.discard)
+    return task
+
+def record_prediction(result, image_path):
+    """Feed a CNN/hub/local result ({'disease', 'confidence' as 0-1}) back to the scheduler and archive"""
+    try:
+        scheduler.record_prediction(result['disease'], float(result['confidence']))
+        archive.label(image_path, result['disease'], float(result['confidence']))
+    except (KeyError, TypeError, ValueError):
+        pass
+
+def maintain_archive():
+    """Move any flat-layout frames into date folders, then pack old days"""
+    moved = archive.migrate()
+    days = archive.compact()
+    if moved or days:
+        print(f"Archive: {moved} frames moved, {days} days packed ({archive.stats['bytes_saved'] / 1e6:.1f} MB saved)")
+
 # ====== Main Loop ======
 async def main():
-    while True:
-        # Read sensor data from Arduino
-        sensor_data = read_serial_data()
+    loop = asyncio.get_running_loop()
+    reader = SerialReader(ser, sensor_store)
+    reader_task = asyncio.create_task(reader.run())
+    if METRICS_PORT:
+        serve_metrics(METRICS_PORT, METRICS_HOST)
+    last_compact = None
+
+    connector = aiohttp.TCPConnector(limit=4)
+    timeout = aiohttp.ClientTimeout(total=CNN_TIMEOUT)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        try:
+            while True:
+                cycle_start = time.perf_counter()
+
+                if last_compact is None or time.monotonic() - last_compact >= COMPACT_INTERVAL:
+                    last_compact = time.monotonic()
+                    with metrics.timer('archive'):
+                        await loop.run_in_executor(None, maintain_archive)
+
+                # Latest sensor data from the background reader
+                with metrics.timer('sensor'):
+                    sensor_data = await reader.snapshot()
+
+                # Cheap preview first; skip the expensive stages if nothing changed
+                with metrics.timer('preview'):
+                    preview = await loop.run_in_executor(None, camera.capture_preview)
+                    decision = scheduler.decide(preview, sensor_data)
+                if not decision.capture:
+                    print(f"No change, {decision}")
+                    await asyncio.sleep(decision.interval)
+                    continue
+
+                # Capture image without blocking the event loop (JPEG encoded once here)
+                with metrics.timer('capture'):
+                    frame, image_path = await loop.run_in_executor(None, capture_frame)
+
+                # Telegram update goes out while the CNN upload runs
+                dispatch_telegram(sensor_data, image_path, frame.jpeg)
 
-        # Capture image
-        image_path = capture_image()
+                # On-device model, else optionally send to CNN server
+                if LOCAL_BACKEND:
+                    with metrics.timer('inference'):
+                        cnn_result = await loop.run_in_executor(None, predict_local, frame)
+                else:
+                    with metrics.timer('upload'):
+                        cnn_result = await send_to_cnn_server_async(session, image_path, frame.jpeg)
+                if cnn_result:
+                    print("CNN Server Result:", cnn_result)
 
-        # Optionally send to CNN server
-        cnn_result = send_to_cnn_server(image_path)
-        if cnn_result:
-            print("CNN Server Result:", cnn_result)
+                # The hub classifies the frame again for its own dashboard; its
+                # answer is only used here when this device has none
+                hub_result = None
+                if HUB_URL:
+                    with metrics.timer('hub'):
+                        hub_result = await push_to_hub(session, sensor_data, image_path, frame.jpeg)
+                    if hub_result:
+                        print("Hub Result:", hub_result)
 
-        # Send update to Telegram
-        await send_telegram(sensor_data, image_path)
+                # One prediction per frame for the scheduler and the archive
+                result = cnn_result or hub_result
+                if result:
+                    record_prediction(result, image_path)
 
-        print("Update sent! Waiting for next cycle...")
-        await asyncio.sleep(300)  # Wait 5 minutes before next update
+                metrics.record('cycle', time.perf_counter() - cycle_start)
+                print(f"Update sent ({', '.join(decision.reasons)})! Stage times: {metrics.summary()}")
+                interval = scheduler.next_interval()
+                print(f"Waiting {interval:.0f}s for next cycle...")
+                await asyncio.sleep(interval)
+        finally:
+            reader_task.cancel()
+            sensor_store.close()
+            if pending_sends:
+                await asyncio.gather(*pending_sends, return_exceptions=True)
+            await dispatcher.close()
+            camera.close()
+            archive.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,344 @@
+# -*- coding: utf-8 -*-
+
+"""
+Plant hub: one server for many Raspberry Pis (one bot, many plants)
+- Device registry: name -> slot, per-device token and Telegram chat,
+  persisted to devices.json
+- Per-device state lives in one NumPy structured array (one fixed-size
+  record per slot) instead of a dict of dicts, so hundreds of devices
+  cost a few dozen bytes each
+- Ingest endpoint (aiohttp): Pis POST sensor readings (JSON or raw
+  $PLANT frames) and camera frames
+- Frames from every device share one MicroBatcher (CNN/inference_server.py),
+  so inference is batched across plants
+- GET /devices/<name>/status is what the bot's /status <plant> reads
+- GET /metrics: Prometheus text (CNN/metrics.py) with ingest latencies
+- POST /register needs the admin token for new devices; re-registering a
+  known name needs that device's token or the admin token. Binding to a
+  non-loopback address requires --admin-token
+
+Usage:
+    python plant_hub.py --port 8090 --backend tflite --admin-token $PLANT_HUB_ADMIN_TOKEN
+    curl -X POST localhost:8090/register -H "X-Admin-Token: $PLANT_HUB_ADMIN_TOKEN" -d '{"name": "rose-1"}'
+"""
+
+import argparse
+import asyncio
+import ipaddress
+import json
+import math
+import os
+import queue
+import secrets
+import sys
+import threading
+import time
+
+import numpy as np
+from aiohttp import web
+
+from sensor_protocol import parse_frame
+
+CNN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'CNN')
+REGISTRY_PATH = 'devices.json'
+MAX_FRAME_BYTES = 10 * 1024 * 1024
+
+STATE_DTYPE = np.dtype([
+    ('last_seen', 'f8'),        # unix time of the last reading/frame
+    ('temp', 'f4'),
+    ('humidity', 'f4'),
+    ('soil', 'f4'),
+    ('ldr', 'f4'),
+    ('pump', 'i1'),             # -1 unknown, 0 OFF, 1 ON
+    ('lights', 'i1'),
+    ('disease', 'i1'),          # index into class_labels, -1 none yet
+    ('confidence', 'f4'),       # percent
+    ('readings', 'u4'),
+    ('frames', 'u4'),
+    ('frame_at', 'f8'),
+])
+EMPTY_STATE = np.array((0.0, np.nan, np.nan, np.nan, np.nan, -1, -1, -1, np.nan, 0, 0, 0.0), dtype=STATE_DTYPE)
+SWITCHES = {'ON': 1, 'OFF': 0}
+
+# ====== Device registry ======
+class DeviceRegistry:
+    def __init__(self, path=REGISTRY_PATH, capacity=64):
+        self.path = path
+        self.names = []                 # slot -> name
+        self.slots = {}                 # name -> slot
+        self.tokens = []                # slot -> token
+        self.chats = []                 # slot -> Telegram chat id (or None)
+        self.state = np.repeat(EMPTY_STATE, capacity)
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path) as f:
+                for device in json.load(f):
+                    self.register(device['name'], device['token'], device.get('chat_id'), save=False)
+
+    def __len__(self):
+        return len(self.names)
+
+    def save(self):
+        if not self.path:
+            return
+        devices = [{'name': n, 'token': t, 'chat_id': c} for n, t, c in zip(self.names, self.tokens, self.chats)]
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(devices, f, indent=1)
+        os.replace(tmp, self.path)
+
+    def register(self, name, token=None, chat_id=None, save=True):
+        """Returns (slot, token); re-registering a known name keeps its slot"""
+        with self._lock:
+            slot = self.slots.get(name)
+            if slot is None:
+                slot = len(self.names)
+                if slot == len(self.state):
+                    grown = np.repeat(EMPTY_STATE, len(self.state) * 2)
+                    grown[:slot] = self.state
+                    self.state = grown
+                self.names.append(name)
+                self.tokens.append(token or secrets.token_hex(16))
+                self.chats.append(chat_id)
+                self.slots[name] = slot
+            else:
+                if token:
+                    self.tokens[slot] = token
+                if chat_id is not None:
+                    self.chats[slot] = chat_id
+            token = self.tokens[slot]
+        if save:
+            self.save()
+        return slot, token
+
+    def authenticate(self, name, token):
+        """Slot for a device if the token matches, else None"""
+        slot = self.slots.get(name)
+        if slot is None or not secrets.compare_digest(self.tokens[slot], token or ''):
+            return None
+        return slot
+
+    # ------- State -------
+    def update_reading(self, slot, data, ts=None):
+        """data: dict as produced by SensorParser / parse_frame (strings are fine)"""
+        row = self.state[slot]
+        for field in ('temp', 'humidity', 'soil', 'ldr'):
+            value = data.get(field)
+            if value is not None:
+                try:
+                    row[field] = float(value)
+                except (TypeError, ValueError):
+                    pass
+        for field in ('pump', 'lights'):
+            if data.get(field) in SWITCHES:
+                row[field] = SWITCHES[data[field]]
+        row['readings'] += 1
+        row['last_seen'] = ts or time.time()
+
+    def update_prediction(self, slot, disease_index, confidence, ts=None):
+        row = self.state[slot]
+        row['disease'] = disease_index
+        row['confidence'] = confidence
+        row['frames'] += 1
+        row['frame_at'] = row['last_seen'] = ts or time.time()
+
+    def status(self, name, class_labels=()):
+        slot = self.slots.get(name)
+        if slot is None:
+            return None
+        row = self.state[slot]
+
+        def num(field):
+            value = float(row[field])
+            return None if math.isnan(value) else round(value, 2)
+
+        def switch(field):
+            return {1: 'ON', 0: 'OFF'}.get(int(row[field]))
+
+        disease = int(row['disease'])
+        return {
+            'name': name,
+            'chat_id': self.chats[slot],
+            'last_seen': float(row['last_seen']) or None,
+            'temp': num('temp'), 'humidity': num('humidity'), 'soil': num('soil'), 'ldr': num('ldr'),
+            'pump': switch('pump'), 'lights': switch('lights'),
+            'disease': class_labels[disease] if 0 <= disease < len(class_labels) else None,
+            'confidence': num('confidence'),
+            'readings': int(row['readings']), 'frames': int(row['frames']),
+        }
+
+    def stale(self, max_age):
+        """Names of devices not heard from in max_age seconds (vectorized over all slots)"""
+        n = len(self.names)
+        idx = np.nonzero(self.state['last_seen'][:n] < time.time() - max_age)[0]
+        return [self.names[i] for i in idx]
+
+# ====== HTTP hub ======
+class PlantHub:
+    def __init__(self, registry, batcher=None, admin_token=None, request_timeout=30.0):
+        self.registry = registry
+        self.batcher = batcher              # shared MicroBatcher; None = readings only
+        self.admin_token = admin_token
+        self.request_timeout = request_timeout
+        if CNN_DIR not in sys.path:
+            sys.path.insert(0, CNN_DIR)
+        from Disease_prediction_py import class_labels, load_leaf_image_bytes
+        import metrics
+        self.class_labels = list(class_labels)
+        self._decode = load_leaf_image_bytes
+        self._metrics = metrics
+        self.stats = {'readings': 0, 'frames': 0, 'rejected': 0, 'unauthorized': 0}
+        metrics.register_stats('plant_hub', lambda: dict(self.stats, devices=len(self.registry)))
+
+    def app(self):
+        app = web.Application(client_max_size=MAX_FRAME_BYTES)
+        app.router.add_post('/register', self.handle_register)
+        app.router.add_post('/devices/{name}/reading', self.handle_reading)
+        app.router.add_post('/devices/{name}/frame', self.handle_frame)
+        app.router.add_get('/devices/{name}/status', self.handle_status)
+        app.router.add_get('/devices', self.handle_devices)
+        app.router.add_get('/health', self.handle_health)
+        app.router.add_get('/metrics', self.handle_metrics)
+        return app
+
+    def _device_slot(self, request):
+        slot = self.registry.authenticate(request.match_info['name'], request.headers.get('X-Device-Token'))
+        if slot is None:
+            self.stats['unauthorized'] += 1
+            raise web.HTTPUnauthorized(text='unknown device or bad token')
+        return slot
+
+    def _is_admin(self, request):
+        return bool(self.admin_token) and secrets.compare_digest(request.headers.get('X-Admin-Token', ''),
+                                                                 self.admin_token)
+
+    @staticmethod
+    async def _json_object(request):
+        """Request body as a JSON object; anything else is a 400, not a 500"""
+        try:
+            body = await request.json()
+        except ValueError:
+            raise web.HTTPBadRequest(text='body must be JSON')
+        if not isinstance(body, dict):
+            raise web.HTTPBadRequest(text='body must be a JSON object')
+        return body
+
+    async def handle_register(self, request):
+        body = await self._json_object(request)
+        name = body.get('name')
+        if not isinstance(name, str) or not name:
+            raise web.HTTPBadRequest(text="missing device 'name'")
+        # No await between this check and register(), so it cannot race another request
+        if name in self.registry.slots:
+            # Changing a known device's token/chat: only the device itself or the admin
+            if not self._is_admin(request) and \
+                    self.registry.authenticate(name, request.headers.get('X-Device-Token')) is None:
+                self.stats['unauthorized'] += 1
+                raise web.HTTPForbidden(text='device already registered; send its X-Device-Token or the admin token')
+        elif self.admin_token and not self._is_admin(request):
+            self.stats['unauthorized'] += 1
+            raise web.HTTPUnauthorized(text='admin token required')
+        slot, token = self.registry.register(name, body.get('token'), body.get('chat_id'))
+        return web.json_response({'name': name, 'slot': slot, 'token': token})
+
+    async def handle_reading(self, request):
+        """JSON {temp, humidity, soil, ldr, pump, lights} or one or more $PLANT lines"""
+        slot = self._device_slot(request)
+        if request.content_type == 'application/json':
+            readings = [await self._json_object(request)]
+        else:
+            readings = [r for r in map(parse_frame, (await request.text()).splitlines()) if r]
+            if not readings:
+                raise web.HTTPBadRequest(text='no valid readings')
+        for data in readings:
+            self.registry.update_reading(slot, data)
+        self.stats['readings'] += len(readings)
+        return web.json_response({'ok': True, 'accepted': len(readings)})
+
+    async def handle_frame(self, request):
+        """Raw image body or multipart 'file'; returns the prediction"""
+        with self._metrics.timer('hub_frame_seconds', 'Frame ingest incl. inference'):
+            return await self._handle_frame(request)
+
+    async def _handle_frame(self, request):
+        slot = self._device_slot(request)
+        if self.batcher is None:
+            raise web.HTTPServiceUnavailable(text='no inference backend on this hub')
+        if request.content_type.startswith('multipart/'):
+            data = (await request.post())['file'].file.read()
+        else:
+            data = await request.read()
+
+        loop = asyncio.get_running_loop()
+        try:
+            img_array = await loop.run_in_executor(None, self._decode, data)
+        except Exception as e:
+            raise web.HTTPBadRequest(text=f'could not decode image: {e}')
+        try:
+            future = self.batcher.submit(img_array)
+        except queue.Full:
+            self.stats['rejected'] += 1
+            raise web.HTTPServiceUnavailable(text='hub busy, retry later', headers={'Retry-After': '1'})
+
+        labels, confidences, batch_size = await asyncio.wait_for(asyncio.wrap_future(future), self.request_timeout)
+        disease = str(labels[0])
+        confidence = float(confidences[0]) * 100
+        self.registry.update_prediction(slot, self.class_labels.index(disease), confidence)
+        self.stats['frames'] += 1
+        return web.json_response({'disease': disease, 'confidence': round(confidence, 2), 'batch_size': batch_size})
+
+    async def handle_status(self, request):
+        status = self.registry.status(request.match_info['name'], self.class_labels)
+        if status is None:
+            raise web.HTTPNotFound(text='unknown device')
+        return web.json_response(status)
+
+    async def handle_devices(self, request):
+        return web.json_response([self.registry.status(n, self.class_labels) for n in self.registry.names])
+
+    async def handle_metrics(self, request):
+        return web.Response(text=self._metrics.render(), content_type='text/plain')
+
+    async def handle_health(self, request):
+        body = dict(self.stats, devices=len(self.registry), state_bytes=int(self.registry.state.nbytes))
+        if self.batcher is not None:
+            body['batcher'] = self.batcher.stats
+            body['queue_depth'] = self.batcher.queue.qsize()
+        return web.json_response(body)
+
+def create_batcher(backend=None, max_batch_size=16, max_wait_ms=5.0, max_queue=512):
+    """Shared inference pool for every device (the model is loaded once)"""
+    if CNN_DIR not in sys.path:
+        sys.path.insert(0, CNN_DIR)
+    from Disease_prediction_py import get_backend, warm_up
+    from inference_server import MicroBatcher
+
+    model_backend = get_backend(backend)
+    warm_up(model_backend)
+    return MicroBatcher(model_backend, max_batch_size, max_wait_ms, max_queue, top_k=1)
+
+def is_loopback(host):
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8090)
+    parser.add_argument('--registry', default=REGISTRY_PATH)
+    parser.add_argument('--backend', default=None)
+    parser.add_argument('--no-inference', action='store_true')
+    parser.add_argument('--admin-token', default=os.environ.get('PLANT_HUB_ADMIN_TOKEN'))
+    args = parser.parse_args()
+    if not args.admin_token and not is_loopback(args.host):
+        parser.error(f"--admin-token (or PLANT_HUB_ADMIN_TOKEN) is required when binding to {args.host}")
+
+    hub = PlantHub(DeviceRegistry(args.registry),
+                   None if args.no_inference else create_batcher(args.backend),
+                   admin_token=args.admin_token)
+    print(f"🌿 Plant hub on {args.host}:{args.port} with {len(hub.registry)} registered devices")
+    web.run_app(hub.app(), host=args.host, port=args.port)
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+
+"""
+Replay harness: run AdaptiveScheduler over a directory of saved frames
+Frames are taken in time order (plant_YYYYmmdd_HHMMSS.jpg names from
+main_pi.py, else file mtime). Each frame is shrunk to the preview size and
+fed to the scheduler; a frame that falls inside the interval the scheduler
+asked for is not looked at at all, like the Pi sleeping through it.
+Reports how many full captures (upload + inference + Telegram) the fixed
+timer would have made vs the scheduler, and the bytes saved.
+
+Usage:
+    python replay_capture_scheduler.py /home/pi/smartplant_images
+    python replay_capture_scheduler.py frames/ --sensor-db /home/pi/smartplant_sensors.db --predict
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+from PIL import Image
+
+from capture_scheduler import PREVIEW_SIZE, AdaptiveScheduler
+
+CNN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'CNN')
+
+
+def frame_time(path):
+    name = os.path.splitext(os.path.basename(path))[0]
+    try:
+        return datetime.strptime(name[-15:], '%Y%m%d_%H%M%S').timestamp()
+    except ValueError:
+        return os.path.getmtime(path)
+
+
+def load_preview(path):
+    with Image.open(path) as img:
+        img.draft('RGB', PREVIEW_SIZE)     # JPEG: decode at 1/2..1/8 scale directly
+        return np.asarray(img.convert('RGB').resize(PREVIEW_SIZE, Image.NEAREST))
+
+
+def sensor_reader(db_path):
+    """ts -> latest reading dict at or before ts (from SensorStore)"""
+    if not db_path:
+        return lambda ts: {}
+    from sensor_store import METRICS, SensorStore
+    store = SensorStore(db_path)
+
+    def reading(ts):
+        rows = store.raw(ts - 600, ts + 1)
+        return dict(zip(('ts',) + METRICS, rows[-1])) if rows else {}
+    return reading
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('folder')
+    parser.add_argument('--base-interval', type=float, default=300)
+    parser.add_argument('--min-interval', type=float, default=60)
+    parser.add_argument('--max-interval', type=float, default=900)
+    parser.add_argument('--heartbeat', type=float, default=3600)
+    parser.add_argument('--diff-threshold', type=float, default=8.0)
+    parser.add_argument('--green-threshold', type=float, default=0.05)
+    parser.add_argument('--sensor-db', default=None, help='SensorStore database for threshold crossings')
+    parser.add_argument('--predict', action='store_true', help='Run the CNN on captured frames (feeds back disease)')
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    paths = sorted((p for ext in ('jpg', 'jpeg', 'png') for p in glob.glob(os.path.join(args.folder, f'*.{ext}'))),
+                   key=frame_time)
+    if not paths:
+        sys.exit(f"No frames in {args.folder}")
+    if args.predict:
+        sys.path.insert(0, CNN_DIR)
+        from Disease_prediction_py import predict_batch
+
+    scheduler = AdaptiveScheduler(args.base_interval, args.min_interval, args.max_interval, args.heartbeat,
+                                  args.diff_threshold, args.green_threshold)
+    readings = sensor_reader(args.sensor_db)
+
+    next_look = fixed_next = float('-inf')
+    fixed_captures = fixed_bytes = captured_bytes = not_previewed = 0
+    score_seconds = 0.0
+    for path in paths:
+        ts, size = frame_time(path), os.path.getsize(path)
+        if ts >= fixed_next:
+            fixed_captures += 1
+            fixed_bytes += size
+            fixed_next = ts + args.base_interval
+        if ts < next_look:
+            not_previewed += 1
+            continue
+
+        preview = load_preview(path)
+        start = time.perf_counter()
+        decision = scheduler.decide(preview, readings(ts), now=ts)
+        score_seconds += time.perf_counter() - start
+        next_look = ts + decision.interval
+        if decision.capture:
+            captured_bytes += size
+            if args.predict:
+                labels, confidences = predict_batch([path], top_k=1)
+                scheduler.record_prediction(str(labels[0][0]), float(confidences[0][0]))
+        if args.verbose:
+            print(f"{os.path.basename(path)}: {decision}")
+
+    stats = scheduler.stats
+    captures = stats['captures']
+    span_h = (frame_time(paths[-1]) - frame_time(paths[0])) / 3600
+    print(f"{len(paths)} frames over {span_h:.1f} h")
+    print(f"Fixed {args.base_interval:.0f}s timer: {fixed_captures} captures, {fixed_bytes / 1e6:.1f} MB")
+    print(f"Adaptive: {stats['previews']} previews ({not_previewed} slept through), {captures} captures, "
+          f"{captured_bytes / 1e6:.1f} MB")
+    if fixed_captures:
+        print(f"Captures avoided: {100 * (1 - captures / fixed_captures):.0f}%, "
+              f"bytes avoided: {100 * (1 - captured_bytes / max(fixed_bytes, 1)):.0f}%")
+    print(f"Preview scoring: {score_seconds / max(stats['previews'], 1) * 1000:.2f} ms/frame")
+    print("Capture reasons: " + ", ".join(f"{k} {v}" for k, v in stats.items()
+                                         if k not in ('previews', 'captures', 'skipped')))
+
+
+if __name__ == "__main__":
+    main()
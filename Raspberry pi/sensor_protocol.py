@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+
+"""
+Arduino serial protocol for the Smart Plant Monitor
+- Framed format (plant_detection.ino, FRAMED_OUTPUT):
+      $PLANT,<temp>,<humidity>,<soil>,<ldr>,<pump>,<lights>*<XX>
+  XX = XOR checksum (hex) of the characters between '$' and '*'
+- Legacy text format (Temperature:, Humidity:, Soil Moisture:, ...) is
+  still understood, so older sketches keep working
+- iter_serial_lines() is event-driven: the event loop sleeps until the
+  serial file descriptor is readable instead of polling in_waiting
+"""
+
+import asyncio
+import os
+
+FRAME_TAG = 'PLANT'
+FRAME_FIELDS = ('temp', 'humidity', 'soil', 'ldr', 'pump', 'lights')
+LEGACY_SAMPLE_END = '========================'
+
+# ====== Framed protocol ======
+def checksum(body):
+    value = 0
+    for ch in body.encode('ascii', errors='ignore'):
+        value ^= ch
+    return value
+
+def encode_frame(temp, humidity, soil, ldr, pump, lights):
+    """Build one framed line (used by the simulator and tests)"""
+    fmt = lambda v: '' if v is None else f"{v:.1f}"
+    body = f"{FRAME_TAG},{fmt(temp)},{fmt(humidity)},{int(soil)},{int(ldr)},{int(bool(pump))},{int(bool(lights))}"
+    return f"${body}*{checksum(body):02X}\r\n"
+
+def parse_frame(line):
+    """
+    Parse a framed line into the same dict shape as parse_legacy_line
+    (string values, pump/lights as 'ON'/'OFF').
+    Returns None when the line is malformed or the checksum does not match.
+    """
+    line = line.strip()
+    if not line.startswith('$') or '*' not in line:
+        return None
+    body, _, received = line[1:].rpartition('*')
+    try:
+        if int(received, 16) != checksum(body):
+            return None
+    except ValueError:
+        return None
+
+    parts = body.split(',')
+    if len(parts) != len(FRAME_FIELDS) + 1 or parts[0] != FRAME_TAG:
+        return None
+
+    data = {}
+    for name, value in zip(FRAME_FIELDS, parts[1:]):
+        if name in ('pump', 'lights'):
+            data[name] = 'ON' if value == '1' else 'OFF'
+        elif value:
+            data[name] = value
+    return data
+
+# ====== Legacy text protocol ======
+def parse_legacy_line(line):
+    """Parse one human-readable line from plant_detection.ino"""
+    line = line.strip()
+    if line.startswith("Temperature:"):
+        return {'temp': line.split(":")[1].strip().split()[0]}
+    if line.startswith("Humidity:"):
+        return {'humidity': line.split(":")[1].strip().split()[0]}
+    if line.startswith("Soil Moisture:"):
+        return {'soil': line.split(":")[1].strip()}
+    if line.startswith("LDR Value:"):
+        return {'ldr': line.split(":")[1].strip()}
+    if line.startswith("Lights:"):
+        return {'lights': line.split(":")[1].strip()}
+    if "Pump ON" in line:
+        return {'pump': "ON"}
+    if "Pump OFF" in line:
+        return {'pump': "OFF"}
+    return {}
+
+def same_readings(a, b, tolerance=0.051):
+    """
+    True when two parsed samples agree on every field both carry (text
+    blocks print 2 decimals, frames 1, hence the tolerance)
+    """
+    for name in a.keys() & b.keys():
+        try:
+            if abs(float(a[name]) - float(b[name])) > tolerance:
+                return False
+        except ValueError:
+            if a[name] != b[name]:
+                return False
+    return True
+
+class SensorParser:
+    """
+    Line-by-line parser for a stream that may mix framed and legacy lines.
+    feed_line() returns the fields found on that line; .latest keeps the
+    merged state and .stats counts samples and checksum failures.
+
+    A complete sample is a valid frame or a finished text block. With
+    FRAMED_OUTPUT the sketch prints the text block and then its frame; a
+    frame that directly follows a block with the same readings is that
+    block's copy and is not counted again. Counting does not depend on
+    which format came first, so a port that switches formats mid-stream
+    loses no samples.
+    """
+
+    def __init__(self):
+        self.latest = {}
+        self.stats = {'samples': 0, 'frames': 0, 'legacy_samples': 0, 'bad_frames': 0}
+        self._block = {}            # fields of the text block being read
+        self._last_block = None     # fields of a block that just ended (until the next line)
+
+    def feed_line(self, line):
+        line = line.strip()
+        if not line:
+            return {}
+        last_block, self._last_block = self._last_block, None
+        if line.startswith('$'):
+            fields = parse_frame(line)
+            if fields is None:
+                self.stats['bad_frames'] += 1
+                return {}
+            self.stats['frames'] += 1
+            if last_block is None or not same_readings(last_block, fields):
+                self.stats['samples'] += 1
+        else:
+            fields = parse_legacy_line(line)
+            self._block.update(fields)
+            if line == LEGACY_SAMPLE_END:
+                self.stats['legacy_samples'] += 1
+                self.stats['samples'] += 1
+                self._last_block, self._block = self._block, {}
+        self.latest.update(fields)
+        return fields
+
+    @property
+    def samples(self):
+        """Complete samples seen, each counted once (see the class docstring)"""
+        return self.stats['samples']
+
+# ====== Event-driven reader ======
+async def iter_serial_lines(port, chunk_size=4096):
+    """
+    Async generator of decoded lines from a serial port (or raw fd).
+    Uses loop.add_reader(), so no CPU is spent while the port is idle.
+    """
+    loop = asyncio.get_running_loop()
+    fd = port if isinstance(port, int) else port.fileno()
+    os.set_blocking(fd, False)
+    lines = asyncio.Queue()
+    buffer = bytearray()
+
+    def on_readable():
+        try:
+            chunk = os.read(fd, chunk_size)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            loop.remove_reader(fd)
+            lines.put_nowait(e)
+            return
+        if not chunk:
+            loop.remove_reader(fd)
+            lines.put_nowait(EOFError("serial port closed"))
+            return
+        buffer.extend(chunk)
+        start = 0
+        while True:
+            end = buffer.find(b'\n', start)
+            if end < 0:
+                break
+            lines.put_nowait(bytes(buffer[start:end + 1]))
+            start = end + 1
+        del buffer[:start]
+
+    loop.add_reader(fd, on_readable)
+    try:
+        while True:
+            item = await lines.get()
+            if isinstance(item, Exception):
+                raise item
+            yield item.decode('utf-8', errors='ignore')
+    finally:
+        loop.remove_reader(fd)
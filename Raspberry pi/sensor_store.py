@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+
+"""
+Time-series store for sensor history (SQLite, WAL mode)
+- Append-only raw table: temp, humidity, soil, ldr, pump per reading
+- Writes are buffered and flushed in one transaction per batch
+- Each flush also updates 1-minute, 1-hour and 1-day rollups
+  (count / sum / min / max per metric, pump-on count), so "last 24h"
+  queries read at most a few dozen rollup rows instead of raw samples
+"""
+
+import math
+import sqlite3
+import threading
+import time
+
+METRICS = ('temp', 'humidity', 'soil', 'ldr')
+ROLLUPS = {'1m': 60, '1h': 3600, '1d': 86400}
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+class SensorStore:
+    def __init__(self, db_path='sensor_history.db', batch_size=100, flush_interval=5.0):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")   # safe with WAL, far fewer fsyncs
+        self._create_tables()
+
+    def _create_tables(self):
+        metric_cols = ", ".join(f"{m} REAL" for m in METRICS)
+        self.conn.execute(f"CREATE TABLE IF NOT EXISTS readings (ts REAL NOT NULL, {metric_cols}, pump INTEGER)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS readings_ts ON readings(ts)")
+
+        rollup_cols = ", ".join(
+            f"{m}_n INTEGER, {m}_sum REAL, {m}_min REAL, {m}_max REAL" for m in METRICS
+        )
+        for name in ROLLUPS:
+            self.conn.execute(
+                f"CREATE TABLE IF NOT EXISTS rollup_{name} "
+                f"(bucket INTEGER PRIMARY KEY, count INTEGER, pump_on INTEGER, {rollup_cols})"
+            )
+        self.conn.commit()
+
+    # ====== Writes ======
+    def append(self, sensor_data, ts=None):
+        """
+        Queue one reading (dict as produced by parse_sensor_data).
+        Flushed automatically every batch_size readings or flush_interval seconds.
+        """
+        row = (ts if ts is not None else time.time(),) + tuple(_to_float(sensor_data.get(m)) for m in METRICS)
+        pump = sensor_data.get('pump')
+        row += (None if pump is None else int(pump == 'ON'),)
+        with self._lock:
+            self._pending.append(row)
+            due = (len(self._pending) >= self.batch_size
+                   or time.monotonic() - self._last_flush >= self.flush_interval)
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            rows, self._pending = self._pending, []
+            self._last_flush = time.monotonic()
+        if not rows:
+            return 0
+        placeholders = ", ".join("?" * (len(METRICS) + 2))
+        with self.conn:
+            self.conn.executemany(
+                f"INSERT INTO readings (ts, {', '.join(METRICS)}, pump) VALUES ({placeholders})", rows
+            )
+            for name, seconds in ROLLUPS.items():
+                self._update_rollup(name, seconds, rows)
+        return len(rows)
+
+    def _update_rollup(self, name, seconds, rows):
+        """Aggregate the batch per bucket in Python, then upsert one row per bucket"""
+        buckets = {}
+        for row in rows:
+            bucket = int(row[0] // seconds) * seconds
+            agg = buckets.get(bucket)
+            if agg is None:
+                agg = buckets[bucket] = [0, 0] + [0, 0.0, None, None] * len(METRICS)
+            agg[0] += 1
+            agg[1] += row[-1] or 0
+            for i, value in enumerate(row[1:1 + len(METRICS)]):
+                if value is None:
+                    continue
+                base = 2 + 4 * i
+                agg[base] += 1
+                agg[base + 1] += value
+                agg[base + 2] = value if agg[base + 2] is None else min(agg[base + 2], value)
+                agg[base + 3] = value if agg[base + 3] is None else max(agg[base + 3], value)
+
+        cols = ["count", "pump_on"] + [f"{m}_{s}" for m in METRICS for s in ("n", "sum", "min", "max")]
+        updates = ["count = count + excluded.count", "pump_on = pump_on + excluded.pump_on"]
+        for m in METRICS:
+            updates += [
+                f"{m}_n = {m}_n + excluded.{m}_n",
+                f"{m}_sum = {m}_sum + excluded.{m}_sum",
+                f"{m}_min = min(coalesce({m}_min, excluded.{m}_min), coalesce(excluded.{m}_min, {m}_min))",
+                f"{m}_max = max(coalesce({m}_max, excluded.{m}_max), coalesce(excluded.{m}_max, {m}_max))",
+            ]
+        self.conn.executemany(
+            f"INSERT INTO rollup_{name} (bucket, {', '.join(cols)}) VALUES ({', '.join('?' * (len(cols) + 1))}) "
+            f"ON CONFLICT(bucket) DO UPDATE SET {', '.join(updates)}",
+            [(bucket, *agg) for bucket, agg in buckets.items()],
+        )
+
+    # ====== Queries ======
+    @staticmethod
+    def pick_resolution(span_seconds, max_points=200):
+        """Coarsest-needed rollup that still gives up to max_points buckets"""
+        for name, seconds in sorted(ROLLUPS.items(), key=lambda kv: kv[1]):
+            if span_seconds / seconds <= max_points:
+                return name
+        return '1d'
+
+    def query(self, start, end=None, resolution=None):
+        """
+        Aggregated history between start and end (unix seconds).
+        Returns a list of dicts: bucket, count, pump_on_ratio, <metric>_n/_avg/_min/_max.
+        The first bucket is the whole rollup bucket that contains `start`.
+        """
+        self.flush()
+        end = end if end is not None else time.time()
+        resolution = resolution or self.pick_resolution(end - start)
+        seconds = ROLLUPS[resolution]
+        return self._rollup_points(resolution, int(start // seconds) * seconds, end)
+
+    def _rollup_points(self, resolution, first_bucket, end):
+        cur = self.conn.execute(
+            f"SELECT * FROM rollup_{resolution} WHERE bucket >= ? AND bucket < ? ORDER BY bucket",
+            (first_bucket, end),
+        )
+        names = [d[0] for d in cur.description]
+        return [self._point(dict(zip(names, values))) for values in cur]
+
+    @staticmethod
+    def _point(row):
+        """Rollup-shaped row (count, pump_on, <metric>_n/_sum/_min/_max) -> query() point"""
+        point = {'bucket': row['bucket'], 'count': row['count'],
+                 'pump_on_ratio': (row['pump_on'] or 0) / row['count'] if row['count'] else 0.0}
+        for m in METRICS:
+            n = row[f"{m}_n"]
+            point[f"{m}_n"] = n
+            point[f"{m}_avg"] = row[f"{m}_sum"] / n if n else None
+            point[f"{m}_min"] = row[f"{m}_min"]
+            point[f"{m}_max"] = row[f"{m}_max"]
+        return point
+
+    def _exact_points(self, start, end, resolution=None):
+        """
+        Points covering exactly [start, end): whole buckets of the rollup,
+        with the partial bucket at `start` filled in from the next finer
+        rollup and, below one minute, from raw readings
+        """
+        resolution = resolution or self.pick_resolution(end - start)
+        seconds = ROLLUPS[resolution]
+        first_full = min(math.ceil(start / seconds) * seconds, end)
+        points = self._rollup_points(resolution, first_full, end) if first_full < end else []
+        if start < first_full:
+            finer = [name for name in ROLLUPS if ROLLUPS[name] < seconds]
+            if finer:
+                head = self._exact_points(start, first_full, max(finer, key=ROLLUPS.get))
+            else:
+                head = [self._raw_point(start, first_full)]
+            points = head + points
+        return points
+
+    def _raw_point(self, start, end):
+        """One point aggregated from the raw readings in [start, end)"""
+        cols = ["count(*) AS count", "sum(pump) AS pump_on"]
+        for m in METRICS:
+            cols += [f"count({m}) AS {m}_n", f"sum({m}) AS {m}_sum", f"min({m}) AS {m}_min", f"max({m}) AS {m}_max"]
+        cur = self.conn.execute(f"SELECT {', '.join(cols)} FROM readings WHERE ts >= ? AND ts < ?", (start, end))
+        names = [d[0] for d in cur.description]
+        return self._point(dict(zip(names, cur.fetchone()), bucket=start))
+
+    def summary(self, hours=24):
+        """
+        Single aggregate over exactly the last `hours` (for the bot's /history):
+        the partial rollup bucket at the start of the window is filled in from
+        finer rollups and raw readings instead of being counted whole
+        """
+        self.flush()
+        end = time.time()
+        points = self._exact_points(end - hours * 3600, end)
+        total = sum(p['count'] for p in points)
+        result = {'hours': hours, 'readings': total,
+                  'pump_on_ratio': sum(p['pump_on_ratio'] * p['count'] for p in points) / total if total else 0.0}
+        for m in METRICS:
+            avgs = [(p[f"{m}_avg"], p[f"{m}_n"]) for p in points if p[f"{m}_n"]]
+            weight = sum(c for _, c in avgs)
+            result[f"{m}_avg"] = sum(a * c for a, c in avgs) / weight if weight else None
+            mins = [p[f"{m}_min"] for p in points if p[f"{m}_min"] is not None]
+            maxs = [p[f"{m}_max"] for p in points if p[f"{m}_max"] is not None]
+            result[f"{m}_min"] = min(mins) if mins else None
+            result[f"{m}_max"] = max(maxs) if maxs else None
+        return result
+
+    def raw(self, start, end=None):
+        """Raw readings in a range (uses the ts index)"""
+        self.flush()
+        end = end if end is not None else time.time()
+        return self.conn.execute(
+            f"SELECT ts, {', '.join(METRICS)}, pump FROM readings WHERE ts >= ? AND ts < ? ORDER BY ts",
+            (start, end),
+        ).fetchall()
+
+    def close(self):
+        self.flush()
+        self.conn.close()
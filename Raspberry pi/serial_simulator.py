@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+
+"""
+Fake Arduino on a pseudo-terminal (no hardware needed)
+- Emits plant_detection.ino output on a pty: legacy text, framed lines, or both
+- Point SERIAL_PORT (or serial.Serial) at the printed /dev/pts/N path
+
+Usage:
+    python serial_simulator.py --format both --rate 0.5
+"""
+
+import argparse
+import math
+import os
+import random
+import threading
+import time
+import tty
+
+from sensor_protocol import LEGACY_SAMPLE_END, encode_frame
+
+FORMATS = ('legacy', 'framed', 'both')
+
+def legacy_block(temp, humidity, soil, ldr, pump, lights):
+    """Same text block the Arduino sketch prints every loop()"""
+    lines = ["--- Sensor Readings ---"]
+    lines.append(f"Temperature: {temp:.2f} *C" if temp is not None else "Temperature: ERROR")
+    lines.append(f"Humidity: {humidity:.2f} %" if humidity is not None else "Humidity: ERROR")
+    lines.append(f"Soil Moisture: {soil}")
+    lines.append(f"LDR Value: {ldr}")
+    lines.append("Status: Pump ON - Watering" if pump else "Status: Pump OFF")
+    lines.append(f"Lights: {'ON' if lights else 'OFF'}")
+    lines.append("Total Light Time Today: 0 hours")
+    lines.append(LEGACY_SAMPLE_END)
+    lines.append("")
+    return "".join(line + "\r\n" for line in lines)
+
+class FakeArduino:
+    """
+    Writes synthetic samples to the master side of a pty from a thread.
+    rate = samples per second (the real sketch sends one every ~2 s).
+    """
+
+    def __init__(self, fmt='both', rate=0.5, seed=0):
+        if fmt not in FORMATS:
+            raise ValueError(f"format must be one of {FORMATS}")
+        self.fmt = fmt
+        self.rate = rate
+        self.random = random.Random(seed)
+        self.master_fd, self.slave_fd = os.openpty()
+        tty.setraw(self.slave_fd)
+        self.port_path = os.ttyname(self.slave_fd)
+        self.samples_sent = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def sample(self, i):
+        temp = 24 + 4 * math.sin(i / 50) + self.random.uniform(-0.3, 0.3)
+        humidity = 60 + 10 * math.cos(i / 70) + self.random.uniform(-1, 1)
+        soil = int(450 + 150 * math.sin(i / 30))
+        ldr = int(self.random.uniform(200, 800))
+        pump = soil < 500
+        lights = ldr < 300
+        return temp, humidity, soil, ldr, pump, lights
+
+    def render(self, values):
+        out = ""
+        if self.fmt in ('legacy', 'both'):
+            out += legacy_block(*values)
+        if self.fmt in ('framed', 'both'):
+            out += encode_frame(*values)
+        return out.encode('ascii')
+
+    def _run(self):
+        interval = 1.0 / self.rate if self.rate > 0 else 0
+        next_send = time.monotonic()
+        while not self._stop.is_set():
+            os.write(self.master_fd, self.render(self.sample(self.samples_sent)))
+            self.samples_sent += 1
+            if interval:
+                next_send += interval
+                self._stop.wait(max(0.0, next_send - time.monotonic()))
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='fake-arduino', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def close(self):
+        self.stop()
+        os.close(self.master_fd)
+        os.close(self.slave_fd)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--format', choices=FORMATS, default='both')
+    parser.add_argument('--rate', type=float, default=0.5, help='Samples per second')
+    args = parser.parse_args()
+
+    arduino = FakeArduino(args.format, args.rate).start()
+    print(f"🔌 Fake Arduino on {arduino.port_path} ({args.format}, {args.rate} samples/s). Ctrl+C to stop.")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        arduino.close()
+
+if __name__ == "__main__":
+    main()
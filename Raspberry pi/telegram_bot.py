@@ -9,15 +9,36 @@ Features:
 - Send disease reports (PDF with annotated images)
 - Send prediction CSV and detection charts
 - Send full frames report
-- Trigger PC-based disease detection
+- Trigger disease detection (background job queue with live progress, /jobs)
+- Sensor history summaries (/history) from the SQLite time-series store
+- Many plants: /status <plant> and /plants read from plant_hub.py (PLANT_HUB_URL)
+- Files and photos go through TelegramDispatcher (rate limited, media
+  groups, file_id cache, retries on 429)
+- Plant photos are sent as archive thumbnails (/photo), not full captures
+- /metrics: command latencies, queue stats and main_pi.py's stage timings
+  (PLANT_METRICS_URL) from CNN/metrics.py
 """
 
 import telegram
 from telegram import Update, ReplyKeyboardMarkup, KeyboardButton
+from telegram.helpers import escape_markdown
 from telegram.ext import Application, CommandHandler, ContextTypes
+import aiohttp
 import asyncio
+import math
 import os
+import sys
 from datetime import datetime
+from urllib.parse import quote
+
+from detection_jobs import DetectionScheduler
+from image_archive import ImageArchive
+from sensor_store import SensorStore
+from telegram_dispatcher import TelegramDispatcher
+
+CNN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'CNN')
+sys.path.insert(0, CNN_DIR)
+from metrics import register_stats, summary_text, timed  # noqa: E402
 
 # ====== Configuration ======
 BOT_TOKEN = 'YOUR_TELEGRAM_BOT_TOKEN'   # Replace with your bot token
@@ -29,6 +50,13 @@ PREDICTIONS_CSV = 'disease_predictions.csv'
 CONFIDENCE_CHART = 'confidence_chart.png'
 DETECTION_CHART = 'detection_chart.png'
 FULL_FRAMES_PDF = 'full_frames_report.pdf'
+SENSOR_DB = os.environ.get('PLANT_SENSOR_DB', '/home/pi/smartplant_sensors.db')   # Written by main_pi.py
+HISTORY_MAX_HOURS = 24 * 366                   # /history window cap (the 1d rollup covers a year)
+IMAGE_FOLDER = os.environ.get('PLANT_IMAGE_FOLDER', '/home/pi/smartplant_images')  # Captures from main_pi.py
+TELEGRAM_API = os.environ.get('PLANT_TELEGRAM_API', 'https://api.telegram.org')  # fake_bot_api.py in benchmarks
+HUB_URL = os.environ.get('PLANT_HUB_URL')      # e.g. http://hub:8090 when serving many plants
+CASCADE_MARGIN = os.environ.get('LEAF_CASCADE_MARGIN')  # e.g. 0.2: run YOLO only on likely-diseased frames
+METRICS_URL = os.environ.get('PLANT_METRICS_URL', 'http://localhost:9108/metrics')  # main_pi.py endpoint
 
 # Global variables for sensor data and control
 latest_sensor_data = {}
@@ -36,7 +64,31 @@ pump_status = "OFF"
 uv_light_status = "OFF"
 
 # Initialize bot
-bot = telegram.Bot(token=BOT_TOKEN)
+bot = telegram.Bot(token=BOT_TOKEN, base_url=f"{TELEGRAM_API}/bot")
+
+# Outbound queue for files/photos (and automated messages)
+dispatcher = TelegramDispatcher(BOT_TOKEN, api_base=TELEGRAM_API)
+register_stats('telegram_dispatcher', dispatcher.stats)
+
+# Read-side of main_pi.py's image archive (thumbnails made on demand if missing)
+archive = ImageArchive(IMAGE_FOLDER, background=False)
+
+async def send_files(chat_id, files):
+    """
+    Queue (kind, path, caption) entries that exist and wait for delivery.
+    Consecutive documents/photos go out as one media group.
+    Returns the number of files delivered.
+    """
+    futures = []
+    for kind, path, caption in files:
+        if not os.path.exists(path):
+            continue
+        if kind == 'photo':
+            futures.append(dispatcher.send_photo(chat_id, path, caption=caption))
+        else:
+            futures.append(dispatcher.send_document(chat_id, path, caption=caption))
+    results = await asyncio.gather(*futures, return_exceptions=True)
+    return sum(not isinstance(r, Exception) for r in results)
 
 # ====== Keyboard Layouts ======
 def get_main_keyboard():
@@ -56,13 +108,18 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "🌿 *Welcome to Smart Plant Bot!* 🌿\n\n"
         "I can help you monitor your plants and detect diseases.\n\n"
         "*Available Commands:*\n"
-        "🌿 /status - Get current sensor readings\n"
+        "🌿 /status [plant] - Get current sensor readings\n"
+        "🪴 /plants - List plants connected to the hub\n"
         "💧 /water - Water the plant manually\n"
         "☀️ /toggle_uv - Toggle UV/grow lights\n"
         "📄 /report - Get disease detection report\n"
         "📊 /chart - Get detection charts\n"
         "📸 /frames - Get full frames report\n"
-        "🖥️ /detect - Trigger disease detection\n\n"
+        "🖼️ /photo - Latest plant photo\n"
+        "🖥️ /detect [images] - Run disease detection (default 20 latest)\n"
+        "📋 /jobs - Detection queue and timings\n"
+        "⏱️ /metrics - Latencies and error counts\n"
+        "📈 /history [hours] - Sensor trends (default 24h)\n\n"
         "Use the buttons below for quick access!"
     )
     await update.message.reply_text(
@@ -71,12 +128,15 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         reply_markup=get_main_keyboard()
     )
 
-async def status_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handle /status command - show current sensor readings"""
-    temp = latest_sensor_data.get('temp', 'N/A')
-    humidity = latest_sensor_data.get('humidity', 'N/A')
-    soil = latest_sensor_data.get('soil', 'N/A')
-    ldr = latest_sensor_data.get('ldr', 'N/A')
+def build_status_message(sensor_data, pump, uv, title="Smart Plant Status", updated=None, plant=None):
+    """
+    Format sensor readings the same way for the local plant and hub plants
+    (Markdown; `plant` comes from the user/hub and is escaped, outside any entity)
+    """
+    temp = sensor_data.get('temp', 'N/A')
+    humidity = sensor_data.get('humidity', 'N/A')
+    soil = sensor_data.get('soil', 'N/A')
+    ldr = sensor_data.get('ldr', 'N/A')
     
     # Determine soil status
     try:
@@ -112,16 +172,51 @@ async def status_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     except (ValueError, TypeError):
         humidity_status = "❓ Unknown"
     
-    status_message = (
-        "🌱 *Smart Plant Status*\n\n"
+    header = f"🌱 *{title}:* {escape_markdown(plant)}" if plant else f"🌱 *{title}*"
+    return (
+        f"{header}\n\n"
         f"🌡 *Temp:* {temp}°C — {temp_status} Temperature\n"
         f"💧 *Humidity:* {humidity}% — {humidity_status} Humidity\n"
         f"🌱 *Soil:* {soil} — {soil_status}\n"
         f"💡 *Light:* {ldr}\n"
-        f"💦 *Pump:* {pump_status}\n"
-        f"☀️ *UV:* {uv_light_status}\n\n"
-        f"_Last updated: {datetime.now().strftime('%I:%M %p')}_"
+        f"💦 *Pump:* {pump}\n"
+        f"☀️ *UV:* {uv}\n\n"
+        f"_Last updated: {(updated or datetime.now()).strftime('%I:%M %p')}_"
     )
+
+async def fetch_hub(path):
+    """GET a JSON document from the plant hub; None if the plant is unknown"""
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=5)) as session:
+        async with session.get(f"{HUB_URL}{path}") as resp:
+            if resp.status == 404:
+                return None
+            resp.raise_for_status()
+            return await resp.json()
+
+async def status_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /status [plant] command - show current sensor readings"""
+    if not context.args:
+        status_message = build_status_message(latest_sensor_data, pump_status, uv_light_status)
+    elif not HUB_URL:
+        status_message = "❌ No plant hub configured (set PLANT_HUB_URL)."
+    else:
+        plant = " ".join(context.args)
+        try:
+            device = await fetch_hub(f"/devices/{quote(plant, safe='')}/status")
+        except Exception as e:
+            device, status_message = None, f"❌ Plant hub unreachable: {escape_markdown(str(e))}"
+        else:
+            status_message = f"❌ Unknown plant '{escape_markdown(plant)}'. Use /plants to list them."
+        if device:
+            updated = datetime.fromtimestamp(device['last_seen']) if device['last_seen'] else None
+            status_message = build_status_message(
+                {k: 'N/A' if device[k] is None else device[k] for k in ('temp', 'humidity', 'soil', 'ldr')},
+                device['pump'] or 'N/A', device['lights'] or 'N/A', title="Plant", updated=updated, plant=plant,
+            )
+            if device['disease']:
+                # Labels like rose_rust would open an italic entity: escaped, and kept out of one
+                status_message += (f"\n🔬 Last detection: {escape_markdown(device['disease'])} "
+                                   f"({device['confidence']:.1f}%)")
     
     await update.message.reply_text(
         status_message,
@@ -129,6 +224,28 @@ async def status_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         reply_markup=get_main_keyboard()
     )
 
+async def plants_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /plants command - list devices registered with the plant hub"""
+    if not HUB_URL:
+        await update.message.reply_text("❌ No plant hub configured (set PLANT_HUB_URL).")
+        return
+    try:
+        devices = await fetch_hub("/devices") or []
+    except Exception as e:
+        await update.message.reply_text(f"❌ Plant hub unreachable: {e}")
+        return
+    now = datetime.now().timestamp()
+    lines = [
+        f"{'🟢' if d['last_seen'] and now - d['last_seen'] < 900 else '⚪️'} {escape_markdown(d['name'])}"
+        + (f" — {escape_markdown(d['disease'])}" if d['disease'] else "")
+        for d in devices
+    ]
+    await update.message.reply_text(
+        "🪴 *Plants*\n\n" + ("\n".join(lines) or "No plants registered yet."),
+        parse_mode='Markdown',
+        reply_markup=get_main_keyboard()
+    )
+
 async def water_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /water command - manually trigger watering"""
     global pump_status
@@ -175,27 +292,16 @@ async def report_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /report command - send disease detection report"""
     await update.message.reply_text("📄 Generating disease report... Please wait.")
     
-    # Send disease report PDF
-    if os.path.exists(DISEASE_REPORT_PDF):
-        with open(DISEASE_REPORT_PDF, 'rb') as pdf:
-            await update.message.reply_document(
-                document=pdf,
-                filename="disease_report.pdf",
-                caption="🔬 Plant Disease Detection Report"
-            )
-    else:
+    if not os.path.exists(DISEASE_REPORT_PDF):
         await update.message.reply_text("❌ Disease report not found. Run detection first.")
-    
-    # Send predictions CSV
-    if os.path.exists(PREDICTIONS_CSV):
-        with open(PREDICTIONS_CSV, 'rb') as csv:
-            await update.message.reply_document(
-                document=csv,
-                filename="disease_predictions.csv",
-                caption="📊 Disease Prediction Data (CSV)"
-            )
-    else:
+    if not os.path.exists(PREDICTIONS_CSV):
         await update.message.reply_text("❌ Predictions CSV not found.")
+
+    # PDF + CSV as one media group; unchanged files are re-sent by file_id
+    await send_files(update.effective_chat.id, [
+        ('document', DISEASE_REPORT_PDF, "🔬 Plant Disease Detection Report"),
+        ('document', PREDICTIONS_CSV, "📊 Disease Prediction Data (CSV)"),
+    ])
     
     await update.message.reply_text("✅ Report sent!", reply_markup=get_main_keyboard())
 
@@ -203,30 +309,16 @@ async def chart_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /chart command - send detection charts"""
     await update.message.reply_text("📊 Generating charts... Please wait.")
     
-    charts_sent = 0
-    
-    # Send confidence chart
-    if os.path.exists(CONFIDENCE_CHART):
-        with open(CONFIDENCE_CHART, 'rb') as chart:
-            await update.message.reply_photo(
-                photo=chart,
-                caption="📊 Average Disease Confidence\n\n"
-                        "Shows confidence levels for:\n"
-                        "• Healthy Leaf Rose\n"
-                        "• Rose Rust\n"
-                        "• Rose Sawfly Slug"
-            )
-        charts_sent += 1
-    
-    # Send detection chart
-    if os.path.exists(DETECTION_CHART):
-        with open(DETECTION_CHART, 'rb') as chart:
-            await update.message.reply_photo(
-                photo=chart,
-                caption="📊 Total Disease Detections\n\n"
-                        "Shows total number of detections for each disease type"
-            )
-        charts_sent += 1
+    # Both charts in one media group
+    charts_sent = await send_files(update.effective_chat.id, [
+        ('photo', CONFIDENCE_CHART, "📊 Average Disease Confidence\n\n"
+                                    "Shows confidence levels for:\n"
+                                    "• Healthy Leaf Rose\n"
+                                    "• Rose Rust\n"
+                                    "• Rose Sawfly Slug"),
+        ('photo', DETECTION_CHART, "📊 Total Disease Detections\n\n"
+                                   "Shows total number of detections for each disease type"),
+    ])
     
     if charts_sent == 0:
         await update.message.reply_text(
@@ -244,12 +336,9 @@ async def frames_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text("📸 Generating full frames report... Please wait.")
     
     if os.path.exists(FULL_FRAMES_PDF):
-        with open(FULL_FRAMES_PDF, 'rb') as pdf:
-            await update.message.reply_document(
-                document=pdf,
-                filename="full_frames_report.pdf",
-                caption="📸 Full Frames Report\n\nComplete collection of captured plant images"
-            )
+        await send_files(update.effective_chat.id, [
+            ('document', FULL_FRAMES_PDF, "📸 Full Frames Report\n\nComplete collection of captured plant images"),
+        ])
         await update.message.reply_text("✅ Full frames report sent!", reply_markup=get_main_keyboard())
     else:
         await update.message.reply_text(
@@ -257,47 +346,154 @@ async def frames_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             reply_markup=get_main_keyboard()
         )
 
-async def detect_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handle /detect command - trigger PC-based disease detection"""
+async def photo_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /photo command - latest capture as a thumbnail"""
+    latest = archive.latest(1)
+    thumb = archive.thumbnail(latest[0]) if latest else None
+    if thumb is None:
+        await update.message.reply_text("❌ No plant photos yet.", reply_markup=get_main_keyboard())
+        return
+    taken = os.path.basename(latest[0])
+    await send_files(update.effective_chat.id, [('photo', thumb, f"📸 {taken}")])
+
+async def history_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /history [hours] command - sensor trends from the rollup tables"""
+    try:
+        hours = float(context.args[0]) if context.args else 24
+    except ValueError:
+        hours = 24
+    # inf/nan parse as floats but overflow or poison the time window
+    if not math.isfinite(hours) or not 0 < hours <= HISTORY_MAX_HOURS:
+        hours = min(max(hours, 1), HISTORY_MAX_HOURS) if math.isfinite(hours) else 24
+        await update.message.reply_text(f"ℹ️ Using {hours:g}h (allowed: up to {HISTORY_MAX_HOURS}h).")
+
+    if not os.path.exists(SENSOR_DB):
+        await update.message.reply_text("❌ No sensor history yet.", reply_markup=get_main_keyboard())
+        return
+
+    def read_summary():
+        store = SensorStore(SENSOR_DB)
+        try:
+            return store.summary(hours)
+        finally:
+            store.close()
+
+    # sqlite3 blocks; keep it off the event loop so other updates keep flowing
+    summary = await asyncio.get_running_loop().run_in_executor(None, read_summary)
+
+    if summary['readings'] == 0:
+        await update.message.reply_text(f"❌ No readings in the last {hours:g}h.", reply_markup=get_main_keyboard())
+        return
+
+    def fmt(metric, unit=''):
+        avg = summary[f'{metric}_avg']
+        if avg is None:
+            return "N/A"
+        return f"{avg:.1f}{unit} (min {summary[f'{metric}_min']:.1f}, max {summary[f'{metric}_max']:.1f})"
+
     message = (
-        "🖥️ *Triggering Disease Detection*\n\n"
-        "Starting analysis...\n"
-        "• Capturing plant images 📸\n"
-        "• Running AI detection model 🤖\n"
-        "• Generating reports 📊\n\n"
-        "This may take 1-2 minutes. Please wait..."
+        f"📈 *Sensor History — last {hours:g}h*\n\n"
+        f"🌡 *Temp:* {fmt('temp', '°C')}\n"
+        f"💧 *Humidity:* {fmt('humidity', '%')}\n"
+        f"🌱 *Soil:* {fmt('soil')}\n"
+        f"💡 *Light:* {fmt('ldr')}\n"
+        f"💦 *Pump on:* {summary['pump_on_ratio'] * 100:.0f}% of readings\n\n"
+        f"_{summary['readings']} readings_"
     )
-    await update.message.reply_text(message, parse_mode='Markdown')
-    
-    # TODO: Trigger detection script on PC/Raspberry Pi
-    # This would typically call your disease detection pipeline
-    
-    await asyncio.sleep(3)  # Simulate processing time
-    
+    await update.message.reply_text(message, parse_mode='Markdown', reply_markup=get_main_keyboard())
+
+async def detect_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /detect [images] command - queue a detection job and stream its progress"""
+    try:
+        max_frames = int(context.args[0]) if context.args else None
+    except ValueError:
+        max_frames = None
+    limit = detection_scheduler.frame_limit
+    if max_frames is not None and not 1 <= max_frames <= limit:
+        max_frames = min(max(max_frames, 1), limit)
+        await update.message.reply_text(f"ℹ️ Using {max_frames} images (allowed: 1-{limit}).")
+
+    job, is_new = detection_scheduler.submit(update.effective_chat.id, max_frames)
+    if not is_new:
+        await update.message.reply_text(f"⏳ Detection job #{job.job_id} is already {job.status}; following it.")
+    message = await update.message.reply_text(job.progress_text())
+    job.subscribers.append((message.chat_id, message.message_id))
+
+async def jobs_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /jobs command - detection queue depth and per-stage timings"""
     await update.message.reply_text(
-        "✅ Detection complete!\n\n"
-        "Use /report to view the disease report\n"
-        "Use /chart to view detection charts",
+        "📋 *Detection Jobs*\n\n```\n" + detection_scheduler.metrics_text() + "\n```",
+        parse_mode='Markdown',
         reply_markup=get_main_keyboard()
     )
 
+async def fetch_main_metrics():
+    """main_pi.py's /metrics without the histogram buckets; None if it is not running"""
+    try:
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=3)) as session:
+            async with session.get(METRICS_URL) as resp:
+                resp.raise_for_status()
+                text = await resp.text()
+    except Exception:
+        return None
+    return "\n".join(line for line in text.splitlines()
+                     if line and not line.startswith('#') and '_bucket{' not in line)
+
+async def metrics_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /metrics command - bot and main loop timings, errors and queue stats"""
+    main_metrics = await fetch_main_metrics()
+    text = "Bot\n" + summary_text() + "\n\nMain loop\n" + (main_metrics or f"unreachable ({METRICS_URL})")
+    if len(text) > 3900:
+        text = text[:3900] + "\n..."
+    await update.message.reply_text(
+        "⏱️ *Metrics*\n\n```\n" + text + "\n```",
+        parse_mode='Markdown',
+        reply_markup=get_main_keyboard()
+    )
+
+async def update_job_progress(job):
+    """Edit every requester's progress message in place"""
+    text = job.progress_text()
+    for chat_id, message_id in job.subscribers:
+        try:
+            await bot.edit_message_text(chat_id=chat_id, message_id=message_id, text=text)
+        except telegram.error.BadRequest:
+            pass   # "message is not modified"
+
+async def detection_finished(job):
+    if job.status == 'done':
+        # Everyone whose /detect was coalesced into this job gets the reports
+        await send_disease_report_auto(job.requested_by)
+        print(f"Detection job #{job.job_id} done: " +
+              ", ".join(f"{k} {v:.1f}s" for k, v in job.timings.items()))
+    else:
+        print(f"Detection job #{job.job_id} failed: {job.error}")
+
+detection_scheduler = DetectionScheduler(
+    IMAGE_FOLDER,
+    on_progress=update_job_progress,
+    on_complete=detection_finished,
+    cascade_margin=float(CASCADE_MARGIN) if CASCADE_MARGIN else None,
+)
+register_stats('detection_jobs', detection_scheduler.stats)
+
 # ====== Direct Send Functions (for automated updates) ======
-async def send_message(text: str):
-    """Send a text message to the configured Telegram chat"""
+async def send_message(text: str, chat_id=None):
+    """Send a text message to the configured Telegram chat (or chat_id)"""
     try:
-        await bot.send_message(chat_id=CHAT_ID, text=text)
+        await dispatcher.send_text(chat_id or CHAT_ID, text)
     except Exception as e:
         print(f"Failed to send message: {e}")
 
 async def send_photo(photo_path: str, caption: str = None):
-    """Send a photo with optional caption to Telegram"""
+    """Send a photo with optional caption to Telegram (archived captures go as thumbnails)"""
+    photo_path = archive.thumbnail(photo_path) or photo_path
     if not os.path.exists(photo_path):
         print(f"Photo not found: {photo_path}")
         return
     
     try:
-        with open(photo_path, 'rb') as photo:
-            await bot.send_photo(chat_id=CHAT_ID, photo=photo, caption=caption)
+        await dispatcher.send_photo(CHAT_ID, photo_path, caption=caption)
     except Exception as e:
         print(f"Failed to send photo: {e}")
 
@@ -339,52 +535,24 @@ async def send_sensor_update(sensor_data: dict, image_path: str = None):
     if image_path:
         await send_photo(image_path, caption="📸 Current Plant Image")
 
-async def send_disease_report_auto():
+async def send_disease_report_auto(chat_ids=None):
     """
     Automatically send disease report after detection completes
-    Call this from your detection script
+    Call this from your detection script; chat_ids defaults to the configured chat
     """
-    message = "🔬 *Disease Detection Complete!*\n\nSending reports..."
-    await send_message(message)
-    
-    # Send disease report PDF
-    if os.path.exists(DISEASE_REPORT_PDF):
-        with open(DISEASE_REPORT_PDF, 'rb') as pdf:
-            await bot.send_document(
-                chat_id=CHAT_ID,
-                document=pdf,
-                filename="disease_report.pdf",
-                caption="🔬 Plant Disease Detection Report"
-            )
-    
-    # Send predictions CSV
-    if os.path.exists(PREDICTIONS_CSV):
-        with open(PREDICTIONS_CSV, 'rb') as csv:
-            await bot.send_document(
-                chat_id=CHAT_ID,
-                document=csv,
-                filename="disease_predictions.csv",
-                caption="📊 Disease Prediction Data (CSV)"
-            )
-    
-    # Send charts
-    if os.path.exists(CONFIDENCE_CHART):
-        with open(CONFIDENCE_CHART, 'rb') as chart:
-            await bot.send_photo(
-                chat_id=CHAT_ID,
-                photo=chart,
-                caption="📊 Average Disease Confidence Chart"
-            )
-    
-    if os.path.exists(DETECTION_CHART):
-        with open(DETECTION_CHART, 'rb') as chart:
-            await bot.send_photo(
-                chat_id=CHAT_ID,
-                photo=chart,
-                caption="📊 Total Disease Detections Chart"
-            )
-    
-    await send_message("✅ All reports sent successfully!")
+    for chat_id in chat_ids or [CHAT_ID]:
+        message = "🔬 *Disease Detection Complete!*\n\nSending reports..."
+        await send_message(message, chat_id)
+
+        # 2 media groups instead of 4 uploads: [PDF, CSV] and [both charts]
+        await send_files(chat_id, [
+            ('document', DISEASE_REPORT_PDF, "🔬 Plant Disease Detection Report"),
+            ('document', PREDICTIONS_CSV, "📊 Disease Prediction Data (CSV)"),
+            ('photo', CONFIDENCE_CHART, "📊 Average Disease Confidence Chart"),
+            ('photo', DETECTION_CHART, "📊 Total Disease Detections Chart"),
+        ])
+
+        await send_message("✅ All reports sent successfully!", chat_id)
 
 # ====== Main Bot Application ======
 def main():
@@ -392,15 +560,24 @@ def main():
     # Create application
     application = Application.builder().token(BOT_TOKEN).build()
     
-    # Add command handlers
-    application.add_handler(CommandHandler("start", start_command))
-    application.add_handler(CommandHandler("status", status_command))
-    application.add_handler(CommandHandler("water", water_command))
-    application.add_handler(CommandHandler("toggle_uv", toggle_uv_command))
-    application.add_handler(CommandHandler("report", report_command))
-    application.add_handler(CommandHandler("chart", chart_command))
-    application.add_handler(CommandHandler("frames", frames_command))
-    application.add_handler(CommandHandler("detect", detect_command))
+    # Add command handlers (each one timed into bot_command_seconds)
+    commands = {
+        "start": start_command,
+        "status": status_command,
+        "water": water_command,
+        "toggle_uv": toggle_uv_command,
+        "report": report_command,
+        "chart": chart_command,
+        "frames": frames_command,
+        "photo": photo_command,
+        "detect": detect_command,
+        "history": history_command,
+        "jobs": jobs_command,
+        "plants": plants_command,
+        "metrics": metrics_command,
+    }
+    for name, handler in commands.items():
+        application.add_handler(CommandHandler(name, timed('bot_command_seconds', command=name)(handler)))
     
     print("🤖 Telegram bot started!")
     print("Waiting for commands...")
@@ -0,0 +1,316 @@
+# -*- coding: utf-8 -*-
+
+"""
+Outbound Telegram queue for the bot and main_pi.py
+- One ordered queue per chat, drained concurrently across chats
+- Token buckets per chat and globally keep us under Telegram's flood
+  limits (about 1 msg/s per chat, 30 msg/s per bot)
+- Consecutive photos (or documents) queued for the same chat are
+  coalesced into one sendMediaGroup call (up to 10 per group)
+- 429 responses are retried after the server's retry_after; network
+  errors and 5xx are retried with exponential backoff
+- Uploaded file_ids are cached by (path, size, mtime), so unchanged PDFs
+  and charts are referenced instead of uploaded again
+- Talks to the Bot API over aiohttp, so api_base can point at
+  fake_bot_api.py for local throughput tests
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+
+import aiohttp
+
+API_BASE = 'https://api.telegram.org'
+FILE_ID_CACHE = 'telegram_file_ids.json'
+MAX_MEDIA_GROUP = 10
+
+class TelegramError(Exception):
+    pass
+
+# ====== Rate limiting ======
+class TokenBucket:
+    def __init__(self, rate, capacity=None):
+        self.rate = rate                        # tokens per second
+        self.capacity = capacity or max(rate, 1)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens=1):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+
+# ====== Outbound items ======
+class _Item:
+    __slots__ = ('kind', 'chat_id', 'text', 'path', 'data', 'filename', 'caption', 'parse_mode', 'future')
+
+    def __init__(self, kind, chat_id, text=None, path=None, filename=None, caption=None, parse_mode=None, data=None):
+        self.kind = kind            # 'text', 'photo' or 'document'
+        self.chat_id = chat_id
+        self.text = text
+        self.path = path
+        self.data = data            # bytes already in memory (not re-read from path)
+        self.filename = filename or (os.path.basename(path) if path else None)
+        self.caption = caption
+        self.parse_mode = parse_mode
+        self.future = asyncio.get_running_loop().create_future()
+
+# ====== Dispatcher ======
+class TelegramDispatcher:
+    def __init__(self, token, api_base=API_BASE, per_chat_rate=1.0, per_chat_burst=2, global_rate=30.0,
+                 coalesce_window=0.05, max_retries=5, cache_path=FILE_ID_CACHE, max_connections=8):
+        self.token = token
+        self.api_base = api_base.rstrip('/')
+        self.per_chat_rate = per_chat_rate
+        self.per_chat_burst = per_chat_burst
+        self.global_bucket = None               # created inside the running loop
+        self.global_rate = global_rate
+        self.coalesce_window = coalesce_window
+        self.max_retries = max_retries
+        self.cache_path = cache_path
+        self.max_connections = max_connections
+        self.file_ids = {}
+        if cache_path and os.path.exists(cache_path):
+            with open(cache_path) as f:
+                self.file_ids = json.load(f)
+        self._session = None
+        self._queues = {}
+        self._workers = {}
+        self._chat_buckets = {}
+        self.stats = {'api_calls': 0, 'messages': 0, 'media_groups': 0, 'uploads': 0,
+                      'cache_hits': 0, 'retries_429': 0, 'retries_error': 0, 'failed': 0}
+
+    # ------- Public API -------
+    def send_text(self, chat_id, text, parse_mode=None):
+        return self._enqueue(_Item('text', chat_id, text=text, parse_mode=parse_mode))
+
+    def send_photo(self, chat_id, path, caption=None, data=None):
+        """data: the encoded image if the caller already has it (path is then only a name/cache key)"""
+        return self._enqueue(_Item('photo', chat_id, path=path, caption=caption, data=data))
+
+    def send_document(self, chat_id, path, filename=None, caption=None):
+        return self._enqueue(_Item('document', chat_id, path=path, filename=filename, caption=caption))
+
+    async def drain(self):
+        """Wait until every queued item has been sent (or has failed)"""
+        await asyncio.gather(*(q.join() for q in list(self._queues.values())))
+
+    async def close(self):
+        await self.drain()
+        for task in self._workers.values():
+            task.cancel()
+        await asyncio.gather(*self._workers.values(), return_exceptions=True)
+        self._workers.clear()
+        self._queues.clear()
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        self.save_cache()
+
+    def save_cache(self):
+        if not self.cache_path:
+            return
+        tmp = self.cache_path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.file_ids, f)
+        os.replace(tmp, self.cache_path)
+
+    # ------- Queues -------
+    def _enqueue(self, item):
+        """Returns a future resolved with the Bot API result"""
+        chat = str(item.chat_id)
+        if chat not in self._queues:
+            self._queues[chat] = asyncio.Queue()
+            self._chat_buckets[chat] = TokenBucket(self.per_chat_rate, self.per_chat_burst)
+            self._workers[chat] = asyncio.create_task(self._worker(chat))
+        self._queues[chat].put_nowait(item)
+        return item.future
+
+    async def _worker(self, chat):
+        queue = self._queues[chat]
+        held = None
+        while True:
+            first = held if held is not None else await queue.get()
+            held = None
+            batch = [first]
+            if first.kind in ('photo', 'document'):
+                if queue.empty() and self.coalesce_window:
+                    await asyncio.sleep(self.coalesce_window)
+                while len(batch) < MAX_MEDIA_GROUP and not queue.empty():
+                    nxt = queue.get_nowait()
+                    if nxt.kind != first.kind:
+                        held = nxt
+                        break
+                    batch.append(nxt)
+            try:
+                results = await self._send_batch(chat, batch)
+                for item, result in zip(batch, results):
+                    if not item.future.done():
+                        item.future.set_result(result)
+            except Exception as e:
+                self.stats['failed'] += len(batch)
+                print(f"Telegram send failed: {e}")
+                for item in batch:
+                    if not item.future.done():
+                        item.future.set_exception(e)
+            finally:
+                # `held` was taken off the queue but is not done yet
+                for _ in batch:
+                    queue.task_done()
+
+    # ------- Sending -------
+    def _cache_key(self, item):
+        """
+        Photos and documents get different file_ids for the same file.
+        In-memory items are keyed on their bytes; their path may not exist.
+        """
+        if item.data is not None:
+            return f"{item.kind}|sha1:{hashlib.sha1(item.data).hexdigest()}"
+        st = os.stat(item.path)
+        return f"{item.kind}|{os.path.abspath(item.path)}|{st.st_size}|{st.st_mtime_ns}"
+
+    def _file_ref(self, item):
+        """Cached file_id, or None if the file has to be uploaded"""
+        file_id = self.file_ids.get(self._cache_key(item))
+        if file_id:
+            self.stats['cache_hits'] += 1
+        return file_id
+
+    @staticmethod
+    def _result_file_id(message, kind):
+        if kind == 'photo':
+            return message['photo'][-1]['file_id']
+        return message['document']['file_id']
+
+    async def _send_batch(self, chat, batch):
+        kind = batch[0].kind
+        if kind == 'text':
+            item = batch[0]
+            fields = {'chat_id': item.chat_id, 'text': item.text}
+            if item.parse_mode:
+                fields['parse_mode'] = item.parse_mode
+            self.stats['messages'] += 1
+            return [await self._call(chat, 'sendMessage', fields)]
+
+        try:
+            return await self._send_media(chat, batch, use_cache=True)
+        except TelegramError as e:
+            if 'file' not in str(e).lower():
+                raise
+            # A cached file_id was rejected (expired/other bot): upload again
+            for item in batch:
+                self.file_ids.pop(self._cache_key(item), None)
+            return await self._send_media(chat, batch, use_cache=False)
+
+    async def _send_media(self, chat, batch, use_cache):
+        kind = batch[0].kind
+        refs = [self._file_ref(item) if use_cache else None for item in batch]
+        files = {}
+
+        if len(batch) == 1:
+            item, ref = batch[0], refs[0]
+            method = 'sendPhoto' if kind == 'photo' else 'sendDocument'
+            fields = {'chat_id': item.chat_id}
+            if item.caption:
+                fields['caption'] = item.caption
+            if ref:
+                fields[kind] = ref
+            else:
+                files[kind] = item
+            self.stats['messages'] += 1
+            messages = [await self._call(chat, method, fields, files)]
+        else:
+            media = []
+            for i, (item, ref) in enumerate(zip(batch, refs)):
+                entry = {'type': kind, 'media': ref or f'attach://file{i}'}
+                if item.caption:
+                    entry['caption'] = item.caption
+                if not ref:
+                    files[f'file{i}'] = item
+                media.append(entry)
+            self.stats['media_groups'] += 1
+            self.stats['messages'] += len(batch)
+            messages = await self._call(chat, 'sendMediaGroup',
+                                        {'chat_id': batch[0].chat_id, 'media': json.dumps(media)}, files)
+
+        for item, ref, message in zip(batch, refs, messages):
+            if not ref:
+                try:
+                    self.file_ids[self._cache_key(item)] = self._result_file_id(message, kind)
+                except (KeyError, IndexError, TypeError):
+                    pass
+        if files:
+            self.save_cache()
+        return messages
+
+    async def _get_session(self):
+        if self._session is None:
+            self._session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self.max_connections))
+            self.global_bucket = TokenBucket(self.global_rate)
+        return self._session
+
+    def _form(self, fields, files):
+        form = aiohttp.FormData()
+        for key, value in fields.items():
+            form.add_field(key, str(value))
+        for key, item in files.items():
+            if item.data is not None:
+                form.add_field(key, item.data, filename=item.filename)
+                continue
+            with open(item.path, 'rb') as f:
+                form.add_field(key, f.read(), filename=item.filename)
+        return form
+
+    async def _call(self, chat, method, fields, files=None):
+        """One Bot API call with rate limiting and retries; returns `result`"""
+        session = await self._get_session()
+        url = f"{self.api_base}/bot{self.token}/{method}"
+        delay = 1.0
+        for attempt in range(self.max_retries + 1):
+            await self._chat_buckets[chat].acquire()
+            await self.global_bucket.acquire()
+            self.stats['api_calls'] += 1
+            if files:
+                self.stats['uploads'] += len(files)
+            try:
+                async with session.post(url, data=self._form(fields, files or {})) as resp:
+                    status = resp.status
+                    try:
+                        payload = await resp.json(content_type=None)
+                    except ValueError:
+                        payload = {}        # e.g. a proxy's HTML 502; the status decides below
+                    if not isinstance(payload, dict):
+                        payload = {}
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt == self.max_retries:
+                    raise TelegramError(f"{method}: {e}")
+                self.stats['retries_error'] += 1
+                await asyncio.sleep(delay + random.uniform(0, delay / 2))
+                delay = min(delay * 2, 30)
+                continue
+
+            if payload.get('ok'):
+                return payload['result']
+            if status == 429 and attempt < self.max_retries:
+                self.stats['retries_429'] += 1
+                retry_after = payload.get('parameters', {}).get('retry_after', delay)
+                await asyncio.sleep(retry_after)
+                continue
+            if status >= 500 and attempt < self.max_retries:
+                self.stats['retries_error'] += 1
+                await asyncio.sleep(delay + random.uniform(0, delay / 2))
+                delay = min(delay * 2, 30)
+                continue
+            raise TelegramError(f"{method}: {status} {payload.get('description')}")
+        raise TelegramError(f"{method}: retries exhausted")